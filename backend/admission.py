@@ -0,0 +1,193 @@
+"""
+Admission control for code execution.
+
+Every execution (scratch /run, /sql/run, graded /submit and /sql/submit, and the
+final /exam/submit) asks the controller for a slot in one of the execution
+classes below. Slots are shared, but when they are all busy the waiting
+requests are served by weight, so exam submissions keep flowing while
+candidates hammer Run. Each class has a bounded queue and a per-user cap;
+when either is exceeded the request is shed immediately with 429/503 and a
+Retry-After header instead of piling up.
+
+With several workers (see state.py) each one admits and queues its own
+requests as above, then also takes a host-wide slot lease, so the slot
+count holds across the whole host rather than per worker.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque, defaultdict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+import tracing
+from metrics import ADMISSION_LEASE_WAIT_SECONDS, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+# weight: share of freed slots while classes compete (higher = served first)
+# max_queue: waiting requests allowed before shedding with 503
+# per_user: in-flight + queued requests one user may hold in this class (429 beyond)
+# max_wait: seconds a request may wait for a slot before giving up with 503
+EXECUTION_CLASSES = {
+    "exam_submit": {"weight": 8, "max_queue": 500, "per_user": 1, "max_wait": 120},
+    "submit": {"weight": 4, "max_queue": 200, "per_user": 1, "max_wait": 30},
+    "run": {"weight": 1, "max_queue": 100, "per_user": 2, "max_wait": 10},
+}
+
+DEFAULT_CAPACITY = 25
+
+# Polling backoff while every host-wide slot is leased by other workers
+LEASE_POLL_MIN_SECONDS = 0.005
+LEASE_POLL_MAX_SECONDS = 0.1
+
+
+class AdmissionController:
+    """Weighted, bounded admission to a fixed number of execution slots"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, classes: Optional[Dict[str, dict]] = None):
+        self.capacity = capacity
+        self.classes = classes or EXECUTION_CLASSES
+        self.in_flight = 0
+        self._queues = {name: deque() for name in self.classes}
+        # Stride scheduling: each grant advances a class's pass by 1/weight and
+        # the waiting class with the lowest pass is served next
+        self._pass = {name: 0.0 for name in self.classes}
+        self._virtual_time = 0.0
+        self._per_user = defaultdict(int)  # (class, user) -> in flight + queued
+        self._avg_service_seconds = 1.0  # EWMA, used for Retry-After estimates
+        # Called with (execution_class, service_seconds) for every finished
+        # execution; the adaptive concurrency limiter listens here
+        self.on_release: Optional[Callable[[str, float], None]] = None
+        # Multi-worker mode: the shared store handing out host-wide slot leases
+        self.leases = None
+
+    def queue_depth(self, execution_class: Optional[str] = None) -> int:
+        if execution_class is not None:
+            return len(self._queues[execution_class])
+        return sum(len(q) for q in self._queues.values())
+
+    def set_capacity(self, capacity: int):
+        """Resize the slot pool; extra slots are handed to waiters right away"""
+        self.capacity = max(1, int(capacity))
+        self._dispatch()
+
+    def _retry_after(self, execution_class: str) -> int:
+        """Rough seconds until a slot frees up for this class"""
+        ahead = self.queue_depth(execution_class) + 1
+        return max(1, math.ceil(ahead * self._avg_service_seconds / max(1, self.capacity)))
+
+    def _reject(self, status_code: int, detail: str, execution_class: str):
+        ADMISSION_REJECTED.inc(execution_class=execution_class, status=str(status_code))
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self._retry_after(execution_class))}
+        )
+
+    def _dispatch(self):
+        """Hand free slots to waiters, lowest pass (weighted) class first"""
+        while self.in_flight < self.capacity:
+            candidates = [name for name, q in self._queues.items() if q]
+            if not candidates:
+                return
+            name = min(candidates, key=lambda n: self._pass[n])
+            waiter = self._queues[name].popleft()
+            if waiter.done():
+                continue  # timed out or cancelled while queued
+            self._virtual_time = self._pass[name]
+            self._pass[name] += 1.0 / self.classes[name]["weight"]
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _release(self, execution_class: Optional[str] = None, service_seconds: float = 0.0):
+        self.in_flight -= 1
+        if execution_class is not None:
+            self._avg_service_seconds = 0.8 * self._avg_service_seconds + 0.2 * service_seconds
+            if self.on_release is not None:
+                self.on_release(execution_class, service_seconds)
+        self._dispatch()
+
+    async def _acquire(self, execution_class: str):
+        config = self.classes[execution_class]
+        queue = self._queues[execution_class]
+
+        if self.in_flight < self.capacity and not self.queue_depth():
+            self.in_flight += 1
+            ADMISSION_WAIT_SECONDS.observe(0, execution_class=execution_class)
+            return
+
+        if len(queue) >= config["max_queue"]:
+            self._reject(503, "Server is busy. Please retry shortly.", execution_class)
+
+        if not queue:
+            # A class that was idle doesn't get to bank credit for that time
+            self._pass[execution_class] = max(self._pass[execution_class], self._virtual_time)
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=config["max_wait"])
+            ADMISSION_WAIT_SECONDS.observe(time.monotonic() - queued_at, execution_class=execution_class)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                ADMISSION_WAIT_SECONDS.observe(time.monotonic() - queued_at, execution_class=execution_class)
+                return  # granted at the last moment
+            waiter.cancel()
+            self._reject(503, "Timed out waiting for an execution slot. Please retry.", execution_class)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # granted, but the request went away
+            else:
+                waiter.cancel()
+            raise
+
+    async def _acquire_lease(self, execution_class: str, deadline: float) -> str:
+        """Wait for a host-wide slot lease; the limit is this worker's current capacity"""
+        start = time.monotonic()
+        delay = LEASE_POLL_MIN_SECONDS
+        with tracing.span("admission.lease", execution_class=execution_class):
+            while True:
+                lease = await self.leases.call("acquire_lease", self.capacity)
+                if lease is not None:
+                    ADMISSION_LEASE_WAIT_SECONDS.observe(time.monotonic() - start, execution_class=execution_class)
+                    return lease
+                if time.monotonic() + delay > deadline:
+                    self._reject(503, "Timed out waiting for an execution slot. Please retry.", execution_class)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, LEASE_POLL_MAX_SECONDS)
+
+    @asynccontextmanager
+    async def slot(self, execution_class: str, user_key=None):
+        """Hold one execution slot of the given class for the duration of the block"""
+        user = (execution_class, user_key)
+        if user_key is not None:
+            if self._per_user[user] >= self.classes[execution_class]["per_user"]:
+                self._reject(429, "Too many concurrent requests. Please wait for the previous one to finish.", execution_class)
+            self._per_user[user] += 1
+        try:
+            deadline = time.monotonic() + self.classes[execution_class]["max_wait"]
+            with tracing.span("admission.wait", execution_class=execution_class):
+                await self._acquire(execution_class)
+            lease = None
+            if self.leases is not None:
+                try:
+                    lease = await self._acquire_lease(execution_class, deadline)
+                except BaseException:
+                    self._release()
+                    raise
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                if lease is not None:
+                    # Shielded: a cancelled request must still hand its lease back
+                    await asyncio.shield(self.leases.call("release_lease", lease))
+                self._release(execution_class, time.monotonic() - started)
+        finally:
+            if user_key is not None:
+                self._per_user[user] -= 1
+                if not self._per_user[user]:
+                    del self._per_user[user]
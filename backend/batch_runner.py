@@ -0,0 +1,209 @@
+"""
+Batch custom-input runs: several inputs through one interpreter.
+
+The candidate's code is wrapped in a small harness and executed as a single
+run (so it goes through admission, the runner's limits and judge nodes like
+any other run). The harness compiles the code once and execs it once per
+input in a fresh __main__ namespace. Each input gets real file descriptors:
+fd 0 is a temporary file holding the input and fds 1 and 2 are temporary
+files capturing the output, so `open(0)` and `os.write(1, ...)` behave as in
+a normal run; all three go back to /dev/null between inputs. The harness
+writes one JSON record per input to the run's real stdout.
+
+The run's file size limit (PythonRunner.MAX_FILE_SIZE) caps each input and
+each captured stream: inputs are checked up front, and output past the cap
+fails the write (a Runtime Error) where a normal run would be truncated.
+
+All inputs share one execution's limits: the wall/CPU time and memory of a
+single run. An input still running when the time is up gets Time Limit
+Exceeded and the ones after it are not run. State outside the namespace
+(imported modules, sys settings) carries over between inputs, which is fine
+for trying inputs out but is why judging still runs each test on its own.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+from runner import (
+    PythonRunner, VERDICT_MEMORY_LIMIT, VERDICT_RUNTIME_ERROR, VERDICT_TIME_LIMIT, resource_metrics
+)
+
+MAX_BATCH_INPUTS = 10
+MAX_BATCH_INPUT_BYTES = PythonRunner.MAX_FILE_SIZE  # each input is a file in the harness
+
+# Seconds of the run's wall limit kept back so the harness can report before it is killed
+BUDGET_MARGIN_SECONDS = 0.5
+
+# Worst case JSON size of one record: both streams at MAX_OUTPUT_SIZE characters,
+# every character escaped as \uXXXX, plus the other fields
+RECORD_LIMIT = 2 * 6 * PythonRunner.MAX_OUTPUT_SIZE + 1024
+
+_HARNESS = """
+import builtins, io, json, os, signal, sys, tempfile, time, traceback
+
+class _BudgetExceeded(BaseException):
+    pass
+
+def _harness():
+    job = json.loads(sys.stdin.read())
+    code = compile(job["code"], "<string>", "exec", dont_inherit=True)
+    deadline = time.monotonic() + job["budget"]
+    limit = job["max_output"]
+
+    report = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+    def on_alarm(signum, frame):
+        raise _BudgetExceeded()
+    signal.signal(signal.SIGALRM, on_alarm)
+    # Output past the file size limit fails the write instead of killing the batch
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+
+    def text(fd, mode, errors="strict"):
+        raw = io.FileIO(fd, mode, closefd=False)
+        if mode == "r":
+            return io.TextIOWrapper(io.BufferedReader(raw), encoding="utf-8", errors=errors)
+        return io.TextIOWrapper(raw, encoding="utf-8", errors=errors, write_through=True)
+
+    def captured(file):
+        file.seek(0)
+        return file.read(limit * 4).decode("utf-8", errors="replace")[:limit]
+
+    for stdin in job["inputs"]:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            report.write(json.dumps({"skipped": True}) + "\\n")
+            report.flush()
+            continue
+
+        with tempfile.TemporaryFile() as stdin_file:
+            stdin_file.write(stdin.encode("utf-8"))
+            stdin_file.seek(0)
+            os.dup2(stdin_file.fileno(), 0)
+        out_file, err_file = tempfile.TemporaryFile(), tempfile.TemporaryFile()
+        os.dup2(out_file.fileno(), 1)
+        os.dup2(err_file.fileno(), 2)
+        sys.stdin, sys.stdout, sys.stderr = text(0, "r"), text(1, "w"), text(2, "w", "backslashreplace")
+        exit_code, timed_out = 0, False
+        started, times = time.perf_counter(), os.times()
+        try:
+            try:
+                signal.setitimer(signal.ITIMER_REAL, remaining)
+                exec(code, {"__name__": "__main__", "__builtins__": builtins})
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        except _BudgetExceeded:
+            timed_out = True
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except BaseException as e:
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code is not code:
+                tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb, file=sys.stderr)
+            exit_code = 1
+        elapsed, used = time.perf_counter() - started, os.times()
+        for wrapper in (sys.stdout, sys.stderr):
+            try:
+                wrapper.flush()
+            except Exception:
+                pass
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+
+        with out_file, err_file:
+            record = {"stdout": captured(out_file), "stderr": captured(err_file)}
+        report.write(json.dumps({
+            **record,
+            "exit_code": exit_code,
+            "timed_out": timed_out,
+            "wall_time_ms": round(elapsed * 1000, 3),
+            "cpu_user_ms": round((used.user - times.user) * 1000, 3),
+            "cpu_sys_ms": round((used.system - times.system) * 1000, 3),
+        }) + "\\n")
+        report.flush()
+
+_harness()
+"""
+
+
+def batch_job(code: str, inputs: List[str]) -> Dict:
+    """Arguments for one run_tests call executing `code` once per input"""
+    job = {
+        "code": code,
+        "inputs": inputs,
+        "budget": PythonRunner.TIMEOUT - BUDGET_MARGIN_SECONDS,
+        "max_output": PythonRunner.MAX_OUTPUT_SIZE,
+    }
+    return {"code": _HARNESS, "stdin": json.dumps(job), "output_limit": len(inputs) * RECORD_LIMIT}
+
+
+def _parse_records(stdout: str) -> List[dict]:
+    records = []
+    for line in stdout.splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            break  # cut short (killed mid-write)
+    return records
+
+
+def _input_result(record: dict) -> Dict:
+    """A run_with_input-shaped result from one harness record"""
+    metrics = resource_metrics(record["wall_time_ms"])
+    metrics["cpu_user_ms"] = record["cpu_user_ms"]
+    metrics["cpu_sys_ms"] = record["cpu_sys_ms"]
+    stderr = record["stderr"]
+    if record["timed_out"]:
+        return {
+            "status": "error", "stdout": record["stdout"],
+            "stderr": f"Error: Code execution timed out (the batch shares one {PythonRunner.TIMEOUT}s time limit)",
+            "verdict": VERDICT_TIME_LIMIT, **metrics
+        }
+    if record["exit_code"] == 0:
+        return {"status": "success", "stdout": record["stdout"], "stderr": stderr, "verdict": None, **metrics}
+    last_line = stderr.strip().rsplit("\n", 1)[-1] if stderr else ""
+    return {
+        "status": "error",
+        "stdout": record["stdout"],
+        "stderr": stderr or f"Process exited with code {record['exit_code']}",
+        "verdict": VERDICT_MEMORY_LIMIT if last_line.startswith("MemoryError") else VERDICT_RUNTIME_ERROR,
+        **metrics
+    }
+
+
+def _not_run(reason: str, verdict: Optional[str] = None) -> Dict:
+    return {"status": "error", "stdout": "", "stderr": reason, "verdict": verdict, **resource_metrics(0)}
+
+
+def batch_results(process: Dict, count: int) -> List[Dict]:
+    """
+    Split the harness run's result into one result per input. Inputs the
+    harness never reported on (the process was killed or exited mid-batch)
+    get the process's own outcome for the first and "not run" for the rest.
+    """
+    results = []
+    for record in _parse_records(process["stdout"])[:count]:
+        if record.get("skipped"):
+            results.append(_not_run(
+                f"Not run: the batch's {PythonRunner.TIMEOUT}s time limit was used up by earlier inputs",
+                VERDICT_TIME_LIMIT
+            ))
+        else:
+            results.append(_input_result(record))
+
+    if len(results) < count:
+        if process["status"] == "error":
+            # Killed by a limit, or exited with an error code mid-input
+            results.append(_not_run(process["stderr"], process["verdict"]))
+        else:
+            results.append(_not_run("Process exited while running this input (its output is lost)", VERDICT_RUNTIME_ERROR))
+        while len(results) < count:
+            results.append(_not_run("Not run: an earlier input ended the process"))
+    return results
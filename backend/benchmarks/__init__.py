@@ -0,0 +1 @@
+"""Benchmarks for judge hot paths. Run from backend/: python -m benchmarks.<name>"""
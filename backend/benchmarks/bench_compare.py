@@ -0,0 +1,118 @@
+"""
+Microbenchmark and equivalence check for output normalization / comparison.
+
+Usage (from backend/):
+    python -m benchmarks.bench_compare
+    python -m benchmarks.bench_compare --cases 500000 --seed 7
+
+Before timing anything, random outputs are generated and checked against the
+original multi-pass normalize_output implementation, so a faster comparator
+can never silently change which answers are accepted.
+"""
+
+import argparse
+import random
+import re
+import sys
+import timeit
+
+from runner import normalize_output, normalize_output_lines, compare_outputs, compare_normalized
+
+
+def reference_normalize_output(text: str) -> str:
+    """Original multi-pass implementation kept as the semantic reference"""
+    if text is None:
+        return ""
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = text.split('\n')
+    lines = [line.rstrip() for line in lines]
+    text = '\n'.join(lines)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+# Characters that exercise every normalization rule, including unicode
+# whitespace that str.rstrip() removes but str.split('\n') does not split on
+ALPHABET = ['a', 'b', '1', ' ', ' ', '\t', '\n', '\n', '\r', '\r\n', '\x0b', '\x0c', '\x1c', '\x85', '　', '']
+
+
+def random_output(rng: random.Random, max_len: int = 16) -> str:
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_len)))
+
+
+def check_equivalence(cases: int, seed: int) -> int:
+    """Compare new and reference semantics on random pairs; returns mismatch count"""
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(cases):
+        a = random_output(rng)
+        # Half the time derive b from a so that equal-after-normalization pairs are common
+        b = reference_normalize_output(a) + rng.choice(['', '\n', ' \r\n', '\n\n\n']) if rng.random() < 0.5 else random_output(rng)
+        expected = reference_normalize_output(a) == reference_normalize_output(b)
+        if (
+            normalize_output(a) != reference_normalize_output(a)
+            or compare_outputs(a, b) != expected
+            or compare_normalized(a, normalize_output_lines(b)) != expected
+        ):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  MISMATCH: actual={a!r} expected={b!r}")
+    return mismatches
+
+
+def bench(label: str, fn, number: int):
+    seconds = timeit.timeit(fn, number=number) / number
+    print(f"  {label:<44} {seconds * 1e6:>12.1f} us")
+    return seconds
+
+
+def run_benchmarks():
+    small = "1\n2\nFizz\n4\nBuzz\n"
+    small_expected = "1\n2\nFizz\n4\nBuzz"
+    big = '\n'.join(f"{i} " for i in range(300000))  # ~2 MB, trailing spaces on every line
+    big_wrong_last = big[:-3] + 'x'
+    big_wrong_first = 'x' + big
+
+    small_lines = normalize_output_lines(small_expected)
+    big_lines = normalize_output_lines(big)
+
+    def reference_compare(a, b):
+        return reference_normalize_output(a) == reference_normalize_output(b)
+
+    print("Small output (FizzBuzz, 5 lines):")
+    bench("reference compare", lambda: reference_compare(small, small_expected), 100000)
+    bench("compare_outputs", lambda: compare_outputs(small, small_expected), 100000)
+    bench("compare_normalized (pre-normalized)", lambda: compare_normalized(small, small_lines), 100000)
+
+    print("Multi-MB output, accepted:")
+    bench("reference compare", lambda: reference_compare(big.strip(), big), 5)
+    bench("compare_outputs", lambda: compare_outputs(big.strip(), big), 5)
+    bench("compare_normalized (pre-normalized)", lambda: compare_normalized(big.strip(), big_lines), 5)
+
+    print("Multi-MB output, wrong on the last line:")
+    bench("reference compare", lambda: reference_compare(big_wrong_last, big), 5)
+    bench("compare_normalized (pre-normalized)", lambda: compare_normalized(big_wrong_last, big_lines), 5)
+
+    print("Multi-MB output, wrong on the first line:")
+    bench("reference compare", lambda: reference_compare(big_wrong_first, big), 5)
+    bench("compare_normalized (pre-normalized)", lambda: compare_normalized(big_wrong_first, big_lines), 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=200000, help="random equivalence cases to check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Checking equivalence on {args.cases} random cases...")
+    mismatches = check_equivalence(args.cases, args.seed)
+    if mismatches:
+        print(f"❌ {mismatches} mismatches against the reference implementation")
+        sys.exit(1)
+    print("✅ Equivalent to reference implementation\n")
+
+    run_benchmarks()
+
+
+if __name__ == "__main__":
+    main()
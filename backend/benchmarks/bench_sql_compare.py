@@ -0,0 +1,113 @@
+"""
+Benchmark and equivalence check for SQL result-set comparison.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sql_compare
+    python -m benchmarks.bench_sql_compare --rows 100000 --cases 20000
+
+Random small result sets are first checked against the original sort-based
+comparator, then both are timed on large result sets.
+"""
+
+import argparse
+import random
+import sys
+import timeit
+
+from checkers import compare_result_sets, normalize_sql_value
+
+
+def reference_compare_result_sets(actual_columns, actual_rows, expected_columns, expected_rows):
+    """Original sort-by-str implementation kept as the semantic reference"""
+    actual_cols_norm = [c.strip().lower() for c in actual_columns]
+    expected_cols_norm = [c.strip().lower() for c in expected_columns]
+    if set(actual_cols_norm) != set(expected_cols_norm):
+        return False
+    index_map = {name: idx for idx, name in enumerate(actual_cols_norm)}
+    ordered_actual_rows = [
+        [normalize_sql_value(row[index_map[col]]) for col in expected_cols_norm]
+        for row in actual_rows
+    ]
+    expected_norm_rows = [[normalize_sql_value(v) for v in row] for row in expected_rows]
+    return sorted(ordered_actual_rows, key=lambda x: str(x)) == sorted(expected_norm_rows, key=lambda x: str(x))
+
+
+VALUES = [0, 1, 2, 2.0, 2.5, "a", " a", "b ", "B", None]
+
+
+def random_result_set(rng: random.Random):
+    columns = ["id", "Name", "salary"][:rng.randint(1, 3)]
+    rows = [[rng.choice(VALUES) for _ in columns] for _ in range(rng.randint(0, 5))]
+    return columns, rows
+
+
+def check_equivalence(cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(cases):
+        expected_columns, expected_rows = random_result_set(rng)
+        if rng.random() < 0.5:
+            # Same rows, shuffled, with columns reordered and re-cased
+            order = list(range(len(expected_columns)))
+            rng.shuffle(order)
+            actual_columns = [expected_columns[i].upper() + " " for i in order]
+            actual_rows = [[row[i] for i in order] for row in expected_rows]
+            rng.shuffle(actual_rows)
+        else:
+            actual_columns, actual_rows = random_result_set(rng)
+        expected = reference_compare_result_sets(actual_columns, actual_rows, expected_columns, expected_rows)
+        if compare_result_sets(actual_columns, actual_rows, expected_columns, expected_rows) != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  MISMATCH: {actual_columns} {actual_rows} vs {expected_columns} {expected_rows}")
+    return mismatches
+
+
+def bench(label: str, fn, number: int):
+    seconds = timeit.timeit(fn, number=number) / number
+    print(f"  {label:<40} {seconds * 1000:>10.1f} ms")
+    return seconds
+
+
+def run_benchmarks(row_count: int):
+    rng = random.Random(1)
+    columns = ["id", "name", "department", "salary"]
+    expected_rows = [[i, f"name{i}", f"dept{i % 50}", rng.randint(30000, 90000)] for i in range(row_count)]
+    actual_columns = ["salary", "ID", "name", "Department"]
+    actual_rows = [[r[3], r[0], r[1], r[2]] for r in expected_rows]
+    rng.shuffle(actual_rows)
+    mismatched_count = actual_rows[:-1]
+
+    print(f"{row_count} rows, shuffled, columns reordered:")
+    bench("reference (sort by str)", lambda: reference_compare_result_sets(actual_columns, actual_rows, columns, expected_rows), 3)
+    bench("compare_result_sets (multiset)", lambda: compare_result_sets(actual_columns, actual_rows, columns, expected_rows), 3)
+    bench("compare_result_sets (float_tolerance)", lambda: compare_result_sets(actual_columns, actual_rows, columns, expected_rows, float_tolerance=1e-6), 3)
+
+    ordered_rows = [[r[3], r[0], r[1], r[2]] for r in expected_rows]
+    print(f"{row_count} rows, same order (order_sensitive):")
+    bench("compare_result_sets (order_sensitive)", lambda: compare_result_sets(actual_columns, ordered_rows, columns, expected_rows, order_sensitive=True), 3)
+
+    print(f"{row_count} rows vs {row_count - 1} rows:")
+    bench("reference (sort by str)", lambda: reference_compare_result_sets(actual_columns, mismatched_count, columns, expected_rows), 3)
+    bench("compare_result_sets (early exit)", lambda: compare_result_sets(actual_columns, mismatched_count, columns, expected_rows), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="rows in the large result sets")
+    parser.add_argument("--cases", type=int, default=20000, help="random equivalence cases to check")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Checking equivalence on {args.cases} random cases...")
+    mismatches = check_equivalence(args.cases, args.seed)
+    if mismatches:
+        print(f"❌ {mismatches} mismatches against the reference implementation")
+        sys.exit(1)
+    print("✅ Equivalent to reference implementation\n")
+
+    run_benchmarks(args.rows)
+
+
+if __name__ == "__main__":
+    main()
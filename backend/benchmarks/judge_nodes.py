@@ -0,0 +1,111 @@
+"""
+Exercise the judge-node protocol on one box: a coordinator plus several
+local judge_node.py processes.
+
+Usage (from backend/):
+    python -m benchmarks.judge_nodes --nodes 3 --slots 2 --jobs 60
+    python -m benchmarks.judge_nodes --kill-one     # drop a node mid-run; its jobs must be resubmitted
+
+Every job's results are checked, so a lost or misrouted job fails the run
+(exit status 1). Prints throughput, how jobs spread over the nodes and the
+coordinator's job outcomes (ok / resubmitted / local_fallback).
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import judge_cluster  # noqa: E402
+from judge_cluster import JudgeCoordinator  # noqa: E402
+
+# Sums its input after a short busy loop, so jobs overlap and load-aware routing matters
+JOB_CODE = """
+import time
+end = time.perf_counter() + 0.05
+while time.perf_counter() < end:
+    pass
+print(sum(map(int, input().split())))
+"""
+TESTS_PER_JOB = 3
+
+
+async def wait_for_nodes(coordinator: JudgeCoordinator, count: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while len(coordinator.nodes) < count:
+        if time.monotonic() > deadline:
+            raise SystemExit(f"❌ Only {len(coordinator.nodes)}/{count} nodes registered")
+        await asyncio.sleep(0.05)
+
+
+async def run_job(coordinator: JudgeCoordinator, job: int) -> bool:
+    inputs = [f"{job} {test}" for test in range(TESTS_PER_JOB)]
+    results = await coordinator.run_tests(JOB_CODE, inputs)
+    return [r["stdout"].strip() for r in results] == [str(job + test) for test in range(TESTS_PER_JOB)]
+
+
+async def main_async(args):
+    address = f"unix:{os.path.join(tempfile.mkdtemp(prefix='judge-'), 'coordinator.sock')}"
+    coordinator = JudgeCoordinator(address)
+    await coordinator.start()
+    nodes = [
+        subprocess.Popen(
+            [sys.executable, "judge_node.py", "--coordinator", address, "--slots", str(args.slots), "--node-id", f"node-{i}"],
+            cwd=BACKEND_DIR, stdout=subprocess.DEVNULL
+        )
+        for i in range(args.nodes)
+    ]
+    try:
+        await wait_for_nodes(coordinator, args.nodes)
+        print(f"✅ {args.nodes} nodes registered ({args.slots} slots each) on {address}")
+
+        completed_before = {}
+        if args.kill_one:
+            async def kill_later():
+                await asyncio.sleep(0.5)
+                victim = max(coordinator.nodes.values(), key=lambda node: len(node.jobs))
+                completed_before.update({victim.node_id: victim.completed})
+                nodes[int(victim.node_id.split("-")[1])].kill()
+                print(f"💥 Killed {victim.node_id} with {len(victim.jobs)} jobs in flight")
+            killer = asyncio.create_task(kill_later())
+
+        start = time.perf_counter()
+        ok = await asyncio.gather(*[run_job(coordinator, job) for job in range(args.jobs)])
+        elapsed = time.perf_counter() - start
+        if args.kill_one:
+            await killer
+        completed_by = {node.node_id: node.completed for node in coordinator.nodes.values()}
+        completed_by.update({f"{node_id} (killed)": count for node_id, count in completed_before.items()})
+
+        failed = ok.count(False)
+        print(f"\n{args.jobs} jobs x {TESTS_PER_JOB} tests in {elapsed:.2f}s "
+              f"({args.jobs / elapsed:.1f} jobs/s), {failed} wrong")
+        print("Jobs per node: " + ", ".join(f"{node_id}={count}" for node_id, count in sorted(completed_by.items())))
+        outcomes = {key[0]: int(value) for key, value in judge_cluster.NODE_JOBS._values.items()}
+        print(f"Outcomes: {outcomes}")
+        return 1 if failed else 0
+    finally:
+        await coordinator.stop()
+        for process in nodes:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--slots", type=int, default=2, help="slots per node")
+    parser.add_argument("--jobs", type=int, default=60)
+    parser.add_argument("--kill-one", action="store_true", help="kill the busiest node half a second in")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+End-to-end load test simulating a full exam cohort.
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --candidates 50 --duration 60
+    python -m benchmarks.loadtest --url http://localhost:8000 --candidates 200 --duration 300
+
+Each simulated candidate logs in, starts the exam, loads every problem and
+then, until the exam ends, alternates think time with /run or /sql/run,
+/exam/save-answer and the occasional /submit or /sql/submit. Some candidates
+submit early; everyone else is held until the deadline and auto-submits at
+the same moment, reproducing the end-of-exam burst.
+
+Without --url the app is driven in-process (no network, lifespan included)
+against a throwaway SQLite database. With --url it targets a running
+server, which then keeps the loadtest users in its own database.
+
+Reports p50/p95/p99 latency, throughput and errors per endpoint; requests
+shed by admission control (429/503) are counted separately from errors.
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Known-good answers so graded paths exercise full test runs; other
+# problems are answered with their starter code
+PYTHON_SOLUTIONS = {
+    "py_sum_n_numbers": "n = int(input())\narr = list(map(int, input().split()))\nprint(sum(arr))",
+    "py_palindrome_check": "s = input()\nprint('YES' if s == s[::-1] else 'NO')",
+}
+SQL_PLACEHOLDER = "SELECT 1 AS answer"
+RUN_INPUT = "5\n1 2 3 4 5"
+
+SHED_STATUSES = {429, 503}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Stats:
+    """Latency samples and outcomes per endpoint label"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.shed: Dict[str, int] = defaultdict(int)
+        self.first_seen: Dict[str, float] = {}
+        self.last_seen: Dict[str, float] = {}
+
+    def record(self, label: str, started: float, seconds: float, status: Optional[int]):
+        self.latencies[label].append(seconds)
+        self.first_seen.setdefault(label, started)
+        self.last_seen[label] = started + seconds
+        if status in SHED_STATUSES:
+            self.shed[label] += 1
+        elif status is None or status >= 400:
+            self.errors[label] += 1
+
+    def report(self, elapsed: float):
+        header = f"{'endpoint':<32} {'count':>7} {'err%':>6} {'shed':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+        print(header)
+        print("-" * len(header))
+        total = errors = shed = 0
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            count = len(values)
+            window = max(self.last_seen[label] - self.first_seen[label], 1e-9)
+            total += count
+            errors += self.errors[label]
+            shed += self.shed[label]
+            print(
+                f"{label:<32} {count:>7} {100 * self.errors[label] / count:>5.1f}% {self.shed[label]:>6} "
+                f"{count / window:>8.1f} {percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+                f"{percentile(values, 99) * 1000:>9.1f} {values[-1] * 1000:>9.1f}"
+            )
+        print("-" * len(header))
+        print(f"{total} requests in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f} req/s), "
+              f"{errors} errors ({100 * errors / max(total, 1):.2f}%), {shed} shed")
+
+
+class Candidate:
+    def __init__(self, index: int, run_id: str, client, stats: Stats, args, rng: random.Random):
+        self.index = index
+        self.email = f"loadtest-{run_id}-{index}@gmail.com"
+        self.client = client
+        self.stats = stats
+        self.args = args
+        self.rng = rng
+        self.session_id = None
+        self.problems: List[dict] = []
+        self.answers: Dict[str, str] = {}
+
+    async def request(self, method: str, label: str, url: str, **kwargs):
+        """Send one request, recording its latency under the endpoint label"""
+        started = time.perf_counter()
+        status = None
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        except httpx.HTTPError:
+            return None
+        finally:
+            self.stats.record(label, started, time.perf_counter() - started, status)
+
+    async def think(self):
+        await asyncio.sleep(self.rng.expovariate(1 / self.args.think))
+
+    @staticmethod
+    def initial_answer(problem: dict) -> str:
+        if problem["id"] in PYTHON_SOLUTIONS:
+            return PYTHON_SOLUTIONS[problem["id"]]
+        starter = problem.get("starter_code") or ""
+        if problem["language"] == "sql":
+            # The SQL endpoints reject queries that start with a comment
+            query = "\n".join(line for line in starter.splitlines() if not line.strip().startswith("--")).strip()
+            return query or SQL_PLACEHOLDER
+        return starter
+
+    async def setup(self):
+        response = await self.request("POST", "POST /login", "/login", json={"name": f"Load Test {self.index}", "email": self.email})
+        if response is None or response.status_code != 200:
+            return False
+        self.session_id = response.json()["session_id"]
+        summary = await self.request("GET", "GET /exam/summary", "/exam/summary")
+        await self.request("POST", "POST /exam/start", "/exam/start", json={"session_id": self.session_id})
+        if summary is None or summary.status_code != 200:
+            return False
+        for item in summary.json()["problems"]:
+            response = await self.request("GET", "GET /problems/{id}", f"/problems/{item['id']}")
+            if response is not None and response.status_code == 200:
+                problem = response.json()
+                self.problems.append(problem)
+                self.answers[problem["id"]] = self.initial_answer(problem)
+        return bool(self.problems)
+
+    async def work_on(self, problem: dict):
+        """One think/act cycle on a problem: run, save, sometimes submit"""
+        code = self.answers[problem["id"]]
+        is_sql = problem["language"] == "sql"
+        if is_sql:
+            await self.request("POST", "POST /sql/run", "/sql/run",
+                               json={"problem_id": problem["id"], "query": code, "session_id": self.session_id})
+        else:
+            await self.request("POST", "POST /run", "/run",
+                               json={"code": code, "custom_input": RUN_INPUT, "session_id": self.session_id})
+        await self.think()
+        await self.request("POST", "POST /exam/save-answer", "/exam/save-answer",
+                           params={"session_id": self.session_id, "problem_id": problem["id"], "code": code})
+        if self.rng.random() < self.args.submit_probability:
+            await self.think()
+            if is_sql:
+                await self.request("POST", "POST /sql/submit", "/sql/submit",
+                                   json={"session_id": self.session_id, "problem_id": problem["id"], "query": code})
+            else:
+                await self.request("POST", "POST /submit", "/submit",
+                                   json={"session_id": self.session_id, "problem_id": problem["id"], "code": code})
+
+    async def submit_exam(self, auto_submit: bool):
+        label = "POST /exam/submit (burst)" if auto_submit else "POST /exam/submit"
+        answers = [
+            {"problem_id": p["id"], "code": self.answers[p["id"]], "language": p["language"]}
+            for p in self.problems
+        ]
+        await self.request("POST", label, "/exam/submit",
+                           json={"session_id": self.session_id, "answers": answers, "auto_submit": auto_submit})
+
+    async def run(self, deadline: float, burst: asyncio.Event):
+        await asyncio.sleep(self.rng.uniform(0, self.args.ramp_up))
+        if not await self.setup():
+            return
+        submits_early = self.rng.random() < self.args.early_submit
+        end = deadline - (self.rng.uniform(0.3, 0.9) * self.args.duration if submits_early else 0)
+        while time.perf_counter() < end:
+            await self.think()
+            if time.perf_counter() >= end:
+                break
+            await self.work_on(self.rng.choice(self.problems))
+        if submits_early:
+            await self.submit_exam(auto_submit=False)
+        else:
+            # Timer expired: every remaining client auto-submits at once
+            await burst.wait()
+            await self.submit_exam(auto_submit=True)
+
+
+async def run_load(args, client):
+    stats = Stats()
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    deadline = started + args.ramp_up + args.duration
+    burst = asyncio.Event()
+    candidates = [
+        Candidate(i, run_id, client, stats, args, random.Random(rng.random()))
+        for i in range(args.candidates)
+    ]
+    tasks = [asyncio.create_task(c.run(deadline, burst)) for c in candidates]
+
+    await asyncio.sleep(max(0, deadline - time.perf_counter()))
+    print(f"Exam over after {time.perf_counter() - started:.1f}s, releasing the auto-submit burst...")
+    burst_started = time.perf_counter()
+    burst.set()
+    await asyncio.gather(*tasks)
+    finished = time.perf_counter()
+    print(f"Burst drained in {finished - burst_started:.1f}s\n")
+    stats.report(finished - started)
+    return stats
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            await run_load(args, client)
+        return
+
+    # In-process: point the app at a throwaway database before importing it
+    import database
+    db_dir = tempfile.mkdtemp(prefix="loadtest-")
+    database.DATABASE_PATH = os.path.join(db_dir, "coding_platform.db")
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        # Unhandled app exceptions become 500s and are counted, like behind a server
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits, timeout=timeout) as client:
+            await run_load(args, client)
+    print(f"\nDatabase left at {database.DATABASE_PATH}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: drive the app in-process)")
+    parser.add_argument("--candidates", type=int, default=25, help="simulated candidates")
+    parser.add_argument("--duration", type=float, default=60, help="exam length in seconds, after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds over which candidates log in")
+    parser.add_argument("--think", type=float, default=3, help="mean think time between actions, seconds")
+    parser.add_argument("--submit-probability", type=float, default=0.3, help="chance a work cycle ends in /submit")
+    parser.add_argument("--early-submit", type=float, default=0.2, help="fraction of candidates submitting before the deadline")
+    parser.add_argument("--timeout", type=float, default=300, help="per-request timeout, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if httpx is None:
+        print("❌ The load test needs httpx. Run: pip install httpx")
+        sys.exit(1)
+
+    target = args.url or "in-process app"
+    print(f"Simulating {args.candidates} candidates for {args.duration:.0f}s against {target}...")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
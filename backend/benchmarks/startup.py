@@ -0,0 +1,124 @@
+"""
+API cold-start profile: where import time goes and how long until /ready.
+
+Usage (from backend/):
+    python -m benchmarks.startup                 # import-time breakdown + time to ready
+    python -m benchmarks.startup --top 30 --runs 5
+
+Imports are measured with `python -X importtime -c "import main"` in a fresh
+interpreter and summarized by self time per module and per top-level package.
+
+Time to ready is measured in a fresh process each run: interpreter start,
+`import main`, then the app's lifespan start-up and background warm-up until
+every required component in /ready has finished. Runs use a throwaway
+database, so the schema is created from scratch each time (the worst case).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child: prints import and start-up timings as JSON
+READY_PROBE = """
+import asyncio, json, os, time
+t0 = time.perf_counter()
+import database
+database.DATABASE_PATH = os.environ["STARTUP_DB_PATH"]
+import main
+imported = time.perf_counter()
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        required = [c for c in main.startup_components.values() if c["required"]]
+        while any(c["status"] == "pending" for c in required):
+            await asyncio.sleep(0.002)
+        ready = time.perf_counter()
+        print(json.dumps({
+            "import_seconds": imported - t0,
+            "lifespan_seconds": ready - imported,
+            "components": main.startup_components,
+        }))
+
+asyncio.run(start())
+"""
+
+
+def import_times():
+    """(module, self_us, cumulative_us) for every module imported by `import main`"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def time_to_ready():
+    """Seconds from process launch to ready, plus the child's own breakdown"""
+    with tempfile.TemporaryDirectory(prefix="startup-") as scratch:
+        env = dict(os.environ, STARTUP_DB_PATH=os.path.join(scratch, "coding_platform.db"))
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", READY_PROBE],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        total = time.perf_counter() - start
+    # Only the last line is ours; the app may print during start-up
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["total_seconds"] = total
+    return result
+
+
+def print_import_summary(rows, top: int):
+    total_us = next((cumulative for name, _, cumulative in rows if name == "main"), 0)
+    print(f"📦 import main: {total_us / 1e6:.3f}s cumulative, {len(rows)} modules")
+
+    print(f"\nTop {top} modules by self time:")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  (cumulative {cumulative_us / 1000:9.1f} ms)  {name}")
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    print(f"\nTop {top} packages by total self time:")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20, help="modules/packages to list")
+    parser.add_argument("--runs", type=int, default=3, help="fresh-process time-to-ready runs")
+    args = parser.parse_args()
+
+    print_import_summary(import_times(), args.top)
+
+    print(f"\n⏱️  Time to ready over {args.runs} runs:")
+    runs = [time_to_ready() for _ in range(args.runs)]
+    for key, label in (("total_seconds", "process start → ready"),
+                       ("import_seconds", "import main"),
+                       ("lifespan_seconds", "start-up + warm-up")):
+        values = [run[key] for run in runs]
+        print(f"  {label:24} median {statistics.median(values):.3f}s  min {min(values):.3f}s")
+    print("\nComponents (last run):")
+    for name, component in runs[-1]["components"].items():
+        seconds = f"{component['seconds']:.4f}s" if component["seconds"] is not None else "pending"
+        flag = "" if component["required"] else " (not waited for)"
+        print(f"  {name:14} {component['status']:10} {seconds}{flag}")
+
+
+if __name__ == "__main__":
+    main()
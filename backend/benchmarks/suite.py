@@ -0,0 +1,394 @@
+"""
+Component microbenchmarks for the judge's hot paths, with regression checks.
+
+Usage (from backend/):
+    python -m benchmarks.suite run                                  # print timings
+    python -m benchmarks.suite run --save benchmarks/baseline.json  # record a baseline
+    python -m benchmarks.suite compare --baseline benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.suite run --only runner,sql --quick        # subset, fewer repeats
+
+compare runs the suite (or loads --results) and exits with status 1 when any
+benchmark is slower than its baseline by more than --threshold (0.25 = 25%).
+Timings are the median of several repeats; baselines are machine-specific,
+so only compare runs recorded on the same hardware.
+
+Groups:
+    runner     PythonRunner.run_with_input, cold (fresh process) and warm
+    compare    normalize_output / compare_outputs / compare_normalized, small and multi-MB
+    sql        execute_sql_problem_query on a large seed, compare_result_sets on 100k rows
+    excel      read_all_results / export_excel at 100, 10k and (with --full) 100k candidates
+    pdf        generate_pdf_report
+
+The app modules are imported against a throwaway database and Excel file.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Point the app at scratch storage before anything imports main/excel_service
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="bench-")
+
+import database  # noqa: E402
+import excel_service  # noqa: E402
+
+database.DATABASE_PATH = os.path.join(_SCRATCH_DIR, "coding_platform.db")
+excel_service.EXCEL_FILE_PATH = os.path.join(_SCRATCH_DIR, "assessment_results.xlsx")
+
+DEFAULT_THRESHOLD = 0.25
+EXCEL_SIZES = (100, 10000, 100000)
+
+# Registered benchmarks: name -> (group, setup). setup() returns (fn, repeats)
+# where fn() runs one timed iteration.
+BENCHMARKS: Dict[str, tuple] = {}
+
+# Benchmarks taking minutes; only run with --full or when named in --only
+SLOW_BENCHMARKS = set()
+
+
+def benchmark(name: str, group: str, slow: bool = False):
+    def register(setup):
+        BENCHMARKS[name] = (group, setup)
+        if slow:
+            SLOW_BENCHMARKS.add(name)
+        return setup
+    return register
+
+
+def measure(fn: Callable[[], None], repeats: int) -> Dict[str, float]:
+    """Median and min seconds over repeats (after an untimed warm-up call, unless it's a single slow run)"""
+    if repeats > 1:
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"seconds": statistics.median(samples), "min": min(samples), "repeats": repeats}
+
+
+# --- runner ---
+
+def _self_timed(fn: Callable[[], float]):
+    """Mark a function that returns its own measured seconds"""
+    fn.self_timed = True
+    return fn
+
+
+_COLD_RUN_SCRIPT = """
+import asyncio, time
+from runner import PythonRunner
+start = time.perf_counter()
+asyncio.run(PythonRunner().run_with_input("print(sum(map(int, input().split())))", "1 2 3"))
+print(time.perf_counter() - start)
+"""
+
+
+@benchmark("runner.run_with_input.cold", "runner")
+def bench_runner_cold():
+    """First execution in a fresh API process (imports, loop and executor start-up included)"""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run():
+        out = subprocess.run(
+            [sys.executable, "-c", _COLD_RUN_SCRIPT],
+            cwd=backend_dir, capture_output=True, text=True, check=True
+        )
+        return float(out.stdout.strip().splitlines()[-1])
+    # The subprocess reports its own timing; wrap it so measure() sees that value
+    return _self_timed(run), 5
+
+
+@benchmark("runner.run_with_input.warm", "runner")
+def bench_runner_warm():
+    from runner import PythonRunner
+    runner = PythonRunner()
+    loop = asyncio.new_event_loop()
+
+    def run():
+        loop.run_until_complete(runner.run_with_input("print(sum(map(int, input().split())))", "1 2 3"))
+    return run, 20
+
+
+# --- output comparison ---
+
+SMALL_OUTPUT = "1\n2\nFizz\n4\nBuzz\n"
+SMALL_EXPECTED = "1\n2\nFizz\n4\nBuzz"
+BIG_OUTPUT = "\n".join(f"{i} " for i in range(300000))  # ~2 MB with trailing spaces
+
+
+@benchmark("normalize_output.small", "compare")
+def bench_normalize_small():
+    from runner import normalize_output
+    return lambda: [normalize_output(SMALL_OUTPUT) for _ in range(1000)], 20
+
+
+@benchmark("normalize_output.2mb", "compare")
+def bench_normalize_big():
+    from runner import normalize_output
+    return lambda: normalize_output(BIG_OUTPUT), 10
+
+
+@benchmark("compare_outputs.small", "compare")
+def bench_compare_small():
+    from runner import compare_outputs
+    return lambda: [compare_outputs(SMALL_OUTPUT, SMALL_EXPECTED) for _ in range(1000)], 20
+
+
+@benchmark("compare_outputs.2mb", "compare")
+def bench_compare_big():
+    from runner import compare_outputs
+    actual = BIG_OUTPUT.strip()
+    return lambda: compare_outputs(actual, BIG_OUTPUT), 10
+
+
+@benchmark("compare_normalized.2mb", "compare")
+def bench_compare_normalized_big():
+    from runner import compare_normalized, normalize_output_lines
+    expected_lines = normalize_output_lines(BIG_OUTPUT)
+    actual = BIG_OUTPUT.strip()
+    return lambda: compare_normalized(actual, expected_lines), 10
+
+
+# --- SQL ---
+
+def _large_sql_problem(rows: int) -> dict:
+    rng = random.Random(1)
+    values = ",\n".join(
+        f"({i}, 'name{i}', 'dept{i % 50}', {rng.randint(30000, 90000)})" for i in range(rows)
+    )
+    return {
+        "id": f"bench_sql_{rows}",
+        "schema_sql": "CREATE TABLE employees (id INTEGER, name TEXT, department TEXT, salary INTEGER);",
+        "seed_sql": f"INSERT INTO employees VALUES\n{values};",
+    }
+
+
+@benchmark("execute_sql_problem_query.50k_seed", "sql")
+def bench_sql_query():
+    from main import execute_sql_problem_query
+    problem = _large_sql_problem(50000)
+    # The first call builds the problem's template database; the timed runs
+    # measure the warm path (a backup copy of the template per execution)
+    query = "SELECT department, COUNT(*) AS count, AVG(salary) AS avg_salary FROM employees GROUP BY department"
+    return lambda: execute_sql_problem_query(problem, query), 10
+
+
+@benchmark("compare_result_sets.100k", "sql")
+def bench_result_sets():
+    from checkers import compare_result_sets
+    rng = random.Random(1)
+    columns = ["id", "name", "department", "salary"]
+    expected = [[i, f"name{i}", f"dept{i % 50}", rng.randint(30000, 90000)] for i in range(100000)]
+    actual_columns = ["salary", "ID", "name", "Department"]
+    actual = [[r[3], r[0], r[1], r[2]] for r in expected]
+    rng.shuffle(actual)
+    return lambda: compare_result_sets(actual_columns, actual, columns, expected), 5
+
+
+# --- Excel ---
+
+def _write_excel_results(path: str, candidates: int):
+    """Write a results workbook in excel_service's layout (streamed, so 100k rows stay quick)"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    sheets = (
+        (excel_service.SHEET_TEST_SUMMARY, excel_service.TEST_SUMMARY_COLUMNS),
+        (excel_service.SHEET_PROBLEM_TESTCASES, excel_service.PROBLEM_TESTCASES_COLUMNS),
+        (excel_service.SHEET_TESTCASE_DETAILS, excel_service.TESTCASE_DETAILS_COLUMNS),
+    )
+    rng = random.Random(candidates)
+    worksheets = []
+    for title, columns in sheets:
+        ws = wb.create_sheet(title)
+        ws.append(columns)
+        worksheets.append(ws)
+    for i in range(candidates):
+        python_score, sql_score = rng.randint(0, 100), rng.randint(0, 100)
+        record = {
+            "candidate_id": f"C{i:06d}", "name": f"Candidate {i}", "email": f"c{i}@test.com",
+            "phone": "9876543210", "test_date": f"2026-02-{1 + i % 28:02d}", "login_time": "09:00",
+            "submit_time": "11:00", "submission_type": rng.choice(["Manual", "Auto"]), "time_taken_min": 120,
+            "total_questions": 10, "python_questions": 5, "sql_questions": 5,
+            "python_score": python_score, "sql_score": sql_score,
+            **excel_service.calculate_scores(python_score, sql_score),
+        }
+        worksheets[0].append([record.get(c, "") for c in excel_service.TEST_SUMMARY_COLUMNS])
+        worksheets[1].append([record["candidate_id"], record["name"], 2, 2, 5, 9, 3, 9, 10, 20])
+        worksheets[2].append([record["candidate_id"], record["name"]] + [rng.randint(0, 5) for _ in range(10)])
+    wb.save(path)
+
+
+def _excel_benchmarks():
+    for size in EXCEL_SIZES:
+        label = f"{size // 1000}k" if size >= 1000 else str(size)
+        repeats = 10 if size <= 100 else 3 if size <= 10000 else 1
+
+        def prepare(size=size):
+            path = os.path.join(_SCRATCH_DIR, f"results_{size}.xlsx")
+            if not os.path.exists(path):
+                _write_excel_results(path, size)
+            excel_service.EXCEL_FILE_PATH = path
+
+        def read_setup(prepare=prepare, repeats=repeats):
+            prepare()
+            return excel_service.read_all_results, repeats
+
+        def export_setup(prepare=prepare, repeats=repeats):
+            prepare()
+            return excel_service.export_excel, repeats
+
+        slow = size > 10000
+        benchmark(f"read_all_results.{label}", "excel", slow)(read_setup)
+        benchmark(f"export_excel.{label}", "excel", slow)(export_setup)
+
+
+_excel_benchmarks()
+
+
+# --- PDF ---
+
+@benchmark("generate_pdf_report.200_candidates", "pdf")
+def bench_pdf():
+    from main import generate_pdf_report
+    rng = random.Random(1)
+    candidates = []
+    for i in range(200):
+        problems = [
+            {
+                "name": f"Candidate {i}", "email": f"c{i}@gmail.com", "problem_id": f"problem_{p}",
+                "best_score": rng.choice([0, 50, 100]), "passed_tests": 2, "total_tests": 3,
+                "verdict": "Partial", "execution_time_ms": 40.0, "time_taken": 600,
+                "cpu_time_ms": 35.0, "peak_memory_kb": 13000,
+            }
+            for p in range(10)
+        ]
+        avg = sum(p["best_score"] for p in problems) / len(problems)
+        candidates.append({"name": f"Candidate {i}", "email": f"c{i}@gmail.com", "problems": problems, "avg_score": avg})
+    return lambda: generate_pdf_report(candidates), 3
+
+
+# --- running and comparing ---
+
+def run_suite(names: List[str], quick: bool = False) -> Dict[str, dict]:
+    results = {}
+    for name in names:
+        group, setup = BENCHMARKS[name]
+        fn, repeats = setup()
+        if quick:
+            repeats = max(1, repeats // 4)
+        if getattr(fn, "self_timed", False):
+            samples = [fn() for _ in range(repeats)]
+            result = {"seconds": statistics.median(samples), "min": min(samples), "repeats": repeats}
+        else:
+            result = measure(fn, repeats)
+        results[name] = result
+        print(f"  {name:<44} {result['seconds'] * 1000:>12.3f} ms   (min {result['min'] * 1000:.3f}, n={repeats})", flush=True)
+    return results
+
+
+def select(only: Optional[str], full: bool = False) -> List[str]:
+    if not only:
+        return [n for n in BENCHMARKS if full or n not in SLOW_BENCHMARKS]
+    wanted = [w.strip() for w in only.split(",") if w.strip()]
+    names = [
+        n for n, (group, _) in BENCHMARKS.items()
+        if n in wanted or (group in wanted and (full or n not in SLOW_BENCHMARKS))
+    ]
+    unknown = [w for w in wanted if w not in BENCHMARKS and all(g != w for g, _ in BENCHMARKS.values())]
+    if unknown:
+        print(f"❌ Unknown benchmark or group: {', '.join(unknown)}")
+        sys.exit(2)
+    return names
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Print current vs baseline; returns names regressed beyond threshold"""
+    regressions = []
+    print(f"\n  {'benchmark':<44} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name:<44} {'-':>12} {result['seconds'] * 1000:>12.3f}      new")
+            continue
+        change = result["seconds"] / base["seconds"] - 1 if base["seconds"] else 0.0
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  ❌"
+        print(f"  {name:<44} {base['seconds'] * 1000:>12.3f} {result['seconds'] * 1000:>12.3f} {change:>+7.1%}{marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run benchmarks")
+    run_parser.add_argument("--save", help="write results as a JSON baseline to this path")
+
+    compare_parser = sub.add_parser("compare", help="run (or load) results and compare with a baseline")
+    compare_parser.add_argument("--baseline", required=True, help="baseline JSON written by 'run --save'")
+    compare_parser.add_argument("--results", help="compare this results JSON instead of running the suite")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="allowed slowdown as a fraction (default %(default)s)")
+
+    for p in (run_parser, compare_parser):
+        p.add_argument("--only", help="comma-separated benchmark names or groups")
+        p.add_argument("--quick", action="store_true", help="fewer repeats")
+        p.add_argument("--full", action="store_true", help="include the 100k-candidate Excel benchmarks (several minutes)")
+    args = parser.parse_args()
+
+    if args.command == "compare" and args.results:
+        with open(args.results) as f:
+            results = json.load(f)["benchmarks"]
+        if args.only:
+            names = set(select(args.only, full=True))
+            results = {n: r for n, r in results.items() if n in names}
+    else:
+        names = select(args.only, args.full)
+        print(f"Running {len(names)} benchmarks...")
+        results = run_suite(names, quick=args.quick)
+
+    if args.command == "run":
+        if args.save:
+            with open(args.save, "w") as f:
+                json.dump({"environment": environment(), "benchmarks": results}, f, indent=2)
+            print(f"\n✅ Baseline written to {args.save}")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    recorded = baseline.get("environment", {})
+    if recorded.get("cpu_count") != os.cpu_count() or recorded.get("python") != platform.python_version():
+        print(f"⚠️  Baseline was recorded on different hardware or Python ({recorded.get('platform')}, "
+              f"Python {recorded.get('python')}, {recorded.get('cpu_count')} CPUs)")
+    regressions = compare(results, baseline["benchmarks"], args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
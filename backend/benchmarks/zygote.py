@@ -0,0 +1,104 @@
+"""
+Per-run latency of the zygote backend against a fresh interpreter per run.
+
+Usage (from backend/):
+    python -m benchmarks.zygote
+    python -m benchmarks.zygote --runs 200 --concurrency 16
+
+Both backends run the same snippet - typical candidate imports plus a little
+work - through PythonRunner.run_with_input: "pidfd" starts `python -c` for
+every run, "zygote" forks from the preloaded template process. Prints
+median/p95 latency for sequential runs and throughput with --concurrency
+runs in flight. Every result is checked, so a wrong answer fails the run
+(exit status 1).
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import zygote
+from runner import RUNNER_BACKEND, PythonRunner
+
+JOB_CODE = """
+import collections, heapq, bisect, itertools, math, re
+from functools import lru_cache
+n = int(input())
+heap = list(range(n, 0, -1))
+heapq.heapify(heap)
+counts = collections.Counter(x % 7 for x in heap)
+print(heapq.heappop(heap), counts[0], math.isqrt(n))
+"""
+JOB_INPUT = "1000"
+EXPECTED = "1 142 31"
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_once(runner: PythonRunner) -> float:
+    start = time.perf_counter()
+    result = await runner.run_with_input(JOB_CODE, JOB_INPUT)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result["stdout"].strip() != EXPECTED:
+        raise SystemExit(f"❌ {runner.backend}: unexpected result {result}")
+    return elapsed
+
+
+async def measure(backend: str, runs: int, concurrency: int) -> dict:
+    runner = PythonRunner()
+    runner.backend = backend
+    await run_once(runner)  # warm-up (starts the zygote)
+
+    latencies = [await run_once(runner) for _ in range(runs)]
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def bounded():
+        async with slots:
+            await run_once(runner)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[bounded() for _ in range(runs)])
+    elapsed = time.perf_counter() - start
+    return {
+        "median": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "throughput": runs / elapsed,
+    }
+
+
+async def main_async(args) -> int:
+    if RUNNER_BACKEND == "thread":
+        print("⚠️  pidfd is not available here; the zygote backend needs Linux 5.3+")
+        return 1
+    print(f"📦 Zygote preload: {os.environ.get(zygote.PRELOAD_ENV, zygote.DEFAULT_PRELOAD)}")
+    results = {}
+    try:
+        for backend in ("pidfd", "zygote"):
+            results[backend] = await measure(backend, args.runs, args.concurrency)
+            r = results[backend]
+            print(f"✅ {backend:>6}: median {r['median']:.1f} ms, p95 {r['p95']:.1f} ms, "
+                  f"{r['throughput']:.0f} runs/s at concurrency {args.concurrency}")
+    finally:
+        zygote.stop_zygote()
+    speedup = results["pidfd"]["median"] / results["zygote"]["median"]
+    print(f"\n🚀 Zygote median latency is {speedup:.1f}x lower than a fresh interpreter per run")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
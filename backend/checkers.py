@@ -0,0 +1,288 @@
+"""
+Output checkers (special judges) for Python problems.
+
+A problem picks its checker with an optional "checker" field in problems.py:
+
+    "checker": "tokens"
+    "checker": {"type": "float", "abs_tol": 1e-6, "rel_tol": 1e-9}
+    "checker": {"type": "unordered_lines"}
+    "checker": {"type": "custom", "name": "any_valid_pair"}
+
+Custom checkers are Python functions check(input_text, expected, actual)
+registered in code with @register_checker("name") and referenced by name, so
+a problem definition (including one added through /hr/problems) can only pick
+from them - it never carries code of its own.
+
+Problems without a checker keep the exact normalized comparison. Checkers are
+built once per problem load and cached for the life of the process; they run
+in-process, so judging never costs an extra subprocess.
+
+SQL problems are judged by compare_result_sets. A problem or a single test
+case can set "order_sensitive": True (for ORDER BY problems) and
+"float_tolerance": 1e-6 (for REAL columns).
+"""
+
+import math
+from collections import Counter
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Sequence
+
+from runner import compare_normalized, normalize_output_lines
+
+# A built checker takes (test_case, actual_stdout) and returns True on accept
+Checker = Callable[[dict, str], bool]
+
+DEFAULT_CHECKER = "exact"
+
+# problem_id -> built checker
+_checker_cache: Dict[str, Checker] = {}
+
+# name -> check(input_text, expected_output, actual_output), see register_checker
+CUSTOM_CHECKERS: Dict[str, Callable[[str, str, str], bool]] = {}
+
+
+class CheckerError(ValueError):
+    """Raised when a problem declares an invalid checker"""
+
+
+def _exact_checker(options: dict) -> Checker:
+    def check(test_case: dict, actual: str) -> bool:
+        expected_lines = test_case.get("expected_lines")
+        if expected_lines is None:
+            expected_lines = normalize_output_lines(test_case["output"])
+        return compare_normalized(actual, expected_lines)
+    return check
+
+
+def _tokens_checker(options: dict) -> Checker:
+    """Whitespace-insensitive: compares the sequence of whitespace-separated tokens"""
+    ignore_case = options.get("ignore_case", False)
+
+    def check(test_case: dict, actual: str) -> bool:
+        expected = test_case["output"] or ""
+        actual = actual or ""
+        if ignore_case:
+            expected, actual = expected.lower(), actual.lower()
+        return actual.split() == expected.split()
+    return check
+
+
+def _float_checker(options: dict) -> Checker:
+    """Token-wise comparison where numeric tokens may differ within a tolerance"""
+    abs_tol = float(options.get("abs_tol", 1e-6))
+    rel_tol = float(options.get("rel_tol", 1e-9))
+
+    def tokens_match(actual_token: str, expected_token: str) -> bool:
+        if actual_token == expected_token:
+            return True
+        try:
+            a, e = float(actual_token), float(expected_token)
+        except ValueError:
+            return False
+        if math.isnan(a) or math.isnan(e):
+            return math.isnan(a) and math.isnan(e)
+        return math.isclose(a, e, rel_tol=rel_tol, abs_tol=abs_tol)
+
+    def check(test_case: dict, actual: str) -> bool:
+        actual_tokens = (actual or "").split()
+        expected_tokens = (test_case["output"] or "").split()
+        if len(actual_tokens) != len(expected_tokens):
+            return False
+        return all(tokens_match(a, e) for a, e in zip(actual_tokens, expected_tokens))
+    return check
+
+
+def _unordered_lines_checker(options: dict) -> Checker:
+    """Accepts the expected lines in any order (blank lines ignored)"""
+    def check(test_case: dict, actual: str) -> bool:
+        expected_lines = test_case.get("expected_lines")
+        if expected_lines is None:
+            expected_lines = normalize_output_lines(test_case["output"])
+        actual_lines = normalize_output_lines(actual)
+        return sorted(filter(None, actual_lines)) == sorted(filter(None, expected_lines))
+    return check
+
+
+def register_checker(name: str):
+    """Decorator registering check(input_text, expected_output, actual_output) as a custom checker"""
+    def register(fn):
+        CUSTOM_CHECKERS[name] = fn
+        return fn
+    return register
+
+
+def _custom_checker(options: dict) -> Checker:
+    """Wrap a registered check(input_text, expected_output, actual_output), looked up by its "name" option"""
+    if "source" in options or "function" in options:
+        raise CheckerError("Custom checkers are referenced by name; checker code in problem definitions is not accepted")
+    fn = CUSTOM_CHECKERS.get(options.get("name"))
+    if fn is None:
+        raise CheckerError(f"Unknown custom checker: {options.get('name')!r} (known: {', '.join(sorted(CUSTOM_CHECKERS)) or 'none'})")
+
+    def check(test_case: dict, actual: str) -> bool:
+        try:
+            return bool(fn(test_case.get("input", ""), test_case.get("output", ""), actual or ""))
+        except Exception:
+            # A checker that chokes on malformed output rejects it
+            return False
+    return check
+
+
+CHECKER_TYPES: Dict[str, Callable[[dict], Checker]] = {
+    "exact": _exact_checker,
+    "tokens": _tokens_checker,
+    "float": _float_checker,
+    "unordered_lines": _unordered_lines_checker,
+    "custom": _custom_checker,
+}
+
+
+def build_checker(spec) -> Checker:
+    """Build a checker from a problem's "checker" field (None, a type name or an options dict)"""
+    if spec is None:
+        spec = DEFAULT_CHECKER
+    options = {"type": spec} if isinstance(spec, str) else dict(spec)
+    checker_type = options.get("type", DEFAULT_CHECKER)
+    factory = CHECKER_TYPES.get(checker_type)
+    if factory is None:
+        raise CheckerError(f"Unknown checker type: {checker_type}")
+    return factory(options)
+
+
+def load_checker(problem: dict) -> Checker:
+    """Build (or rebuild) the checker for a problem and cache it for the process"""
+    checker = build_checker(problem.get("checker"))
+    _checker_cache[problem["id"]] = checker
+    return checker
+
+
+def get_checker(problem: dict) -> Checker:
+    """Cached checker for a problem, loading it on first use"""
+    checker = _checker_cache.get(problem["id"])
+    if checker is None:
+        checker = load_checker(problem)
+    return checker
+
+
+def unload_checker(problem_id: str) -> Optional[Checker]:
+    """Drop a cached checker (e.g. when a problem is deleted)"""
+    return _checker_cache.pop(problem_id, None)
+
+
+def check_output(problem: dict, test_case: dict, actual: str) -> bool:
+    """Judge one test case's stdout with the problem's checker"""
+    return get_checker(problem)(test_case, actual)
+
+
+# --- SQL result sets ---
+
+def normalize_sql_value(v):
+    """Normalize SQL value for comparison (trim strings)"""
+    if isinstance(v, str):
+        return v.strip()
+    return v
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _values_close(a, e, tolerance: float) -> bool:
+    """Numbers within the tolerance of each other (NaN only matches NaN); anything else exactly"""
+    if _is_number(a) and _is_number(e):
+        if math.isnan(a) or math.isnan(e):
+            return math.isnan(a) and math.isnan(e)
+        return a == e or abs(a - e) <= tolerance
+    return normalize_sql_value(a) == normalize_sql_value(e)
+
+
+def _sort_key(row: Sequence) -> tuple:
+    """Total order over mixed-type rows: NULLs, then numbers, then text, then anything else"""
+    key = []
+    for v in row:
+        if v is None:
+            key.append((0, 0))
+        elif _is_number(v):
+            key.append((1, v) if not math.isnan(v) else (2, 0))
+        elif isinstance(v, str):
+            key.append((3, v.strip()))
+        else:
+            key.append((4, repr(v)))
+    return tuple(key)
+
+
+def compare_result_sets(
+    actual_columns: Sequence[str],
+    actual_rows: Sequence[Sequence],
+    expected_columns: Sequence[str],
+    expected_rows: Sequence[Sequence],
+    order_sensitive: bool = False,
+    float_tolerance: Optional[float] = None,
+) -> bool:
+    """
+    Compare SQL result sets.
+
+    Columns are matched by name (case/space-insensitive, any order). Rows are
+    compared as a multiset by counting normalized row tuples - O(n), no sorting -
+    unless order_sensitive is set. With float_tolerance, numbers match when
+    they are within the tolerance of each other; rows are then compared
+    pairwise, after sorting both sides unless order_sensitive is set.
+    """
+    if len(actual_rows) != len(expected_rows):
+        return False
+
+    # Normalize column names
+    actual_cols_norm = [c.strip().lower() for c in actual_columns]
+    expected_cols_norm = [c.strip().lower() for c in expected_columns]
+
+    if set(actual_cols_norm) != set(expected_cols_norm):
+        return False
+
+    # Map actual columns to expected order
+    index_map = {name: idx for idx, name in enumerate(actual_cols_norm)}
+    indices = [index_map[col] for col in expected_cols_norm]
+    if len(indices) == 1:
+        only = indices[0]
+        project = lambda row: (row[only],)
+    else:
+        project = itemgetter(*indices)
+
+    if float_tolerance:
+        actual = [project(row) for row in actual_rows]
+        expected = list(expected_rows)
+        if not order_sensitive:
+            actual.sort(key=_sort_key)
+            expected.sort(key=_sort_key)
+        return all(
+            len(a) == len(e) and all(_values_close(x, y, float_tolerance) for x, y in zip(a, e))
+            for a, e in zip(actual, expected)
+        )
+
+    normalize = normalize_sql_value
+    actual_keys = (tuple(map(normalize, project(row))) for row in actual_rows)
+
+    if order_sensitive:
+        return all(a == tuple(map(normalize, e)) for a, e in zip(actual_keys, expected_rows))
+
+    # Ignore row order: compare as multisets of row tuples
+    remaining = Counter(actual_keys)
+    for row in expected_rows:
+        k = tuple(map(normalize, row))
+        count = remaining.get(k, 0)
+        if count == 0:
+            return False
+        remaining[k] = count - 1
+    return True
+
+
+def check_result_set(problem: dict, test_case: dict, columns: List[str], rows: List[list]) -> bool:
+    """Judge one SQL test case; options on the test case override the problem's"""
+    def option(name, default):
+        return test_case.get(name, problem.get(name, default))
+
+    return compare_result_sets(
+        columns, rows,
+        test_case.get("expected_columns", []), test_case.get("expected_rows", []),
+        order_sensitive=option("order_sensitive", False),
+        float_tolerance=option("float_tolerance", None),
+    )
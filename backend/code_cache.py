@@ -0,0 +1,80 @@
+"""
+Compiled-code cache for candidate source.
+
+The same source is executed once per test, again on every resubmission and
+again at exam submit or re-judging. Instead of every child compiling it
+from scratch, the API process compiles it once, keeps the marshaled code
+object and hands that to the children, which only unmarshal and exec it.
+
+Entries are keyed by the source's SHA-256 and the interpreter's bytecode
+magic number (marshaled code is only valid for the interpreter version that
+produced it; children run sys.executable, the same interpreter). The cache
+is an LRU capped by total marshaled size. Source that doesn't compile is
+not cached: the error surfaces to the caller (check_syntax) as before.
+"""
+
+import hashlib
+import marshal
+import threading
+from collections import OrderedDict
+from importlib.util import MAGIC_NUMBER
+
+from metrics import Counter, Gauge
+
+MAX_CACHE_BYTES = 32 * 1024 * 1024  # total marshaled size kept
+
+CODE_CACHE_LOOKUPS = Counter("judge_code_cache_total", "Compiled-code cache lookups by outcome: hit, miss", ("outcome",))
+
+
+def cache_key(source: str) -> str:
+    digest = hashlib.sha256(MAGIC_NUMBER)
+    digest.update(source.encode("utf-8", errors="surrogatepass"))
+    return digest.hexdigest()
+
+
+class CodeCache:
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()  # key -> marshaled code
+        self._lock = threading.Lock()  # the thread backend spawns from executor threads
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, source: str) -> bytes:
+        """
+        Marshaled code object for `source`, compiled like `python -c` does
+        (filename "<string>"). Raises what compile() raises.
+        """
+        key = cache_key(source)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                CODE_CACHE_LOOKUPS.inc(outcome="hit")
+                return data
+        CODE_CACHE_LOOKUPS.inc(outcome="miss")
+        data = marshal.dumps(compile(source, '<string>', 'exec', dont_inherit=True))
+        if len(data) > self.max_bytes:
+            return data
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self.size += len(data)
+            self._entries.move_to_end(key)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+code_cache = CodeCache()
+
+Gauge("judge_code_cache_bytes", "Marshaled code held by the compiled-code cache", function=lambda: code_cache.size)
+Gauge("judge_code_cache_entries", "Sources held by the compiled-code cache", function=lambda: len(code_cache))
@@ -0,0 +1,208 @@
+"""
+Cohort provisioning: create a hiring drive's candidates ahead of time and
+pre-issue their session tokens.
+
+Usage (from backend/):
+    python cohort.py cohort.csv --out tokens.csv             # CSV with name,email columns
+    python cohort.py cohort.csv --out tokens.csv --ttl-hours 48
+
+The API does the same with POST /hr/cohort (CSV request body).
+
+All candidates are inserted in one transaction (existing emails are kept
+as they are), and each gets a signed session token:
+
+    st1.<user_id>.<expires unix time>.<HMAC-SHA256, base64url>
+
+A token is verified statelessly - signature and expiry, no lookup - so a
+candidate signing in with one (POST /login/token) costs no database write,
+however many log in at the same moment. Tokens can't be revoked one by one;
+changing the secret invalidates all of them, and none is honoured for longer
+than MAX_TTL_HOURS past the moment it is checked, whatever it claims.
+
+Candidate code runs as the same user as the API, so the secret is kept out
+of its reach: it comes from SESSION_TOKEN_SECRET, which is removed from the
+environment once read and never passed to child processes, and the process
+holding it is made non-dumpable (no /proc/<pid>/environ or memory access).
+Without the variable the API signs with a random key of its own; this CLI
+and multi-worker mode need the variable so every process agrees on it.
+"""
+
+import argparse
+import base64
+import csv
+import ctypes
+import hashlib
+import hmac
+import io
+import os
+import secrets
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import database
+
+SECRET_ENV = "SESSION_TOKEN_SECRET"
+TOKEN_PREFIX = "st1."
+DEFAULT_TTL_HOURS = 24
+MAX_TTL_HOURS = 7 * 24
+MAX_COHORT_SIZE = 10000
+QUERY_CHUNK = 500  # emails per SELECT ... IN (...), under SQLite's parameter limit
+
+PR_SET_DUMPABLE = 4
+
+_secret: Optional[bytes] = None
+_secret_configured = False
+
+
+def _make_undumpable():
+    """Linux: stop other processes of this user reading our memory and environment"""
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL(None).prctl(PR_SET_DUMPABLE, 0, 0, 0, 0)
+        except (OSError, AttributeError):
+            pass
+
+
+def session_secret() -> bytes:
+    """The token signing key (env, removed once read; else random and per-process)"""
+    global _secret, _secret_configured
+    if _secret is None:
+        _make_undumpable()
+        configured = os.environ.pop(SECRET_ENV, "")
+        _secret_configured = bool(configured)
+        _secret = configured.encode() if configured else secrets.token_bytes(32)
+    return _secret
+
+
+def secret_configured() -> bool:
+    """Whether the key came from SESSION_TOKEN_SECRET (shared) rather than this process"""
+    session_secret()
+    return _secret_configured
+
+
+def _signature(payload: str) -> str:
+    digest = hmac.new(session_secret(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def issue_token(user_id: int, expires_at: int) -> str:
+    payload = f"{TOKEN_PREFIX}{user_id}.{expires_at}"
+    return f"{payload}.{_signature(payload)}"
+
+
+def is_token(session_id: Optional[str]) -> bool:
+    return bool(session_id) and session_id.startswith(TOKEN_PREFIX)
+
+
+def token_user(token: str) -> Optional[int]:
+    """The token's user id if its signature is valid and it hasn't expired"""
+    payload, _, signature = token.rpartition(".")
+    parts = payload[len(TOKEN_PREFIX):].split(".")
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        return None
+    if not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    user_id, expires_at = map(int, parts)
+    now = time.time()
+    return user_id if now < expires_at <= now + MAX_TTL_HOURS * 3600 else None
+
+
+def parse_cohort_csv(text: str) -> List[Tuple[str, str]]:
+    """(name, email) rows from CSV with name and email columns; ValueError on bad input"""
+    reader = csv.DictReader(io.StringIO(text.lstrip("﻿")))
+    columns = {(field or "").strip().lower(): field for field in reader.fieldnames or []}
+    if "name" not in columns or "email" not in columns:
+        raise ValueError("CSV needs a header row with 'name' and 'email' columns")
+
+    candidates, seen = [], set()
+    for row in reader:
+        name = (row[columns["name"]] or "").strip()
+        email = (row[columns["email"]] or "").strip()
+        if not name and not email:
+            continue
+        if not name or "@" not in email:
+            raise ValueError(f"Line {reader.line_num}: a name and a valid email are required")
+        if email not in seen:
+            seen.add(email)
+            candidates.append((name, email))
+    if len(candidates) > MAX_COHORT_SIZE:
+        raise ValueError(f"Cohort too large ({len(candidates)} candidates, limit {MAX_COHORT_SIZE})")
+    return candidates
+
+
+def provision_cohort(conn: sqlite3.Connection, candidates: List[Tuple[str, str]],
+                     ttl_hours: float = DEFAULT_TTL_HOURS) -> Dict:
+    """Create the users that don't exist yet in one transaction and issue everyone a token"""
+    if not 0 < ttl_hours <= MAX_TTL_HOURS:
+        raise ValueError(f"ttl_hours must be between 0 and {MAX_TTL_HOURS}")
+    cursor = conn.cursor()
+    before = conn.total_changes
+    cursor.executemany(
+        "INSERT OR IGNORE INTO users (name, email, created_at) VALUES (?, ?, ?)",
+        [(name, email, datetime.now().isoformat()) for name, email in candidates]
+    )
+    created = conn.total_changes - before
+    conn.commit()
+
+    user_ids = {}
+    emails = [email for _, email in candidates]
+    for start in range(0, len(emails), QUERY_CHUNK):
+        chunk = emails[start:start + QUERY_CHUNK]
+        cursor.execute(f"SELECT id, email FROM users WHERE email IN ({','.join('?' * len(chunk))})", chunk)
+        user_ids.update({email: user_id for user_id, email in cursor.fetchall()})
+    cursor.close()
+
+    expires_at = int(time.time() + ttl_hours * 3600)
+    return {
+        "created": created,
+        "existing": len(candidates) - created,
+        "expires_at": datetime.fromtimestamp(expires_at).isoformat(),
+        "candidates": [
+            {"name": name, "email": email, "user_id": user_ids[email],
+             "session_id": issue_token(user_ids[email], expires_at)}
+            for name, email in candidates
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv", help="cohort CSV with name and email columns")
+    parser.add_argument("--out", required=True, help="where to write name,email,user_id,session_id")
+    parser.add_argument("--ttl-hours", type=float, default=DEFAULT_TTL_HOURS, help="token lifetime")
+    args = parser.parse_args()
+
+    if not 0 < args.ttl_hours <= MAX_TTL_HOURS:
+        parser.error(f"--ttl-hours must be between 0 and {MAX_TTL_HOURS}")
+    if not secret_configured():
+        print(f"❌ Set {SECRET_ENV} to the API's value; tokens signed with any other key are rejected")
+        sys.exit(1)
+
+    with open(args.csv, encoding="utf-8") as f:
+        try:
+            candidates = parse_cohort_csv(f.read())
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+    database.init_db()
+    conn = sqlite3.connect(database.DATABASE_PATH)
+    try:
+        result = provision_cohort(conn, candidates, args.ttl_hours)
+    finally:
+        conn.close()
+
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "email", "user_id", "session_id"])
+        writer.writeheader()
+        writer.writerows(result["candidates"])
+    print(f"✅ {len(candidates)} candidates ({result['created']} new, {result['existing']} existing), "
+          f"tokens valid until {result['expires_at']}")
+    print(f"📄 Tokens written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Adaptive concurrency limit for the judge.
+
+Instead of a hard-coded slot count, the limiter periodically resizes the
+admission controller's pool using a gradient rule (in the spirit of Netflix's
+concurrency-limits "Gradient2"):
+
+    new_limit = limit * gradient + sqrt(limit)
+
+where gradient = baseline_latency / recent_latency, clamped to [0.5, 1].
+While executions run as fast as the best we've seen, the limit grows by
+roughly sqrt(limit) per interval; once they start queueing for CPU and slow
+down, the gradient pulls the limit back. Latency is tracked per execution
+class, since a /submit holds its slot for every test case and a /run for one.
+
+Two host signals override the gradient: when the CPU run queue (or the 1 min
+load average where /proc is unavailable) exceeds OVERLOAD_RUN_QUEUE per core
+the limit backs off multiplicatively, and the limit never grows while the
+pool isn't actually being used (no queue and less than half the slots busy).
+Bounds scale with the core count, so the same deployment settles at a sane
+level on a 4-core or a 64-core box.
+"""
+
+import asyncio
+import math
+import os
+from typing import Dict, List, Optional
+
+from admission import AdmissionController
+
+CPU_COUNT = os.cpu_count() or 1
+
+MIN_LIMIT = 2
+MAX_LIMIT = CPU_COUNT * 4
+INITIAL_LIMIT = min(MAX_LIMIT, max(MIN_LIMIT, CPU_COUNT))
+
+ADJUST_INTERVAL_SECONDS = 1.0
+SMOOTHING = 0.2             # weight of each new estimate in the limit
+BASELINE_RISE = 0.02        # how fast the baseline latency follows slower samples
+MIN_GRADIENT = 0.5
+OVERLOAD_RUN_QUEUE = 1.5    # runnable tasks per core above which we back off
+OVERLOAD_BACKOFF = 0.9
+
+
+def run_queue_per_cpu() -> Optional[float]:
+    """Runnable tasks per core: /proc/loadavg's instantaneous count, else the 1 min load average"""
+    try:
+        with open("/proc/loadavg") as f:
+            running = int(f.read().split()[3].split("/")[0])
+        # Exclude the reader itself
+        return max(0, running - 1) / CPU_COUNT
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.getloadavg()[0] / CPU_COUNT
+    except (OSError, AttributeError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """Tunes an AdmissionController's capacity from latency, queue depth and host load"""
+
+    def __init__(
+        self,
+        admission: AdmissionController,
+        min_limit: int = MIN_LIMIT,
+        max_limit: int = MAX_LIMIT,
+        initial_limit: int = INITIAL_LIMIT,
+    ):
+        self.admission = admission
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max_limit, max(min_limit, initial_limit)))
+        self._samples: Dict[str, List[float]] = {}
+        self._baseline: Dict[str, float] = {}  # slowly-rising minimum latency per class
+        self.last_gradient = 1.0
+        self.last_run_queue: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+        admission.on_release = self.record
+        admission.set_capacity(self.capacity)
+
+    @property
+    def capacity(self) -> int:
+        return int(round(self.limit))
+
+    def record(self, execution_class: str, service_seconds: float):
+        self._samples.setdefault(execution_class, []).append(service_seconds)
+
+    def _gradient(self) -> Optional[float]:
+        """Sample-weighted baseline/recent latency ratio over this interval's samples"""
+        samples, self._samples = self._samples, {}
+        weighted, total = 0.0, 0
+        for execution_class, values in samples.items():
+            recent = sum(values) / len(values)
+            baseline = self._baseline.get(execution_class)
+            if baseline is None or recent < baseline:
+                baseline = recent
+            else:
+                baseline += (recent - baseline) * BASELINE_RISE
+            self._baseline[execution_class] = baseline
+            if recent > 0:
+                weighted += min(1.0, baseline / recent) * len(values)
+                total += len(values)
+        if not total:
+            return None
+        return max(MIN_GRADIENT, weighted / total)
+
+    def adjust(self):
+        """One control step; returns the new capacity"""
+        gradient = self._gradient()
+        self.last_run_queue = run_queue_per_cpu()
+        demand = self.admission.in_flight + self.admission.queue_depth()
+
+        if self.last_run_queue is not None and self.last_run_queue > OVERLOAD_RUN_QUEUE:
+            new_limit = self.limit * OVERLOAD_BACKOFF
+        elif gradient is None:
+            return self.capacity  # nothing finished this interval, nothing to learn
+        else:
+            self.last_gradient = gradient
+            new_limit = self.limit * gradient + math.sqrt(self.limit)
+            if new_limit > self.limit and demand < self.limit / 2:
+                # Idle pool: a fast run says nothing about what more load would do
+                new_limit = self.limit
+            new_limit = self.limit * (1 - SMOOTHING) + new_limit * SMOOTHING
+
+        self.limit = min(self.max_limit, max(self.min_limit, new_limit))
+        if self.capacity != self.admission.capacity:
+            self.admission.set_capacity(self.capacity)
+        return self.capacity
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(ADJUST_INTERVAL_SECONDS)
+            self.adjust()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            "limit": self.capacity,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.admission.in_flight,
+            "queued": self.admission.queue_depth(),
+            "gradient": round(self.last_gradient, 3),
+            "run_queue_per_cpu": None if self.last_run_queue is None else round(self.last_run_queue, 2),
+        }
@@ -1,6 +1,10 @@
 import sqlite3
+import time
 from contextlib import contextmanager
 
+import tracing
+from metrics import DB_COMMIT_SECONDS
+
 DATABASE_PATH = "coding_platform.db"
 
 def init_db():
@@ -58,6 +62,26 @@ def init_db():
         )
     """)
 
+    # Per-test-case resource usage (one row per executed test case)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS test_case_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            submission_id INTEGER NOT NULL,
+            test_case INTEGER NOT NULL,
+            passed INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            wall_time_ms REAL DEFAULT 0,
+            cpu_user_ms REAL,
+            cpu_sys_ms REAL,
+            peak_memory_kb INTEGER,
+            FOREIGN KEY (submission_id) REFERENCES submissions (id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_test_case_results_submission
+        ON test_case_results (submission_id)
+    """)
+
     # Migration: Add new columns if they don't exist (for existing DB)
     migration_columns = [
         ("submissions", "time_taken", "INTEGER DEFAULT 0"),
@@ -68,18 +92,44 @@ def init_db():
         ("hr_results", "execution_time_ms", "REAL DEFAULT 0"),
     ]
     
+    existing = {}
     for table, column, col_type in migration_columns:
-        try:
+        if table not in existing:
+            existing[table] = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        if column not in existing[table]:
             cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
 
     conn.commit()
     conn.close()
 
+def warm_db():
+    """Pull the database file into the OS page cache and check it opens,
+    so early requests after a deploy don't wait on cold disk reads"""
+    conn = sqlite3.connect(DATABASE_PATH)
+    try:
+        conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+    finally:
+        conn.close()
+    with open(DATABASE_PATH, "rb") as f:
+        while f.read(1 << 20):
+            pass
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that records commit latency"""
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            with tracing.span("db.commit"):
+                super().commit()
+        finally:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - start)
+
+
 def get_db():
     """Dependency for getting database connection"""
-    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, factory=TimedConnection)
     try:
         yield conn
     finally:
@@ -0,0 +1,295 @@
+"""
+Judge nodes: run candidate code on separate worker processes/machines
+instead of the API host.
+
+The API process runs a JudgeCoordinator listening on a TCP or Unix socket;
+judge nodes (judge_node.py) connect to it. Messages are JSON objects, one
+per line:
+
+    node -> coordinator  {"type": "register", "node_id", "slots", "token", "protocol"}
+    coordinator -> node  {"type": "registered", "heartbeat_interval"}
+    node -> coordinator  {"type": "heartbeat", "running"}
+    coordinator -> node  {"type": "job", "job_id", "code", "inputs", "memory_limit", "output_limit"}
+    node -> coordinator  {"type": "result", "job_id", "results"}
+    coordinator -> node  {"type": "error", "detail"}          (then closes)
+
+A job is one submission: the code, every test input and the limits. The
+node runs the inputs in order and answers with one PythonRunner result dict
+per input. Jobs go to the node with the lowest in-flight/slots ratio and
+wait here while every node's slots are busy, so a node never queues. When a
+node disconnects or misses heartbeats its unfinished jobs are resubmitted to
+another node; with no node registered, jobs run on the API host as before.
+
+Enable by setting JUDGE_COORDINATOR to "tcp://host:port" or
+"unix:/path/to/socket". JUDGE_TOKEN, a shared secret, is required for TCP:
+a node sees every submission and hidden test input and its results are
+trusted, so the coordinator refuses to listen on TCP without one. Results
+that don't match the job (count, fields, types) count as the node lost.
+"""
+
+import asyncio
+import hmac
+import itertools
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import tracing
+from metrics import Counter, Gauge
+from runner import PythonRunner
+
+PROTOCOL_VERSION = 2  # 2: jobs carry output_limit
+HEARTBEAT_INTERVAL_SECONDS = 2.0
+HEARTBEAT_MISSES = 3  # heartbeats a node may miss before it is declared lost
+MAX_ATTEMPTS = 3  # nodes a job is tried on before it runs on the API host
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024  # a job carries every test input
+
+COORDINATOR_ENV = "JUDGE_COORDINATOR"
+TOKEN_ENV = "JUDGE_TOKEN"
+
+# What main.py reads from each result (see PythonRunner._result)
+RESULT_FIELDS = {
+    "status": str, "stdout": str, "stderr": str, "verdict": (str, type(None)),
+    "wall_time_ms": (int, float), "cpu_user_ms": (int, float, type(None)),
+    "cpu_sys_ms": (int, float, type(None)), "peak_memory_kb": (int, float, type(None)),
+}
+
+NODE_JOBS = Counter(
+    "judge_node_jobs_total", "Coordinator jobs by outcome: ok, resubmitted, local_fallback, local (no nodes)", ("outcome",)
+)
+
+
+class NodeLost(Exception):
+    """The node running a job went away before answering"""
+
+
+def encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+async def read_message(reader: asyncio.StreamReader) -> Optional[dict]:
+    """Next message, or None when the peer closed the connection"""
+    line = await reader.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def parse_address(address: str):
+    """("unix", path) or ("tcp", (host, port)) from unix:/path or tcp://host:port"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    if address.startswith("tcp://"):
+        address = address[len("tcp://"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "0.0.0.0", int(port))
+
+
+def valid_results(results, count: int) -> bool:
+    """One well-formed PythonRunner result per input"""
+    if not isinstance(results, list) or len(results) != count:
+        return False
+    return all(
+        isinstance(result, dict) and result.get("status") in ("success", "error")
+        and all(isinstance(result.get(field), kinds) and not isinstance(result.get(field), bool)
+                for field, kinds in RESULT_FIELDS.items())
+        for result in results
+    )
+
+
+def job_timeout(inputs: List[str]) -> float:
+    """Generous bound on a job's run time: every input hitting the wall limit, plus slack"""
+    return len(inputs) * (PythonRunner.TIMEOUT + 2) + 10
+
+
+class JudgeNode:
+    """Coordinator-side view of one connected node"""
+
+    def __init__(self, node_id: str, slots: int, writer: asyncio.StreamWriter):
+        self.node_id = node_id
+        self.slots = max(1, slots)
+        self.writer = writer
+        self.jobs: Dict[str, asyncio.Future] = {}
+        self.last_heartbeat = time.monotonic()
+        self.connected_at = time.time()
+        self.completed = 0
+
+    @property
+    def load(self) -> float:
+        return len(self.jobs) / self.slots
+
+    def status(self) -> dict:
+        return {
+            "node_id": self.node_id,
+            "slots": self.slots,
+            "running": len(self.jobs),
+            "completed": self.completed,
+            "connected_at": self.connected_at,
+            "last_heartbeat_age_seconds": round(time.monotonic() - self.last_heartbeat, 3),
+        }
+
+    def fail_jobs(self):
+        for future in self.jobs.values():
+            if not future.done():
+                future.set_exception(NodeLost(self.node_id))
+        self.jobs.clear()
+
+
+class JudgeCoordinator:
+    def __init__(self, address: str, token: str = ""):
+        self.address = address
+        self.token = token
+        self.nodes: Dict[str, JudgeNode] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._connections = set()  # connection handler tasks
+        self._job_ids = itertools.count(1)
+        # Set whenever a node slot frees up or the set of nodes changes
+        self._slot_freed = asyncio.Event()
+        self.local = PythonRunner()
+        Gauge("judge_nodes", "Registered judge nodes", function=lambda: len(self.nodes))
+        Gauge("judge_node_slots", "Execution slots across registered judge nodes",
+              function=lambda: sum(node.slots for node in self.nodes.values()))
+
+    async def start(self):
+        kind, where = parse_address(self.address)
+        if kind == "tcp" and not self.token:
+            raise RuntimeError(f"{TOKEN_ENV} must be set to listen for judge nodes on TCP ({self.address})")
+        if kind == "unix":
+            if os.path.exists(where):
+                os.unlink(where)
+            self._server = await asyncio.start_unix_server(self._handle, path=where, limit=MAX_MESSAGE_BYTES)
+        else:
+            self._server = await asyncio.start_server(self._handle, *where, limit=MAX_MESSAGE_BYTES)
+        self._monitor = asyncio.create_task(self._expire_silent_nodes())
+
+    async def stop(self):
+        if self._monitor is not None:
+            self._monitor.cancel()
+        if self._server is not None:
+            self._server.close()
+        for node in list(self.nodes.values()):
+            self._drop(node)
+        # Let handlers see their connection close rather than cancelling them mid-read
+        if self._connections:
+            await asyncio.wait(self._connections, timeout=5)
+
+    async def _expire_silent_nodes(self):
+        deadline = HEARTBEAT_INTERVAL_SECONDS * HEARTBEAT_MISSES
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+            now = time.monotonic()
+            for node in list(self.nodes.values()):
+                if now - node.last_heartbeat > deadline:
+                    self._drop(node)
+
+    def _drop(self, node: JudgeNode):
+        if self.nodes.get(node.node_id) is node:
+            del self.nodes[node.node_id]
+        node.writer.close()
+        node.fail_jobs()
+        self._slot_freed.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        node = None
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            hello = await asyncio.wait_for(read_message(reader), timeout=10)
+            if not hello or hello.get("type") != "register":
+                return
+            if hello.get("protocol") != PROTOCOL_VERSION:
+                writer.write(encode({"type": "error", "detail": f"protocol {PROTOCOL_VERSION} required"}))
+                return
+            if not hmac.compare_digest(str(hello.get("token", "")).encode(), self.token.encode()):
+                writer.write(encode({"type": "error", "detail": "invalid token"}))
+                return
+            node = JudgeNode(str(hello["node_id"]), int(hello.get("slots", 1)), writer)
+            previous = self.nodes.get(node.node_id)
+            if previous is not None:
+                self._drop(previous)  # reconnect: the old connection's jobs get resubmitted
+            self.nodes[node.node_id] = node
+            self._slot_freed.set()
+            writer.write(encode({"type": "registered", "heartbeat_interval": HEARTBEAT_INTERVAL_SECONDS}))
+            await writer.drain()
+
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                node.last_heartbeat = time.monotonic()
+                if message.get("type") == "result":
+                    future = node.jobs.pop(message.get("job_id"), None)
+                    if future is not None and not future.done():
+                        future.set_result(message["results"])
+                        node.completed += 1
+        except (asyncio.TimeoutError, ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            self._connections.discard(task)
+            if node is not None:
+                self._drop(node)
+            else:
+                writer.close()
+
+    async def _pick_node(self, exclude) -> Optional[JudgeNode]:
+        """Least-loaded node with a free slot, waiting while all are busy; None if no node is left"""
+        while True:
+            candidates = [node for node in self.nodes.values() if node.node_id not in exclude]
+            if not candidates:
+                return None
+            free = [node for node in candidates if len(node.jobs) < node.slots]
+            if free:
+                return min(free, key=lambda node: (node.load, -node.slots))
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+
+    async def _dispatch(self, node: JudgeNode, code: str, inputs: List[str], memory_limit: Optional[int],
+                        output_limit: Optional[int]) -> List[dict]:
+        job_id = f"{node.node_id}-{next(self._job_ids)}"
+        future = asyncio.get_running_loop().create_future()
+        node.jobs[job_id] = future
+        try:
+            node.writer.write(encode({
+                "type": "job", "job_id": job_id, "code": code, "inputs": inputs,
+                "memory_limit": memory_limit, "output_limit": output_limit
+            }))
+            await node.writer.drain()
+            results = await asyncio.wait_for(future, timeout=job_timeout(inputs))
+            if not valid_results(results, len(inputs)):
+                raise NodeLost(node.node_id)  # malformed answer: run the job elsewhere
+            return results
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            raise NodeLost(node.node_id) from e
+        finally:
+            node.jobs.pop(job_id, None)
+            self._slot_freed.set()
+
+    async def run_tests(self, code: str, inputs: List[str], memory_limit: Optional[int] = None,
+                        output_limit: Optional[int] = None) -> List[dict]:
+        """One PythonRunner result per input, from a judge node when one is registered"""
+        tried = set()
+        while len(tried) < MAX_ATTEMPTS:
+            node = await self._pick_node(tried)
+            if node is None:
+                break
+            tried.add(node.node_id)
+            try:
+                with tracing.span("judge_node.job", node=node.node_id, tests=len(inputs)):
+                    results = await self._dispatch(node, code, inputs, memory_limit, output_limit)
+                NODE_JOBS.inc(outcome="ok")
+                return results
+            except NodeLost:
+                NODE_JOBS.inc(outcome="resubmitted")
+        NODE_JOBS.inc(outcome="local_fallback" if tried else "local")
+        return [await self.local.run_with_input(code, stdin, memory_limit, output_limit) for stdin in inputs]
+
+    def status(self) -> dict:
+        return {"address": self.address, "nodes": [node.status() for node in self.nodes.values()]}
+
+
+def create_coordinator() -> Optional[JudgeCoordinator]:
+    address = os.environ.get(COORDINATOR_ENV)
+    # Popped so candidate processes never inherit it (see also runner's child environment)
+    return JudgeCoordinator(address, os.environ.pop(TOKEN_ENV, "")) if address else None
@@ -0,0 +1,134 @@
+"""
+Judge node: executes candidate code for a JudgeCoordinator (see judge_cluster.py).
+
+Usage (from backend/, on any machine that can reach the API host):
+    JUDGE_TOKEN=... python judge_node.py --coordinator tcp://api-host:7070 --slots 4
+    python judge_node.py --coordinator tcp://api-host:7070 --token-file /etc/judge/token
+    python judge_node.py --coordinator unix:/run/judge.sock
+
+The node registers, heartbeats every interval the coordinator asks for, and
+runs up to --slots jobs at once with the same PythonRunner (and limits) the
+API host uses. If the connection drops it reconnects with backoff; jobs it
+was running are resubmitted elsewhere by the coordinator.
+
+The code it runs has the node's uid, so the token is never taken from the
+command line (/proc/<pid>/cmdline is world-readable): it comes from
+JUDGE_TOKEN, removed from the environment once read, or --token-file, and
+the node makes itself non-dumpable so its memory and environment stay out
+of reach.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+
+from cohort import _make_undumpable
+from judge_cluster import MAX_MESSAGE_BYTES, PROTOCOL_VERSION, TOKEN_ENV, encode, parse_address, read_message
+from runner import PythonRunner
+
+RECONNECT_MAX_SECONDS = 10
+
+
+class JudgeNodeWorker:
+    def __init__(self, coordinator: str, slots: int, token: str, node_id: str):
+        self.coordinator = coordinator
+        self.slots = slots
+        self.token = token
+        self.node_id = node_id
+        self.runner = PythonRunner()
+        self._slots = asyncio.Semaphore(slots)
+        self.running = 0
+
+    async def _connect(self):
+        kind, where = parse_address(self.coordinator)
+        if kind == "unix":
+            return await asyncio.open_unix_connection(where, limit=MAX_MESSAGE_BYTES)
+        return await asyncio.open_connection(*where, limit=MAX_MESSAGE_BYTES)
+
+    async def _run_job(self, job: dict, writer: asyncio.StreamWriter):
+        async with self._slots:
+            self.running += 1
+            try:
+                results = []
+                for stdin in job["inputs"]:
+                    results.append(await self.runner.run_with_input(
+                        job["code"], stdin, job.get("memory_limit"), job.get("output_limit")
+                    ))
+            finally:
+                self.running -= 1
+        writer.write(encode({"type": "result", "job_id": job["job_id"], "results": results}))
+        await writer.drain()
+
+    async def _heartbeat(self, writer: asyncio.StreamWriter, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            writer.write(encode({"type": "heartbeat", "running": self.running}))
+            await writer.drain()
+
+    async def serve_once(self):
+        """One connection's lifetime; returns when the coordinator goes away"""
+        reader, writer = await self._connect()
+        jobs = set()
+        heartbeat = None
+        try:
+            writer.write(encode({
+                "type": "register", "node_id": self.node_id, "slots": self.slots,
+                "token": self.token, "protocol": PROTOCOL_VERSION
+            }))
+            await writer.drain()
+            reply = await read_message(reader)
+            if not reply or reply.get("type") != "registered":
+                raise SystemExit(f"❌ Registration refused: {(reply or {}).get('detail', 'connection closed')}")
+            print(f"✅ Registered with {self.coordinator} as {self.node_id} ({self.slots} slots)")
+            heartbeat = asyncio.create_task(self._heartbeat(writer, reply["heartbeat_interval"]))
+
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    return
+                if message.get("type") == "job":
+                    task = asyncio.create_task(self._run_job(message, writer))
+                    jobs.add(task)
+                    task.add_done_callback(jobs.discard)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            for task in jobs:
+                task.cancel()
+            writer.close()
+
+    async def serve(self):
+        delay = 0.5
+        while True:
+            try:
+                await self.serve_once()
+                delay = 0.5
+                print("⚠️  Coordinator closed the connection; reconnecting")
+            except (ConnectionError, OSError) as e:
+                print(f"⚠️  Cannot reach {self.coordinator} ({e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coordinator", required=True, help="tcp://host:port or unix:/path")
+    parser.add_argument("--slots", type=int, default=os.cpu_count() or 1, help="concurrent jobs (default: CPUs)")
+    parser.add_argument("--token-file", help=f"file holding the shared secret (default: ${TOKEN_ENV})")
+    parser.add_argument("--node-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    args = parser.parse_args()
+
+    _make_undumpable()
+    token = os.environ.pop(TOKEN_ENV, "")
+    if args.token_file:
+        with open(args.token_file, encoding="utf-8") as f:
+            token = f.read().strip()
+    try:
+        asyncio.run(JudgeNodeWorker(args.coordinator, args.slots, token, args.node_id).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
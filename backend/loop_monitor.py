@@ -0,0 +1,136 @@
+"""
+Event-loop lag monitor and blocking detector.
+
+A task on the loop sleeps for INTERVAL_SECONDS at a time and records how
+late it wakes up: that lag is exactly how long other callbacks held the loop.
+Lag goes into the event_loop_lag_seconds histogram and a window of recent
+samples for percentiles (/admin/loop).
+
+The lag task can't report a stall while the loop is stuck, so a watchdog
+thread watches its heartbeat. When the loop has been unresponsive for more
+than BLOCK_THRESHOLD_SECONDS it grabs the loop thread's current stack, logs
+it and keeps it in a short history - pointing straight at the synchronous
+call (SQLite, openpyxl, reportlab, ...) that is blocking.
+"""
+
+import asyncio
+import logging
+import math
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from metrics import Counter, Gauge, Histogram
+
+INTERVAL_SECONDS = 0.1
+BLOCK_THRESHOLD_SECONDS = 0.1
+LAG_WINDOW = 600  # samples kept for percentiles (~1 min at the default interval)
+STALL_HISTORY = 20
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds", "Delay between a scheduled loop wake-up and when it ran",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_BLOCKED = Counter("event_loop_blocked_total", "Times the event loop was blocked longer than the threshold")
+LOOP_BLOCKED_SECONDS = Counter("event_loop_blocked_seconds_total", "Total time the loop spent in detected stalls")
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(1, math.ceil(pct / 100 * len(sorted_values))) - 1]
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = INTERVAL_SECONDS, threshold: float = BLOCK_THRESHOLD_SECONDS):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: deque = deque(maxlen=LAG_WINDOW)
+        self.stalls: deque = deque(maxlen=STALL_HISTORY)
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        Gauge(
+            "event_loop_lag_p99_seconds", "p99 loop lag over the recent window",
+            function=lambda: self.percentiles()["p99"]
+        )
+
+    async def _measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self.lags.append(lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+    def _watch(self):
+        """Watchdog thread: capture the loop thread's stack while it is stuck"""
+        stall = None
+        stalled_heartbeat = None
+        while not self._stop.wait(self.threshold / 4):
+            heartbeat = self._heartbeat
+            if stall is not None:
+                if heartbeat != stalled_heartbeat:
+                    # Loop is back: the stall lasted from the missed wake-up to this heartbeat
+                    stall["blocked_seconds"] = round(heartbeat - stalled_heartbeat - self.interval, 3)
+                    LOOP_BLOCKED_SECONDS.inc(stall["blocked_seconds"])
+                    stall = None
+                continue
+            if time.monotonic() - heartbeat - self.interval > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+                stall = {"detected_at": time.time(), "blocked_seconds": None, "stack": stack}
+                stalled_heartbeat = heartbeat
+                self.stalls.append(stall)
+                LOOP_BLOCKED.inc()
+                logger.warning("Event loop blocked for more than %.0f ms; loop thread stack:\n%s",
+                               self.threshold * 1000, stack)
+
+    def percentiles(self) -> dict:
+        values = sorted(self.lags)
+        return {
+            "samples": len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+            "max": values[-1] if values else 0.0,
+        }
+
+    def status(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "threshold_seconds": self.threshold,
+            "lag_seconds": {k: round(v, 6) if isinstance(v, float) else v for k, v in self.percentiles().items()},
+            "stalls": list(reversed(self.stalls)),
+        }
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._watchdog.join()
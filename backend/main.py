@@ -1,41 +1,172 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, EmailStr, validator
 from typing import Optional, List
+import gzip
+import hashlib
+import json
 import sqlite3
 import uuid
 from datetime import datetime
 import asyncio
 import sys
 import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
-# PDF generation imports
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
 # Fix Windows event loop for subprocess BEFORE any asyncio operations
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-from database import init_db, get_db
-from models import LoginRequest, RunCodeRequest, SubmitCodeRequest, RunSqlRequest, SubmitSqlRequest, StartExamRequest, ExamSubmitRequest
-from runner import PythonRunner, normalize_output, compare_outputs, get_verdict
-from problems import get_problem, list_problems, list_problems_by_language, get_exam_summary, PROBLEMS
-from excel_service import read_all_results, add_result, export_excel, create_sample_data, ensure_excel_exists
+from database import init_db, get_db, warm_db
+from models import LoginRequest, TokenLoginRequest, RunCodeRequest, RunBatchRequest, SubmitCodeRequest, RunSqlRequest, SubmitSqlRequest, StartExamRequest, ExamSubmitRequest
+from runner import (
+    PythonRunner, normalize_output, normalize_output_lines, get_verdict, resource_metrics,
+    check_syntax, compilation_error_result, VERDICT_COMPILATION_ERROR
+)
+from batch_runner import MAX_BATCH_INPUT_BYTES, MAX_BATCH_INPUTS, batch_job, batch_results
+from checkers import check_output, check_result_set, unload_checker, CheckerError
+from problems import (
+    get_problem, list_problems, list_problems_by_language, get_exam_summary, build_exam_bundle, problem_details,
+    prepare_problem, PROBLEMS
+)
+import metrics
+import profiling
+from loop_monitor import LoopMonitor
+import tracing
+from admission import AdmissionController
+from concurrency import AdaptiveConcurrencyLimiter
+from state import create_store
+from judge_cluster import create_coordinator
+from singleflight import SingleFlight, flight_key
+from zygote import stop_zygote
+import cohort
+
+# reportlab and openpyxl (excel_service) are imported by the report endpoints on
+# first use; together they are a large share of the API's import time.
+
+# Admission control for concurrent executions, prioritized by execution class.
+# The number of slots is tuned at runtime from latency and host load.
+admission = AdmissionController()
+concurrency_limiter = AdaptiveConcurrencyLimiter(admission)
+
+# Event-loop lag / blocking detector (event_loop_* metrics, /admin/loop)
+loop_monitor = LoopMonitor()
+
+
+# Start-up progress for /ready: component -> {"status", "seconds", "required"}
+startup_components = {}
+
+
+def init_component(name: str, func, required: bool = True):
+    """Register a start-up component; the returned coroutine runs its
+    initializer (blocking ones off the loop) and records status and timing"""
+    component = startup_components[name] = {"status": "pending", "seconds": None, "required": required}
+
+    async def run():
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(func):
+                await func()
+            else:
+                await asyncio.to_thread(func)
+            component["status"] = "ok"
+        except Exception as e:
+            component["status"] = f"error: {e}"
+            if required:
+                raise
+        finally:
+            component["seconds"] = round(time.perf_counter() - start, 4)
+
+    return run()
+
+
+def ensure_results_workbook():
+    from excel_service import ensure_excel_exists
+    ensure_excel_exists()
+
+
+async def warm_runner():
+    """One throwaway execution so the first candidate doesn't pay for a cold
+    interpreter spawn (binary and stdlib not yet in the page cache)"""
+    result = await PythonRunner().run_with_input("print(input())", "warm-up")
+    if result["status"] != "success" or result["stdout"].strip() != "warm-up":
+        raise RuntimeError(f"runner self-test failed: {result['status']}")
+
+
+def build_sql_templates():
+    for problem in list(PROBLEMS.values()):
+        if problem.get("language") == "sql":
+            get_sql_template(problem)
+
+
+def warm_up() -> asyncio.Future:
+    """Start pre-building judge caches in the background; /ready stays 503 until
+    they finish. Expected outputs are already pre-normalized when problems load."""
+    return asyncio.gather(
+        init_component("runner", warm_runner),
+        init_component("sql_templates", build_sql_templates),
+        init_component("db_cache", warm_db),
+        return_exceptions=True
+    )
+
+
+async def sync_shared_state():
+    """Multi-worker mode: pick up other workers' problem bank changes and keep
+    this worker's slot leases from lapsing"""
+    while True:
+        await asyncio.sleep(STATE_SYNC_SECONDS)
+        try:
+            await sync_problem_bank()
+            await store.call("renew_leases")
+        except sqlite3.Error:
+            pass  # store briefly locked; try again next round
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The "thread" runner backend (non-Linux) executes via asyncio.to_thread; size
+    # the default executor so it never caps concurrency below the limiter's maximum
+    loop = asyncio.get_running_loop()
+    cohort.session_secret()  # take the signing key out of the environment before any child starts
+    executor = ThreadPoolExecutor(max_workers=concurrency_limiter.max_limit + 8, thread_name_prefix="judge")
+    loop.set_default_executor(executor)
+    concurrency_limiter.start()
+    loop_monitor.start()
+    # The API needs its tables before it serves anything, so they are not a /ready
+    # component (it could never report them pending). The results workbook is only
+    # for the HR dashboard, whose endpoints create it on demand, so it is not waited for
+    await asyncio.to_thread(init_db)
+    await sync_problem_bank()
+    if judge is not None:
+        await judge.start()
+    background = [
+        warm_up(),
+        asyncio.create_task(init_component("excel", ensure_results_workbook, required=False)),
+    ]
+    if store.shared:
+        background.append(asyncio.create_task(sync_shared_state()))
+    yield
+    for task in background:
+        task.cancel()
+    if judge is not None:
+        await judge.stop()
+    await loop_monitor.stop()
+    await concurrency_limiter.stop()
+    stop_zygote()
+    store.close()
+
 
-# Concurrency semaphore for 25 concurrent executions
-execution_semaphore = asyncio.Semaphore(25)
+app = FastAPI(lifespan=lifespan)
 
-app = FastAPI()
+# Per-route request latency for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
 
-# Initialize database
-init_db()
+# Request IDs (X-Request-ID) and per-request span traces for /admin/traces
+app.add_middleware(tracing.TracingMiddleware)
 
 # CORS configuration
 app.add_middleware(
@@ -44,16 +175,83 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
-# In-memory session store (for one-day MVP)
-sessions = {}
+# Sessions, exam sessions and the HR problem bank: in-process, or shared by all
+# workers through SQLite when SHARED_STATE_DB is set (see state.py)
+store = create_store()
+if store.shared:
+    admission.leases = store
+STATE_SYNC_SECONDS = 1.0  # multi-worker mode: problem bank sync and lease renewal period
 
-# In-memory exam session store
-exam_sessions = {}  # {user_id: {"start_time": datetime, "end_time": datetime, "status": "active"|"completed", "answers": {}}}
+# Judge nodes (JUDGE_COORDINATOR set): candidate code runs on registered nodes
+# instead of this host; without the setting, or with no node connected, it runs here
+judge = create_coordinator()
+
+
+async def run_tests(code: str, inputs: List[str], memory_limit: Optional[int] = None,
+                    output_limit: Optional[int] = None) -> List[dict]:
+    """One runner result per input, in order"""
+    if judge is not None:
+        return await judge.run_tests(code, inputs, memory_limit, output_limit)
+    runner = PythonRunner()
+    return [await runner.run_with_input(code, stdin, memory_limit, output_limit) for stdin in inputs]
+
+# Identical /run and /sql/run requests in flight share one execution, and
+# its result answers repeats for RUN_RESULT_TTL_SECONDS (see singleflight.py).
+# Streaming runs over /ws/run are never coalesced.
+RUN_RESULT_TTL_SECONDS = 5
+run_flights = SingleFlight("run", ttl=RUN_RESULT_TTL_SECONDS)
+sql_run_flights = SingleFlight("sql_run", ttl=RUN_RESULT_TTL_SECONDS)
 
 EXAM_DURATION_SECONDS = 2 * 60 * 60  # 2 hours
 
+# Gauges read at scrape time
+metrics.Gauge("active_sessions", "Logged-in sessions", function=store.session_count)
+metrics.Gauge("active_exams", "Exams started and not yet submitted", function=store.active_exam_count)
+metrics.Gauge(
+    "judge_admission_queue_depth", "Executions waiting for a slot", ("execution_class",),
+    function=lambda: {(name,): admission.queue_depth(name) for name in admission.classes}
+)
+metrics.Gauge("judge_executions_in_flight", "Executions holding a slot", function=lambda: admission.in_flight)
+metrics.Gauge("judge_concurrency_limit", "Current execution slot count", function=lambda: admission.capacity)
+
+
+METRIC_FIELDS = ("wall_time_ms", "cpu_user_ms", "cpu_sys_ms", "peak_memory_kb")
+
+
+def compilation_error_detail(error: dict) -> dict:
+    """The single failed_details entry for a submission that does not compile"""
+    return {
+        "test_case": None,
+        "verdict": VERDICT_COMPILATION_ERROR,
+        "error": error["message"],
+        "line": error["line"],
+        "column": error["column"]
+    }
+
+
+def test_result_entry(test_number: int, passed: bool, status: str, usage: dict) -> dict:
+    """One test case's outcome plus its resource usage (from runner or SQL timing)"""
+    entry = {"test_case": test_number, "passed": passed, "status": status}
+    entry.update({field: usage.get(field) for field in METRIC_FIELDS})
+    return entry
+
+
+def record_test_case_results(cursor: sqlite3.Cursor, submission_id: int, test_results: list):
+    """Store per-test-case pass/fail and resource usage for a submission"""
+    cursor.executemany(
+        """INSERT INTO test_case_results
+        (submission_id, test_case, passed, status, wall_time_ms, cpu_user_ms, cpu_sys_ms, peak_memory_kb)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        [
+            (submission_id, t["test_case"], int(t["passed"]), t["status"], t["wall_time_ms"],
+             t["cpu_user_ms"], t["cpu_sys_ms"], t["peak_memory_kb"])
+            for t in test_results
+        ]
+    )
+
 @app.post("/login")
 async def login(request: LoginRequest, db: sqlite3.Connection = Depends(get_db)):
     cursor = db.cursor()
@@ -65,17 +263,18 @@ async def login(request: LoginRequest, db: sqlite3.Connection = Depends(get_db))
     if user:
         user_id = user[0]
     else:
-        # Create new user
+        # Create new user; OR IGNORE because a concurrent login may have just created it
         cursor.execute(
-            "INSERT INTO users (name, email, created_at) VALUES (?, ?, ?)",
+            "INSERT OR IGNORE INTO users (name, email, created_at) VALUES (?, ?, ?)",
             (request.name, request.email, datetime.now().isoformat())
         )
         db.commit()
-        user_id = cursor.lastrowid
+        cursor.execute("SELECT id FROM users WHERE email = ?", (request.email,))
+        user_id = cursor.fetchone()[0]
     
     # Create session
     session_id = str(uuid.uuid4())
-    sessions[session_id] = user_id
+    await store.call("create_session", session_id, user_id)
     
     cursor.close()
     
@@ -86,75 +285,252 @@ async def login(request: LoginRequest, db: sqlite3.Connection = Depends(get_db))
         "email": request.email
     }
 
+@app.post("/login/token")
+async def login_with_token(request: TokenLoginRequest, db: sqlite3.Connection = Depends(get_db)):
+    """Sign in with a pre-issued cohort token: verified by signature, no database write"""
+    user_id = await session_user(request.session_id) if cohort.is_token(request.session_id) else None
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    user = db.execute("SELECT name, email FROM users WHERE id = ?", (user_id,)).fetchone()
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return {"session_id": request.session_id, "user_id": user_id, "name": user[0], "email": user[1]}
+
+async def session_user(session_id: Optional[str]) -> Optional[int]:
+    """User id for a session: a signed cohort token (checked statelessly) or a /login session"""
+    if cohort.is_token(session_id):
+        return cohort.token_user(session_id)
+    return await store.call("session_user", session_id)
+
+async def execution_user(session_id: Optional[str], http_request: Request):
+    """Key for per-user admission caps: the session's user, else the client address"""
+    user_id = await session_user(session_id)
+    if user_id is not None:
+        return user_id
+    return f"ip:{http_request.client.host}" if http_request.client else None
+
 @app.post("/run")
-async def run_code(request: RunCodeRequest):
+async def run_code(request: RunCodeRequest, http_request: Request):
     # Check if custom input is empty or whitespace
     if not request.custom_input or not request.custom_input.strip():
         return {"error": "INPUT_REQUIRED"}
     
-    async with execution_semaphore:
-        runner = PythonRunner()
-        result = await runner.run_with_input(request.code, request.custom_input)
-        return result
+    compile_error = check_syntax(request.code)
+    if compile_error:
+        return compilation_error_result(compile_error)
+
+    async def execute():
+        async with admission.slot("run", await execution_user(request.session_id, http_request)):
+            results = await run_tests(request.code, [request.custom_input])
+            return results[0]
+    return await run_flights.run(flight_key(request.code, request.custom_input), execute)
+
+async def stream_run(code: str, stdin: str):
+    """run_streaming events, from the local runner (judge nodes answer whole runs, so their output comes at exit)"""
+    if judge is None:
+        async for event in PythonRunner().run_streaming(code, stdin):
+            yield event
+        return
+    result = (await judge.run_tests(code, [stdin]))[0]
+    for name in ("stdout", "stderr"):
+        if result[name]:
+            yield name, result[name]
+    yield "exit", result
+
+def exit_message(result: dict) -> dict:
+    """Final message of a streamed run: the result without the streams already sent"""
+    message = {key: value for key, value in result.items() if key not in ("stdout", "stderr")}
+    if result["status"] != "success":
+        message["message"] = result["stderr"]
+    return {"type": "exit", **message}
+
+@app.websocket("/ws/run")
+async def run_code_stream(websocket: WebSocket):
+    """
+    /run with live output. The client sends {"code", "custom_input", "session_id"}
+    and receives {"type": "output", "stream", "data"} as the program writes, then
+    {"type": "exit", ...}. Sending {"type": "cancel"} (or disconnecting) kills the
+    program and frees its execution slot at once; the reply is {"type": "cancelled"}.
+    Sends wait for the client, and the runner stops reading the program while its
+    buffer is full, so a slow client throttles the program instead of piling up output.
+    """
+    await websocket.accept()
+    try:
+        request = RunCodeRequest(**await websocket.receive_json())
+    except (ValueError, TypeError):
+        await websocket.send_json({"type": "error", "status": 422, "detail": "Expected {code, custom_input, session_id}"})
+        await websocket.close()
+        return
+    except WebSocketDisconnect:
+        return
+    if not request.custom_input or not request.custom_input.strip():
+        await websocket.send_json({"type": "error", "error": "INPUT_REQUIRED"})
+        await websocket.close()
+        return
+    compile_error = check_syntax(request.code)
+    if compile_error:
+        await websocket.send_json(exit_message(compilation_error_result(compile_error)))
+        await websocket.close()
+        return
+
+    async def pump():
+        async with admission.slot("run", await execution_user(request.session_id, websocket)):
+            async for kind, value in stream_run(request.code, request.custom_input):
+                if kind == "exit":
+                    await websocket.send_json(exit_message(value))
+                else:
+                    await websocket.send_json({"type": "output", "stream": kind, "data": value})
+
+    async def wait_for_cancel():
+        while (await websocket.receive_json()).get("type") != "cancel":
+            pass
+
+    running = asyncio.create_task(pump())
+    cancel = asyncio.create_task(wait_for_cancel())
+    await asyncio.wait({running, cancel}, return_when=asyncio.FIRST_COMPLETED)
+    if not running.done():
+        # Cancelled or disconnected: killing the program happens as the run unwinds
+        running.cancel()
+        await asyncio.gather(running, return_exceptions=True)
+        disconnected = isinstance(cancel.exception(), WebSocketDisconnect)
+        metrics.STREAMING_RUNS.inc(outcome="disconnected" if disconnected else "cancelled")
+        if not disconnected:
+            await websocket.send_json({"type": "cancelled"})
+            await websocket.close()
+        return
+
+    cancel.cancel()
+    error = running.exception()
+    if isinstance(error, WebSocketDisconnect):
+        metrics.STREAMING_RUNS.inc(outcome="disconnected")
+        return
+    if isinstance(error, HTTPException):
+        # Admission rejected the run (queue full or waited too long)
+        metrics.STREAMING_RUNS.inc(outcome="rejected")
+        await websocket.send_json({"type": "error", "status": error.status_code, "detail": error.detail})
+    elif error is not None:
+        raise error
+    else:
+        metrics.STREAMING_RUNS.inc(outcome="completed")
+    await websocket.close()
+
+@app.post("/run/batch")
+async def run_batch(request: RunBatchRequest, http_request: Request):
+    """
+    Run several custom inputs (optionally the problem's sample first) in one
+    interpreter and one execution slot; see batch_runner.py
+    """
+    inputs = [{"source": "custom", "input": stdin} for stdin in request.inputs]
+    problem = None
+    if request.include_sample:
+        problem = get_problem(request.problem_id) if request.problem_id else None
+        if not problem or problem.get("language", "python") != "python":
+            raise HTTPException(status_code=404, detail="Problem not found")
+        inputs.insert(0, {"source": "sample", "input": problem["sample_input"]})
+    if not inputs:
+        return {"error": "INPUT_REQUIRED"}
+    if len(inputs) > MAX_BATCH_INPUTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_INPUTS} inputs per batch")
+    if any(len(entry["input"].encode("utf-8")) > MAX_BATCH_INPUT_BYTES for entry in inputs):
+        raise HTTPException(status_code=400, detail=f"Each batch input must be at most {MAX_BATCH_INPUT_BYTES} bytes")
+
+    compile_error = check_syntax(request.code)
+    if compile_error:
+        error = compilation_error_result(compile_error)
+        return {
+            "results": [{**entry, **error, "sample_matched": None} for entry in inputs],
+            "process": {key: error[key] for key in ("status", "verdict") + METRIC_FIELDS}
+        }
+
+    job = batch_job(request.code, [entry["input"] for entry in inputs])
+    memory_limit = problem.get("memory_limit") if problem else None
+    async with admission.slot("run", await execution_user(request.session_id, http_request)):
+        process = (await run_tests(job["code"], [job["stdin"]], memory_limit, job["output_limit"]))[0]
+    metrics.BATCH_RUN_INPUTS.inc(len(inputs))
+
+    results = []
+    for entry, result in zip(inputs, batch_results(process, len(inputs))):
+        sample_matched = None
+        if entry["source"] == "sample":
+            sample = {
+                "input": problem["sample_input"], "output": problem["sample_output"],
+                "expected_lines": normalize_output_lines(problem["sample_output"])
+            }
+            sample_matched = result["status"] == "success" and check_output(problem, sample, result["stdout"])
+        results.append({**entry, **result, "sample_matched": sample_matched})
+    # The whole batch's run (peak memory is only known per process)
+    return {"results": results, "process": {key: process[key] for key in ("status", "verdict") + METRIC_FIELDS}}
 
 @app.post("/submit")
 async def submit_code(request: SubmitCodeRequest, db: sqlite3.Connection = Depends(get_db)):
     # Verify session
-    if request.session_id not in sessions:
+    user_id = await session_user(request.session_id)
+    if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid session. Please login again.")
     
-    user_id = sessions[request.session_id]
-    
     # Get problem details
     problem = get_problem(request.problem_id)
     if not problem:
         raise HTTPException(status_code=404, detail="Problem not found")
     
     # Run against all test cases (NEVER use custom input)
-    runner = PythonRunner()
     passed_tests = 0
     total_tests = len(problem["test_cases"])
     failed_details = []
+    failures = []
+    test_results = []
     total_execution_time = 0
     
-    async with execution_semaphore:
-        for i, test_case in enumerate(problem["test_cases"]):
-            start_time = datetime.now()
-            result = await runner.run_with_input(request.code, test_case["input"])
-            execution_time = (datetime.now() - start_time).total_seconds() * 1000  # ms
-            total_execution_time += execution_time
+    compile_error = check_syntax(request.code)
+    if compile_error:
+        # One verdict for the whole submission, without running any test
+        result = compilation_error_result(compile_error)
+        failures.append(result["verdict"])
+        failed_details.append(compilation_error_detail(compile_error))
+    else:
+        async with admission.slot("submit", user_id):
+            inputs = [test_case["input"] for test_case in problem["test_cases"]]
+            results = await run_tests(request.code, inputs, problem.get("memory_limit"))
+            for i, (test_case, result) in enumerate(zip(problem["test_cases"], results)):
+                total_execution_time += result["wall_time_ms"]
+                passed = False
             
-            if result["status"] == "success":
-                expected_output = test_case["output"]
-                actual_output = result["stdout"]
+                if result["status"] == "success":
+                    actual_output = result["stdout"]
                 
-                # Use normalized comparison to avoid false negatives
-                if compare_outputs(actual_output, expected_output):
-                    passed_tests += 1
+                    # Problem's checker (normalized comparison unless the problem declares one)
+                    passed = check_output(problem, test_case, actual_output)
+                    if passed:
+                        passed_tests += 1
+                    else:
+                        failures.append(None)
+                        failed_details.append({
+                            "test_case": i + 1,
+                            "expected": "\n".join(test_case["expected_lines"]),
+                            "actual": normalize_output(actual_output)
+                        })
                 else:
+                    # Clean error message (no raw tracebacks in UI)
+                    error_msg = result["stderr"]
+                    if "Traceback" in error_msg:
+                        # Extract only the last line (actual error)
+                        lines = error_msg.strip().split('\n')
+                        error_msg = lines[-1] if lines else error_msg
+                
+                    failures.append(result["verdict"])
                     failed_details.append({
                         "test_case": i + 1,
-                        "expected": normalize_output(expected_output),
-                        "actual": normalize_output(actual_output)
+                        "verdict": result["verdict"],
+                        "error": error_msg
                     })
-            else:
-                # Clean error message (no raw tracebacks in UI)
-                error_msg = result["stderr"]
-                if "Traceback" in error_msg:
-                    # Extract only the last line (actual error)
-                    lines = error_msg.strip().split('\n')
-                    error_msg = lines[-1] if lines else error_msg
-                
-                failed_details.append({
-                    "test_case": i + 1,
-                    "error": error_msg
-                })
+            
+                test_results.append(test_result_entry(i + 1, passed, result["status"], result))
     
     # Calculate current submission score
     score = (passed_tests / total_tests) * 100
     
     # Determine verdict
-    verdict = get_verdict(passed_tests, total_tests)
+    verdict = get_verdict(passed_tests, total_tests, failures)
     avg_execution_time = total_execution_time / total_tests if total_tests > 0 else 0
     
     # Save submission
@@ -166,6 +542,7 @@ async def submit_code(request: SubmitCodeRequest, db: sqlite3.Connection = Depen
         (user_id, request.problem_id, request.code, passed_tests, total_tests, score, verdict, avg_execution_time, request.time_taken, datetime.now().isoformat())
     )
     submission_id = cursor.lastrowid
+    record_test_case_results(cursor, submission_id, test_results)
     db.commit()
 
     # Get current best score
@@ -210,10 +587,6 @@ async def submit_code(request: SubmitCodeRequest, db: sqlite3.Connection = Depen
 
 # --- Assessment Dashboard API Endpoints ---
 
-# Initialize Excel file with sample data on startup
-ensure_excel_exists()
-
-
 class AssessmentResultRequest(BaseModel):
     """Request body for posting new assessment result"""
     candidate_id: str
@@ -245,8 +618,10 @@ async def get_assessment_results(
     Get all assessment results with optional filters.
     Query params: date_from, date_to, verdict (Good|Average|Below Average), submission_type (Manual|Auto)
     """
+    from excel_service import read_all_results
     try:
-        results = read_all_results(date_from, date_to, verdict, submission_type)
+        with metrics.REPORT_BUILD_SECONDS.time(report="excel_read"), tracing.span("report.excel_read"):
+            results = read_all_results(date_from, date_to, verdict, submission_type)
         return {
             "success": True,
             "total": len(results),
@@ -262,9 +637,11 @@ async def post_assessment_result(request: AssessmentResultRequest):
     Add a new assessment result. 
     Auto-calculates: overall_score, overall_percentage, python_score_percentage, sql_score_percentage, overall_verdict
     """
+    from excel_service import add_result
     try:
         data = request.model_dump()
-        result = add_result(data)
+        with metrics.REPORT_BUILD_SECONDS.time(report="excel_append"), tracing.span("report.excel_append"):
+            result = add_result(data)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding result: {str(e)}")
@@ -281,8 +658,10 @@ async def export_assessment_results(
     Export filtered assessment results as Excel file.
     Returns downloadable Excel with formatted sheets.
     """
+    from excel_service import export_excel
     try:
-        excel_bytes = export_excel(date_from, date_to, verdict, submission_type)
+        with metrics.REPORT_BUILD_SECONDS.time(report="excel_export"), tracing.span("report.excel_export"):
+            excel_bytes = export_excel(date_from, date_to, verdict, submission_type)
         filename = f"HR_Assessment_Report_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
         
         return StreamingResponse(
@@ -299,42 +678,77 @@ async def export_assessment_results(
 @app.post("/api/assessment/init-sample-data")
 async def init_sample_data():
     """Initialize Excel file with sample data for 5 candidates (for testing)"""
+    from excel_service import create_sample_data
     try:
         count = create_sample_data()
         return {"success": True, "message": f"Created sample data for {count} candidates"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating sample data: {str(e)}")
 
+# hr_results joined with the resource usage of each best submission
+HR_RESULTS_QUERY = """
+    SELECT h.name, h.email, h.problem_id, h.best_score, h.passed_tests, h.total_tests, h.verdict,
+           h.execution_time_ms, h.time_taken, h.updated_at, m.cpu_time_ms, m.peak_memory_kb
+    FROM hr_results h
+    LEFT JOIN (
+        SELECT submission_id,
+               AVG(COALESCE(cpu_user_ms, 0) + COALESCE(cpu_sys_ms, 0)) AS cpu_time_ms,
+               MAX(peak_memory_kb) AS peak_memory_kb
+        FROM test_case_results
+        GROUP BY submission_id
+    ) m ON m.submission_id = h.best_submission_id
+"""
+
+HR_RESULTS_ORDER = {
+    "score": "h.best_score DESC, h.name ASC",
+    "cpu_time": "h.best_score DESC, m.cpu_time_ms IS NULL, m.cpu_time_ms ASC, h.name ASC",
+    "memory": "h.best_score DESC, m.peak_memory_kb IS NULL, m.peak_memory_kb ASC, h.name ASC",
+}
+
+
+def hr_result_row(row) -> dict:
+    """Shape a HR_RESULTS_QUERY row for the API / PDF report"""
+    return {
+        "name": row[0],
+        "email": row[1],
+        "problem_id": row[2],
+        "best_score": row[3],
+        "passed_tests": row[4],
+        "total_tests": row[5],
+        "verdict": row[6] or "Pending",
+        "execution_time_ms": row[7] or 0,
+        "time_taken": row[8] or 0,
+        "updated_at": row[9],
+        "cpu_time_ms": round(row[10], 2) if row[10] is not None else None,
+        "peak_memory_kb": row[11]
+    }
+
+
 @app.get("/hr/results")
-async def get_hr_results(db: sqlite3.Connection = Depends(get_db)):
+async def get_hr_results(order_by: str = "score", db: sqlite3.Connection = Depends(get_db)):
+    """
+    Best result per candidate and problem.
+    order_by: score (default), cpu_time or memory - ties on score are broken by efficiency
+    """
+    if order_by not in HR_RESULTS_ORDER:
+        raise HTTPException(status_code=400, detail=f"order_by must be one of: {', '.join(HR_RESULTS_ORDER)}")
     cursor = db.cursor()
-    cursor.execute(
-        """SELECT name, email, problem_id, best_score, passed_tests, total_tests, verdict, execution_time_ms, time_taken, updated_at
-        FROM hr_results
-        ORDER BY best_score DESC, name ASC"""
-    )
+    cursor.execute(HR_RESULTS_QUERY + " ORDER BY " + HR_RESULTS_ORDER[order_by])
     results = cursor.fetchall()
     cursor.close()
 
-    return [
-        {
-            "name": row[0],
-            "email": row[1],
-            "problem_id": row[2],
-            "best_score": row[3],
-            "passed_tests": row[4],
-            "total_tests": row[5],
-            "verdict": row[6] or "Pending",
-            "execution_time_ms": row[7] or 0,
-            "time_taken": row[8] or 0,
-            "updated_at": row[9]
-        }
-        for row in results
-    ]
+    return [hr_result_row(row) for row in results]
 
 
 def generate_pdf_report(candidates_data: list) -> bytes:
     """Generate a professional PDF report of candidate results"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.enums import TA_CENTER
+
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
     
@@ -400,7 +814,7 @@ def generate_pdf_report(candidates_data: list) -> bytes:
         elements.append(Spacer(1, 10))
         
         # Problem results table
-        table_data = [["Problem", "Score", "Tests", "Verdict", "Time"]]
+        table_data = [["Problem", "Score", "Tests", "Verdict", "Time", "CPU", "Memory"]]
         for prob in candidate['problems']:
             verdict_text = prob['verdict']
             table_data.append([
@@ -408,10 +822,12 @@ def generate_pdf_report(candidates_data: list) -> bytes:
                 f"{prob['best_score']:.1f}%",
                 f"{prob['passed_tests']}/{prob['total_tests']}",
                 verdict_text,
-                f"{prob['time_taken']}s" if prob['time_taken'] else "--"
+                f"{prob['time_taken']}s" if prob['time_taken'] else "--",
+                f"{prob['cpu_time_ms']:.0f}ms" if prob['cpu_time_ms'] is not None else "--",
+                f"{prob['peak_memory_kb'] / 1024:.1f}MB" if prob['peak_memory_kb'] else "--"
             ])
         
-        t = Table(table_data, colWidths=[1.8*inch, 0.8*inch, 0.8*inch, 1*inch, 0.8*inch])
+        t = Table(table_data, colWidths=[1.6*inch, 0.7*inch, 0.6*inch, 0.9*inch, 0.6*inch, 0.7*inch, 0.8*inch])
         t.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a1a2e')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
@@ -441,11 +857,7 @@ def generate_pdf_report(candidates_data: list) -> bytes:
 async def get_hr_report_pdf(db: sqlite3.Connection = Depends(get_db)):
     """Generate and download PDF report of all candidate results"""
     cursor = db.cursor()
-    cursor.execute(
-        """SELECT name, email, problem_id, best_score, passed_tests, total_tests, verdict, execution_time_ms, time_taken, updated_at
-        FROM hr_results
-        ORDER BY name ASC, problem_id ASC"""
-    )
+    cursor.execute(HR_RESULTS_QUERY + " ORDER BY h.name ASC, h.problem_id ASC")
     results = cursor.fetchall()
     cursor.close()
     
@@ -461,16 +873,7 @@ async def get_hr_report_pdf(db: sqlite3.Connection = Depends(get_db)):
                 'total_score': 0,
                 'count': 0
             }
-        candidates[email]['problems'].append({
-            'problem_id': row[2],
-            'best_score': row[3],
-            'passed_tests': row[4],
-            'total_tests': row[5],
-            'verdict': row[6] or 'Pending',
-            'execution_time_ms': row[7] or 0,
-            'time_taken': row[8] or 0,
-            'updated_at': row[9]
-        })
+        candidates[email]['problems'].append(hr_result_row(row))
         candidates[email]['total_score'] += row[3]
         candidates[email]['count'] += 1
     
@@ -484,7 +887,8 @@ async def get_hr_report_pdf(db: sqlite3.Connection = Depends(get_db)):
     candidates_data.sort(key=lambda x: x['avg_score'], reverse=True)
     
     # Generate PDF
-    pdf_bytes = generate_pdf_report(candidates_data)
+    with metrics.REPORT_BUILD_SECONDS.time(report="pdf"), tracing.span("report.pdf"):
+        pdf_bytes = generate_pdf_report(candidates_data)
     
     return StreamingResponse(
         io.BytesIO(pdf_bytes),
@@ -513,20 +917,36 @@ async def get_problem_details(problem_id: str):
         raise HTTPException(status_code=404, detail="Problem not found")
     
     # Return problem without test case details (only show sample)
-    return {
-        "id": problem["id"],
-        "title": problem["title"],
-        "statement": problem["statement"],
-        "input_format": problem["input_format"],
-        "output_format": problem["output_format"],
-        "sample_input": problem["sample_input"],
-        "sample_output": problem["sample_output"],
-        "starter_code": problem["starter_code"],
-        "language": problem.get("language", "python")
-    }
+    return problem_details(problem)
+
+# Problem bank version this worker's PROBLEMS reflects. HR changes go through
+# the store so every worker applies them (on the next sync, at most
+# STATE_SYNC_SECONDS later, or right away on the HR endpoints).
+problem_bank_version = 0
+
+
+async def sync_problem_bank():
+    """Apply problem additions/deletions published since this worker's last sync"""
+    global problem_bank_version
+    if await store.call("problem_bank_version") == problem_bank_version:
+        return
+    version, changes = await store.call("problem_changes", problem_bank_version)
+    for pid, definition in changes:
+        unload_checker(pid)
+        drop_sql_template(pid)
+        if definition is None:
+            PROBLEMS.pop(pid, None)
+            continue
+        try:
+            PROBLEMS[pid] = prepare_problem(json.loads(definition))
+        except CheckerError:
+            PROBLEMS.pop(pid, None)  # validated before publishing; only if checkers changed since
+    problem_bank_version = version
+
 
 @app.get("/hr/problems")
 async def get_all_problems():
+    await sync_problem_bank()
     return list_problems()
 
 @app.post("/hr/problems")
@@ -534,21 +954,114 @@ async def add_problem(problem: dict):
     pid = problem.get("id")
     if not pid:
         raise HTTPException(status_code=400, detail="Problem ID is required")
+    await sync_problem_bank()
     if pid in PROBLEMS:
         raise HTTPException(status_code=400, detail="Problem ID already exists")
-    PROBLEMS[pid] = problem
+    definition = json.dumps(problem)
+    try:
+        prepare_problem(problem)  # validates the checker
+    except CheckerError as e:
+        unload_checker(pid)
+        raise HTTPException(status_code=400, detail=str(e))
+    await store.call("publish_problem", pid, definition)
+    await sync_problem_bank()
     return {"status": "ok", "id": pid}
 
+@app.post("/hr/cohort")
+async def provision_cohort(http_request: Request, ttl_hours: float = cohort.DEFAULT_TTL_HOURS,
+                           db: sqlite3.Connection = Depends(get_db)):
+    """
+    Create a cohort's candidates from a CSV body (name,email columns) in one
+    transaction and pre-issue their session tokens (see cohort.py)
+    """
+    if not 0 < ttl_hours <= cohort.MAX_TTL_HOURS:
+        raise HTTPException(status_code=400, detail=f"ttl_hours must be between 0 and {cohort.MAX_TTL_HOURS}")
+    if store.shared and not cohort.secret_configured():
+        raise HTTPException(status_code=503, detail=f"Set {cohort.SECRET_ENV} so every worker accepts the tokens")
+    try:
+        candidates = cohort.parse_cohort_csv((await http_request.body()).decode("utf-8"))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await asyncio.to_thread(cohort.provision_cohort, db, candidates, ttl_hours)
+
 @app.delete("/hr/problems/{problem_id}")
 async def delete_problem(problem_id: str):
+    await sync_problem_bank()
     if problem_id not in PROBLEMS:
         raise HTTPException(status_code=404, detail="Problem not found")
-    del PROBLEMS[problem_id]
+    await store.call("publish_problem", problem_id, None)
+    await sync_problem_bank()
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    # The store gauges query SQLiteStore, which can block on its file lock
+    body = await asyncio.to_thread(metrics.render) if store.shared else metrics.render()
+    return PlainTextResponse(body, media_type=metrics.CONTENT_TYPE)
+
+# --- Tracing and profiling ---
+
+@app.get("/admin/traces")
+async def get_traces(limit: int = 50, min_duration_ms: float = 0, name: Optional[str] = None):
+    """Recent request traces, newest first (e.g. ?name=/exam/submit&min_duration_ms=1000)"""
+    return tracing.recent_traces(limit, min_duration_ms, name)
+
+@app.get("/admin/traces/{request_id}")
+async def get_trace(request_id: str):
+    trace = tracing.get_trace(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (it may have been evicted)")
+    return trace
+
+@app.get("/admin/judge-nodes")
+async def get_judge_nodes():
+    """Registered judge nodes with their slots and running jobs"""
+    if judge is None:
+        return {"enabled": False, "nodes": []}
+    return {"enabled": True, **judge.status()}
+
+
+@app.get("/admin/loop")
+async def get_loop_status():
+    """Event-loop lag percentiles and recent stalls with the blocking stack"""
+    return loop_monitor.status()
+
+@app.post("/admin/profile")
+async def run_profile(mode: str = "sampling", seconds: Optional[float] = None, requests: Optional[int] = None):
+    """
+    Profile the server for N seconds or until N more requests finish (default 10 s).
+    sampling returns folded stacks for flame graphs; cprofile returns pstats text.
+    """
+    if mode not in ("sampling", "cprofile"):
+        raise HTTPException(status_code=400, detail="mode must be 'sampling' or 'cprofile'")
+    if seconds is None and requests is None:
+        seconds = 10
+    try:
+        result = await profiling.profile(mode, seconds, requests)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(result["data"], headers={
+        "X-Profile-Duration": str(result["duration_seconds"]),
+        "X-Profile-Requests": str(result["requests"]),
+        "X-Profile-Samples": str(result["samples"] or ""),
+    })
+
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "state_store": store.name, "execution": concurrency_limiter.status()}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until every required start-up component has initialized"""
+    ready = bool(startup_components) and all(
+        c["status"] == "ok" for c in startup_components.values() if c["required"]
+    )
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "components": startup_components}
+    )
 
 # --- Exam Session Management ---
 
@@ -557,17 +1070,59 @@ async def exam_summary():
     """Get exam overview with all problems and their details"""
     return get_exam_summary()
 
+# Browsers reuse the bundle this long without asking; after that a revalidation costs a 304
+EXAM_BUNDLE_MAX_AGE_SECONDS = 60
+
+# (problem bank version, ETag, JSON body, gzipped body), rebuilt when the bank changes
+_exam_bundle = None
+
+
+def exam_bundle():
+    global _exam_bundle
+    if _exam_bundle is None or _exam_bundle[0] != problem_bank_version:
+        body = json.dumps(build_exam_bundle(), separators=(",", ":")).encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        _exam_bundle = (problem_bank_version, etag, body, gzip.compress(body, compresslevel=9, mtime=0))
+    return _exam_bundle
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+@app.get("/exam/bundle")
+async def get_exam_bundle(http_request: Request):
+    """
+    Exam summary plus every problem's details in one response, serialized and
+    gzipped once per problem bank version (instead of /exam/summary,
+    /problems/python, /problems/sql and /problems/{id} per candidate)
+    """
+    _, etag, body, compressed = exam_bundle()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={EXAM_BUNDLE_MAX_AGE_SECONDS}", "Vary": "Accept-Encoding"}
+    if_none_match = http_request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        metrics.EXAM_BUNDLE_RESPONSES.inc(outcome="not_modified")
+        return Response(status_code=304, headers=headers)
+    if accepts_gzip(http_request.headers.get("accept-encoding", "")):
+        metrics.EXAM_BUNDLE_RESPONSES.inc(outcome="gzip")
+        return Response(compressed, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+    metrics.EXAM_BUNDLE_RESPONSES.inc(outcome="identity")
+    return Response(body, media_type="application/json", headers=headers)
+
 @app.post("/exam/start")
 async def start_exam(request: StartExamRequest):
     """Start a new exam session"""
-    if request.session_id not in sessions:
+    user_id = await session_user(request.session_id)
+    if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid session")
     
-    user_id = sessions[request.session_id]
-    
     # Check if exam already started
-    if user_id in exam_sessions and exam_sessions[user_id]["status"] == "active":
-        exam = exam_sessions[user_id]
+    exam = await store.call("get_exam", user_id)
+    if exam and exam["status"] == "active":
         elapsed = (datetime.now() - exam["start_time"]).total_seconds()
         remaining = max(0, EXAM_DURATION_SECONDS - elapsed)
         
@@ -580,16 +1135,11 @@ async def start_exam(request: StartExamRequest):
             }
         else:
             # Time expired but not submitted
-            exam_sessions[user_id]["status"] = "expired"
+            await store.call("set_exam_status", user_id, "expired")
     
     # Start new exam
     start_time = datetime.now()
-    exam_sessions[user_id] = {
-        "start_time": start_time,
-        "end_time": start_time,  # Will be updated on submit
-        "status": "active",
-        "answers": {}
-    }
+    await store.call("start_exam", user_id, start_time)
     
     return {
         "status": "started",
@@ -600,16 +1150,14 @@ async def start_exam(request: StartExamRequest):
 @app.get("/exam/status")
 async def get_exam_status(session_id: str):
     """Get current exam status and remaining time"""
-    if session_id not in sessions:
+    user_id = await session_user(session_id)
+    if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid session")
     
-    user_id = sessions[session_id]
-    
-    if user_id not in exam_sessions:
+    exam = await store.call("get_exam", user_id)
+    if exam is None:
         return {"status": "not_started"}
     
-    exam = exam_sessions[user_id]
-    
     if exam["status"] == "completed":
         return {
             "status": "completed",
@@ -638,42 +1186,49 @@ async def get_exam_status(session_id: str):
 @app.post("/exam/save-answer")
 async def save_exam_answer(session_id: str, problem_id: str, code: str):
     """Auto-save answer during exam"""
-    if session_id not in sessions:
+    user_id = await session_user(session_id)
+    if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid session")
     
-    user_id = sessions[session_id]
-    
-    if user_id not in exam_sessions or exam_sessions[user_id]["status"] != "active":
+    exam = await store.call("get_exam", user_id)
+    if exam is None or exam["status"] != "active":
         raise HTTPException(status_code=400, detail="No active exam session")
     
     # Check if time expired
-    elapsed = (datetime.now() - exam_sessions[user_id]["start_time"]).total_seconds()
+    elapsed = (datetime.now() - exam["start_time"]).total_seconds()
     if elapsed >= EXAM_DURATION_SECONDS:
         raise HTTPException(status_code=400, detail="Exam time expired")
     
-    exam_sessions[user_id]["answers"][problem_id] = code
+    await store.call("save_exam_answer", user_id, problem_id, code)
     return {"status": "saved"}
 
 @app.post("/exam/submit")
 async def submit_exam(request: ExamSubmitRequest, db: sqlite3.Connection = Depends(get_db)):
     """Submit entire exam - either manual or auto (timer expired)"""
-    if request.session_id not in sessions:
+    user_id = await session_user(request.session_id)
+    if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid session")
     
-    user_id = sessions[request.session_id]
-    
-    if user_id not in exam_sessions:
+    previous = await store.call("get_exam", user_id)
+    if previous is None:
         raise HTTPException(status_code=400, detail="No exam session found")
+    previous_status = previous["status"]
     
-    exam = exam_sessions[user_id]
-    
-    if exam["status"] == "completed":
+    # Mark exam as completed (atomically, so a double submit is judged once)
+    exam = await store.call("complete_exam", user_id, datetime.now())
+    if exam is None:
         raise HTTPException(status_code=400, detail="Exam already submitted")
     
-    # Mark exam as completed
-    exam["status"] = "completed"
-    exam["end_time"] = datetime.now()
-    
+    try:
+        return await grade_exam(request, user_id, exam, db)
+    except BaseException:
+        # Shed by admission, timed out or failed before anything was saved:
+        # reopen the exam so the candidate's retry is judged instead of refused
+        await asyncio.shield(store.call("set_exam_status", user_id, previous_status))
+        raise
+
+async def grade_exam(request: ExamSubmitRequest, user_id: int, exam: dict, db: sqlite3.Connection):
+    """Judge every answer of a completed exam and save the results in one transaction"""
     # Calculate time taken
     time_taken = int((exam["end_time"] - exam["start_time"]).total_seconds())
     
@@ -688,6 +1243,7 @@ async def submit_exam(request: ExamSubmitRequest, db: sqlite3.Connection = Depen
     cursor.execute("SELECT name, email FROM users WHERE id = ?", (user_id,))
     user_info = cursor.fetchone()
     
+    graded = []
     for answer in request.answers:
         problem = get_problem(answer.problem_id)
         if not problem:
@@ -696,6 +1252,8 @@ async def submit_exam(request: ExamSubmitRequest, db: sqlite3.Connection = Depen
         problem_marks = problem.get("marks", 10)
         total_marks += problem_marks
         total_execution_time = 0
+        test_results = []
+        failures = []
         
         # Evaluate based on language
         if answer.language == "sql":
@@ -703,45 +1261,64 @@ async def submit_exam(request: ExamSubmitRequest, db: sqlite3.Connection = Depen
             passed_tests = 0
             total_tests = len(problem.get("test_cases", []))
             
-            for test_case in problem.get("test_cases", []):
+            for i, test_case in enumerate(problem.get("test_cases", [])):
+                passed = False
+                usage = {}
                 try:
-                    start_time = datetime.now()
-                    columns, rows = execute_sql_problem_query(problem, answer.code)
-                    execution_time = (datetime.now() - start_time).total_seconds() * 1000
-                    total_execution_time += execution_time
+                    columns, rows, usage = run_sql_test_case(problem, answer.code)
+                    total_execution_time += usage["wall_time_ms"]
                     
-                    expected_columns = test_case.get("expected_columns", [])
-                    expected_rows = test_case.get("expected_rows", [])
-                    if compare_result_sets(columns, rows, expected_columns, expected_rows):
+                    passed = check_result_set(problem, test_case, columns, rows)
+                    if passed:
                         passed_tests += 1
                 except:
                     pass
+                test_results.append(test_result_entry(i + 1, passed, "success" if usage else "error", usage))
             
             score = (passed_tests / total_tests * 100) if total_tests > 0 else 0
         else:
             # Python evaluation with normalized comparison
-            runner = PythonRunner()
             passed_tests = 0
             total_tests = len(problem.get("test_cases", []))
             
-            async with execution_semaphore:
-                for test_case in problem.get("test_cases", []):
-                    start_time = datetime.now()
-                    result = await runner.run_with_input(answer.code, test_case["input"])
-                    execution_time = (datetime.now() - start_time).total_seconds() * 1000
-                    total_execution_time += execution_time
-                    
-                    if result["status"] == "success":
-                        # Use normalized comparison
-                        if compare_outputs(result["stdout"], test_case["output"]):
+            compile_error = check_syntax(answer.code)
+            if compile_error:
+                failures.append(compilation_error_result(compile_error)["verdict"])
+            else:
+                async with admission.slot("exam_submit", user_id):
+                    inputs = [test_case["input"] for test_case in problem.get("test_cases", [])]
+                    runs = await run_tests(answer.code, inputs, problem.get("memory_limit"))
+                    for i, (test_case, result) in enumerate(zip(problem.get("test_cases", []), runs)):
+                        total_execution_time += result["wall_time_ms"]
+                        
+                        # Judge with the problem's checker
+                        passed = result["status"] == "success" and check_output(problem, test_case, result["stdout"])
+                        if passed:
                             passed_tests += 1
+                        else:
+                            failures.append(result["verdict"])
+                        test_results.append(test_result_entry(i + 1, passed, result["status"], result))
             
             score = (passed_tests / total_tests * 100) if total_tests > 0 else 0
         
         # Determine verdict and average execution time
-        verdict = get_verdict(passed_tests, total_tests)
+        verdict = get_verdict(passed_tests, total_tests, failures)
         avg_execution_time = total_execution_time / total_tests if total_tests > 0 else 0
         
+        graded.append((answer, passed_tests, total_tests, score, verdict, avg_execution_time, test_results))
+        total_score += (score / 100) * problem_marks
+        results.append({
+            "problem_id": answer.problem_id,
+            "passed_tests": passed_tests,
+            "total_tests": total_tests,
+            "score": score,
+            "verdict": verdict,
+            "execution_time_ms": round(avg_execution_time, 2)
+        })
+    
+    # Write everything in one short transaction after judging, so no write
+    # lock is held while awaiting executions (it blocked other submissions)
+    for answer, passed_tests, total_tests, score, verdict, avg_execution_time, test_results in graded:
         # Save submission
         cursor.execute(
             """INSERT INTO submissions
@@ -750,6 +1327,7 @@ async def submit_exam(request: ExamSubmitRequest, db: sqlite3.Connection = Depen
             (user_id, answer.problem_id, answer.code, passed_tests, total_tests, score, verdict, avg_execution_time, time_taken, datetime.now().isoformat())
         )
         submission_id = cursor.lastrowid
+        record_test_case_results(cursor, submission_id, test_results)
         
         # Update hr_results for best score
         cursor.execute(
@@ -766,16 +1344,6 @@ async def submit_exam(request: ExamSubmitRequest, db: sqlite3.Connection = Depen
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
                 (user_id, user_info[0], user_info[1], answer.problem_id, score, passed_tests, total_tests, submission_id, verdict, avg_execution_time, time_taken, datetime.now().isoformat())
             )
-        
-        total_score += (score / 100) * problem_marks
-        results.append({
-            "problem_id": answer.problem_id,
-            "passed_tests": passed_tests,
-            "total_tests": total_tests,
-            "score": score,
-            "verdict": verdict,
-            "execution_time_ms": round(avg_execution_time, 2)
-        })
     
     db.commit()
     cursor.close()
@@ -812,88 +1380,107 @@ def validate_sql_query(query: str):
     if first_token not in ("select", "with"):
         raise HTTPException(status_code=400, detail="Only SELECT queries are allowed.")
 
+# Per-problem template databases: {problem_id: (schema_sql, seed_sql, connection)}.
+# Each execution gets a private copy via the backup API instead of re-running
+# the schema and seed scripts; a problem whose SQL changed gets a new template.
+sql_templates = {}
+sql_templates_lock = threading.Lock()
+
+
+def get_sql_template(problem: dict) -> sqlite3.Connection:
+    """The problem's schema + seed database, built on first use (or by warm-up)"""
+    schema_sql, seed_sql = problem["schema_sql"], problem["seed_sql"]
+    with sql_templates_lock:
+        cached = sql_templates.get(problem.get("id"))
+        if cached and cached[0] == schema_sql and cached[1] == seed_sql:
+            return cached[2]
+        template = sqlite3.connect(":memory:", check_same_thread=False)
+        try:
+            template.executescript(schema_sql)
+            template.executescript(seed_sql)
+        except sqlite3.Error:
+            template.close()
+            raise
+        if cached:
+            cached[2].close()
+        sql_templates[problem.get("id")] = (schema_sql, seed_sql, template)
+        return template
+
+
+def drop_sql_template(problem_id: str):
+    with sql_templates_lock:
+        cached = sql_templates.pop(problem_id, None)
+        if cached:
+            cached[2].close()
+
+
 def execute_sql_problem_query(problem: dict, query: str):
-    """Execute user SQL query in fresh in-memory database"""
+    """Execute user SQL query in a fresh in-memory copy of the problem's database"""
     validate_sql_query(query)
     conn = sqlite3.connect(":memory:")
     conn.row_factory = sqlite3.Row
     try:
         cursor = conn.cursor()
-        cursor.executescript(problem["schema_sql"])
-        cursor.executescript(problem["seed_sql"])
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        with metrics.SQL_SETUP_SECONDS.time(), tracing.span("sql.setup"):
+            template = get_sql_template(problem)
+            with sql_templates_lock:
+                template.backup(conn)
+        with metrics.SQL_QUERY_SECONDS.time(), tracing.span("sql.query"):
+            cursor.execute(query)
+            rows = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description] if cursor.description else []
         cursor.close()
         return columns, [list(row) for row in rows]
     finally:
         conn.close()
 
-def normalize_sql_value(v):
-    """Normalize SQL value for comparison (trim strings)"""
-    if isinstance(v, str):
-        return v.strip()
-    return v
-
-def compare_result_sets(actual_columns, actual_rows, expected_columns, expected_rows):
-    """Compare SQL result sets with flexible ordering"""
-    # Normalize column names
-    actual_cols_norm = [c.strip().lower() for c in actual_columns]
-    expected_cols_norm = [c.strip().lower() for c in expected_columns]
-
-    if set(actual_cols_norm) != set(expected_cols_norm):
-        return False
-
-    # Map actual columns to expected order
-    index_map = {name: idx for idx, name in enumerate(actual_cols_norm)}
-    ordered_actual_rows = []
-    for row in actual_rows:
-        ordered_actual_rows.append(
-            [normalize_sql_value(row[index_map[col]]) for col in expected_cols_norm]
-        )
-
-    expected_norm_rows = [
-        [normalize_sql_value(v) for v in row] for row in expected_rows
-    ]
-
-    # Ignore row order: compare sorted lists
-    ordered_actual_rows_sorted = sorted(ordered_actual_rows, key=lambda x: str(x))
-    expected_norm_rows_sorted = sorted(expected_norm_rows, key=lambda x: str(x))
-
-    return ordered_actual_rows_sorted == expected_norm_rows_sorted
+def run_sql_test_case(problem: dict, query: str):
+    """
+    Run the query for one SQL test case and measure it.
+    SQL runs in-process, so CPU is this thread's CPU time and memory is not tracked.
+    """
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    columns, rows = execute_sql_problem_query(problem, query)
+    usage = resource_metrics((time.perf_counter() - start_wall) * 1000)
+    usage["cpu_user_ms"] = round((time.thread_time() - start_cpu) * 1000, 3)
+    return columns, rows, usage
 
 @app.post("/sql/run")
-async def run_sql(request: RunSqlRequest):
+async def run_sql(request: RunSqlRequest, http_request: Request):
     """Execute SQL query and return result set"""
     problem = get_problem(request.problem_id)
     if not problem or problem.get("language") != "sql":
         raise HTTPException(status_code=404, detail="SQL problem not found")
 
-    async with execution_semaphore:
-        try:
-            columns, rows = execute_sql_problem_query(problem, request.query)
-            return {
-                "status": "success",
-                "columns": columns,
-                "rows": rows
-            }
-        except HTTPException:
-            # Re-raise validation errors
-            raise
-        except sqlite3.Error as e:
-            return {
-                "status": "error",
-                "error": f"SQL execution error: {str(e)}"
-            }
+    async def execute():
+        async with admission.slot("run", await execution_user(request.session_id, http_request)):
+            try:
+                columns, rows = execute_sql_problem_query(problem, request.query)
+                return {
+                    "status": "success",
+                    "columns": columns,
+                    "rows": rows
+                }
+            except HTTPException:
+                # Re-raise validation errors
+                raise
+            except sqlite3.Error as e:
+                return {
+                    "status": "error",
+                    "error": f"SQL execution error: {str(e)}"
+                }
+    # The bank version keeps an HR edit of the problem from being answered with an old result
+    key = flight_key(request.problem_id, problem_bank_version, request.query)
+    return await sql_run_flights.run(key, execute)
 
 @app.post("/sql/submit")
 async def submit_sql(request: SubmitSqlRequest, db: sqlite3.Connection = Depends(get_db)):
     """Submit SQL query and evaluate against test cases"""
     # Verify session (same logic as Python submit)
-    if request.session_id not in sessions:
+    user_id = await session_user(request.session_id)
+    if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid session. Please login again.")
-    
-    user_id = sessions[request.session_id]
 
     problem = get_problem(request.problem_id)
     if not problem or problem.get("language") != "sql":
@@ -906,32 +1493,35 @@ async def submit_sql(request: SubmitSqlRequest, db: sqlite3.Connection = Depends
     passed_tests = 0
     total_tests = len(test_cases)
     failed_details = []
+    test_results = []
     total_execution_time = 0
 
-    async with execution_semaphore:
+    async with admission.slot("submit", user_id):
         for idx, test_case in enumerate(test_cases):
             try:
-                start_time = datetime.now()
-                columns, rows = execute_sql_problem_query(problem, request.query)
-                execution_time = (datetime.now() - start_time).total_seconds() * 1000
-                total_execution_time += execution_time
+                columns, rows, usage = run_sql_test_case(problem, request.query)
+                total_execution_time += usage["wall_time_ms"]
             except HTTPException as e:
                 failed_details.append({
                     "test_case": idx + 1,
                     "error": e.detail
                 })
+                test_results.append(test_result_entry(idx + 1, False, "error", {}))
                 continue
             except sqlite3.Error as e:
                 failed_details.append({
                     "test_case": idx + 1,
                     "error": f"SQL execution error: {str(e)}"
                 })
+                test_results.append(test_result_entry(idx + 1, False, "error", {}))
                 continue
 
             expected_columns = test_case.get("expected_columns", [])
             expected_rows = test_case.get("expected_rows", [])
 
-            if compare_result_sets(columns, rows, expected_columns, expected_rows):
+            passed = check_result_set(problem, test_case, columns, rows)
+            test_results.append(test_result_entry(idx + 1, passed, "success", usage))
+            if passed:
                 passed_tests += 1
             else:
                 failed_details.append({
@@ -955,6 +1545,7 @@ async def submit_sql(request: SubmitSqlRequest, db: sqlite3.Connection = Depends
         (user_id, request.problem_id, request.query, passed_tests, total_tests, score, verdict, avg_execution_time, request.time_taken, datetime.now().isoformat())
     )
     submission_id = cursor.lastrowid
+    record_test_case_results(cursor, submission_id, test_results)
     db.commit()
 
     # Best score logic in hr_results (same as Python)
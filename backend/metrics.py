@@ -0,0 +1,248 @@
+"""
+In-process metrics in the Prometheus text exposition format, served at /metrics.
+
+Modules record into the module-level metrics below; gauges whose value lives
+elsewhere (queue depth, active sessions) are registered as callbacks and read
+at scrape time. No client library is needed - the format is plain text:
+https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans sub-millisecond in-process work up to a full 5 s execution
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """A settable gauge, or with function= one read at scrape time.
+    The function returns a number, or a {label values tuple: number} dict."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), function: Optional[Callable] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[tuple, float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.function is not None:
+            values = self.function()
+            if not isinstance(values, dict):
+                values = {(): values}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [("", _format_labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        samples = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                samples.append(("_bucket", labels, cumulative))
+            base_labels = _format_labels(self.labelnames, key)
+            samples.append(("_sum", base_labels, state[-1]))
+            samples.append(("_count", base_labels, cumulative))
+        return samples
+
+
+def render() -> str:
+    """All registered metrics in the text exposition format"""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by route template (e.g.
+    /problems/{problem_id}), so path parameters don't explode cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[object, str] = {}
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            path = self._route_paths[endpoint] = path or "unmatched"
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route(scope)
+            labels = {"method": scope["method"], "route": route, "status": str(status)}
+            HTTP_REQUESTS.inc(**labels)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route)
+
+
+# --- Metrics recorded across the backend ---
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+
+ADMISSION_WAIT_SECONDS = Histogram(
+    "judge_admission_wait_seconds", "Time spent waiting for an execution slot", ("execution_class",)
+)
+ADMISSION_LEASE_WAIT_SECONDS = Histogram(
+    "judge_admission_lease_wait_seconds", "Multi-worker mode: wait for a host-wide slot lease after local admission",
+    ("execution_class",)
+)
+ADMISSION_REJECTED = Counter(
+    "judge_admission_rejected_total", "Executions shed by admission control", ("execution_class", "status")
+)
+
+SPAWN_SECONDS = Histogram("judge_spawn_seconds", "Time to start the child interpreter process (fork/exec)")
+EXECUTION_SECONDS = Histogram(
+    "judge_execution_seconds", "Wall time from child start to exit, including interpreter start-up", ("outcome",)
+)
+USER_CPU_SECONDS = Histogram("judge_user_cpu_seconds", "CPU time (user + sys) used by the child process")
+
+COMPILATION_ERRORS = Counter(
+    "judge_compilation_errors_total", "Executions answered by the in-process syntax check without spawning"
+)
+STREAMING_RUNS = Counter(
+    "judge_streaming_runs_total", "WebSocket /ws/run executions by outcome: completed, cancelled, disconnected, rejected", ("outcome",)
+)
+EXAM_BUNDLE_RESPONSES = Counter(
+    "exam_bundle_responses_total", "GET /exam/bundle responses by how they were served: gzip, identity, not_modified", ("outcome",)
+)
+BATCH_RUN_INPUTS = Counter("judge_batch_run_inputs_total", "Custom inputs executed through /run/batch (one process per batch)")
+
+SQL_SETUP_SECONDS = Histogram("judge_sql_setup_seconds", "Copying the problem's template database (schema and seed data) for one query")
+SQL_QUERY_SECONDS = Histogram("judge_sql_query_seconds", "Executing and fetching the candidate's SQL query")
+
+DB_COMMIT_SECONDS = Histogram("db_commit_seconds", "SQLite commit latency")
+
+REPORT_BUILD_SECONDS = Histogram(
+    "report_build_seconds", "Excel and PDF report build durations", ("report",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+)
@@ -10,9 +10,20 @@ class LoginRequest(BaseModel):
             raise ValueError('Email must end with @gmail.com')
         return v
 
+class TokenLoginRequest(BaseModel):
+    session_id: str  # pre-issued by cohort provisioning
+
 class RunCodeRequest(BaseModel):
     code: str
     custom_input: str = ""
+    session_id: Optional[str] = None  # used for per-user execution limits
+
+class RunBatchRequest(BaseModel):
+    code: str
+    inputs: List[str] = []
+    problem_id: Optional[str] = None
+    include_sample: bool = False  # also run the problem's sample input and check its output
+    session_id: Optional[str] = None  # used for per-user execution limits
 
 class SubmitCodeRequest(BaseModel):
     session_id: str
@@ -24,6 +35,7 @@ class SubmitCodeRequest(BaseModel):
 class RunSqlRequest(BaseModel):
     problem_id: str
     query: str
+    session_id: Optional[str] = None  # used for per-user execution limits
 
 class SubmitSqlRequest(BaseModel):
     session_id: str
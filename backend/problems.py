@@ -1,7 +1,13 @@
 """
-Static problem definitions with difficulty, marks, and time limits
+Static problem definitions with difficulty, marks, and time limits.
+time_limit is the suggested solving time in minutes; memory_limit is the
+per-execution memory cap in MB for Python problems (runner default if absent).
 """
 
+from runner import normalize_output_lines
+from checkers import load_checker
+
+
 PROBLEMS = {
     # Python Problems
     "py_sum_n_numbers": {
@@ -11,6 +17,7 @@ PROBLEMS = {
         "difficulty": "Easy",
         "marks": 10,
         "time_limit": 15,
+        "memory_limit": 256,
         "statement": """Given an integer **N**, followed by **N space-separated integers**, print their sum.
 
 **Constraints:**
@@ -40,6 +47,7 @@ arr = list(map(int, input().split()))
         "difficulty": "Easy",
         "marks": 10,
         "time_limit": 15,
+        "memory_limit": 256,
         "statement": """Write a program that prints numbers from 1 to N. But for multiples of 3, print "Fizz" instead of the number, and for multiples of 5, print "Buzz". For numbers which are multiples of both 3 and 5, print "FizzBuzz".
 
 **Constraints:**
@@ -79,6 +87,7 @@ FizzBuzz""",
         "difficulty": "Medium",
         "marks": 20,
         "time_limit": 20,
+        "memory_limit": 256,
         "statement": """Given a string, determine if it is a palindrome. Consider only alphanumeric characters and ignore case.
 
 **Constraints:**
@@ -106,6 +115,7 @@ FizzBuzz""",
         "difficulty": "Medium",
         "marks": 20,
         "time_limit": 25,
+        "memory_limit": 256,
         "statement": """Given an array of integers and a target sum, find two numbers such that they add up to the target. Print the indices (0-based) of the two numbers in ascending order.
 
 **Constraints:**
@@ -137,6 +147,7 @@ arr = list(map(int, input().split()))
         "difficulty": "Hard",
         "marks": 30,
         "time_limit": 30,
+        "memory_limit": 256,
         "statement": """Given a string, find the length of the longest substring without repeating characters.
 
 **Constraints:**
@@ -295,6 +306,7 @@ WHERE salary < (SELECT MAX(salary) FROM employees);""",
         "difficulty": "Medium",
         "marks": 20,
         "time_limit": 25,
+        "order_sensitive": True,  # the statement asks for ORDER BY
         "statement": """Write a query to find all employees whose salary is above the average salary of all employees. Return the name and salary.
 
 **Table Schema:**
@@ -339,6 +351,7 @@ ORDER BY salary DESC;""",
         "difficulty": "Hard",
         "marks": 30,
         "time_limit": 30,
+        "order_sensitive": True,  # the statement asks for ORDER BY
         "statement": """Write a query to rank employees within each department by salary (highest first). Return name, department, salary, and rank.
 
 **Table Schema:**
@@ -383,10 +396,39 @@ ORDER BY department, salary_rank;""",
     }
 }
 
+def prepare_problem(problem: dict) -> dict:
+    """
+    Pre-normalize expected outputs and load the output checker once per problem
+    load, so comparisons only normalize the actual side
+    """
+    for test_case in problem.get("test_cases", []):
+        if "output" in test_case:
+            test_case["expected_lines"] = normalize_output_lines(test_case["output"])
+    if problem.get("language", "python") == "python":
+        load_checker(problem)
+    return problem
+
+for _problem in PROBLEMS.values():
+    prepare_problem(_problem)
+
 def get_problem(problem_id: str):
     """Get problem by ID"""
     return PROBLEMS.get(problem_id)
 
+def problem_details(problem):
+    """What a candidate sees of a problem: no test cases beyond the sample"""
+    return {
+        "id": problem["id"],
+        "title": problem["title"],
+        "statement": problem["statement"],
+        "input_format": problem["input_format"],
+        "output_format": problem["output_format"],
+        "sample_input": problem["sample_input"],
+        "sample_output": problem["sample_output"],
+        "starter_code": problem["starter_code"],
+        "language": problem.get("language", "python")
+    }
+
 def list_problems():
     """List all available problems with metadata"""
     return [
@@ -396,7 +438,8 @@ def list_problems():
             "language": p["language"],
             "difficulty": p.get("difficulty", "Medium"),
             "marks": p.get("marks", 10),
-            "time_limit": p.get("time_limit", 15)
+            "time_limit": p.get("time_limit", 15),
+            "memory_limit": p.get("memory_limit")
         }
         for p in PROBLEMS.values()
     ]
@@ -410,7 +453,8 @@ def list_problems_by_language(language: str):
             "language": p["language"],
             "difficulty": p.get("difficulty", "Medium"),
             "marks": p.get("marks", 10),
-            "time_limit": p.get("time_limit", 15)
+            "time_limit": p.get("time_limit", 15),
+            "memory_limit": p.get("memory_limit")
         }
         for p in PROBLEMS.values()
         if p["language"] == language
@@ -435,8 +479,16 @@ def get_exam_summary():
                 "language": p["language"],
                 "difficulty": p.get("difficulty", "Medium"),
                 "marks": p.get("marks", 10),
-                "time_limit": p.get("time_limit", 15)
+                "time_limit": p.get("time_limit", 15),
+                "memory_limit": p.get("memory_limit")
             }
             for p in problems
         ]
     }
+
+def build_exam_bundle():
+    """Everything the exam pages load: the summary plus every problem's details"""
+    return {
+        "summary": get_exam_summary(),
+        "problems": {pid: problem_details(p) for pid, p in PROBLEMS.items()}
+    }
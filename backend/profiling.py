@@ -0,0 +1,127 @@
+"""
+On-demand profiling for /admin/profile.
+
+"sampling" (default) snapshots every thread's stack at a fixed interval from
+a background thread and returns folded stacks - one "frame;frame;frame count"
+line per distinct stack - ready for flamegraph.pl, speedscope or inferno.
+Overhead is a few percent and it sees the event loop, executor threads and
+the profiler-free parts of the app alike.
+
+"cprofile" enables cProfile on the event loop thread and returns the top
+functions by cumulative time. It is exact but slows that thread noticeably,
+so keep the window short.
+
+Only one profile runs at a time.
+"""
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+import tracing
+
+DEFAULT_INTERVAL_SECONDS = 0.005
+MAX_PROFILE_SECONDS = 300
+MAX_STACK_DEPTH = 128
+
+_profile_lock = asyncio.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """Periodically samples all threads' stacks into folded-stack counts"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common()) + "\n"
+
+
+async def _wait(seconds: Optional[float], requests: Optional[int]):
+    """Until `seconds` pass or `requests` more traced requests finish (capped at MAX_PROFILE_SECONDS)"""
+    deadline = time.monotonic() + min(seconds or MAX_PROFILE_SECONDS, MAX_PROFILE_SECONDS)
+    target = tracing.completed_requests + requests if requests else None
+    while time.monotonic() < deadline:
+        if target is not None and tracing.completed_requests >= target:
+            return
+        await asyncio.sleep(0.05)
+
+
+async def profile(mode: str = "sampling", seconds: Optional[float] = None, requests: Optional[int] = None,
+                  interval: float = DEFAULT_INTERVAL_SECONDS) -> dict:
+    """Profile the running server; raises RuntimeError if a profile is already running"""
+    if _profile_lock.locked():
+        raise RuntimeError("A profile is already running")
+    async with _profile_lock:
+        started = time.monotonic()
+        start_requests = tracing.completed_requests
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await _wait(seconds, requests)
+            finally:
+                profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+            data = out.getvalue()
+            samples = None
+        else:
+            profiler = SamplingProfiler(interval)
+            profiler.start()
+            try:
+                await _wait(seconds, requests)
+            finally:
+                profiler.stop()
+            data = profiler.folded()
+            samples = profiler.samples
+        return {
+            "mode": mode,
+            "duration_seconds": round(time.monotonic() - started, 3),
+            "requests": tracing.completed_requests - start_requests,
+            "samples": samples,
+            "data": data,
+        }
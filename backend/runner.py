@@ -1,10 +1,73 @@
 import subprocess
 import asyncio
+import codecs
+import collections
 import sys
 import os
-import re
+import math
+import signal
 import time
-from typing import Dict, Tuple
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import tracing
+from code_cache import code_cache
+from zygote import ZygoteChild, child_environment, get_zygote
+from metrics import COMPILATION_ERRORS, EXECUTION_SECONDS, SPAWN_SECONDS, USER_CPU_SECONDS
+
+
+NORMALIZE_CHUNK_SIZE = 64 * 1024  # characters per lazily-normalized block
+
+
+def _normalized_chunks(text: str) -> Iterator[List[str]]:
+    """
+    Yield normalize_output(text) as successive lists of lines.
+
+    The text is consumed in blocks cut right after a newline so comparisons
+    can stop after the first differing block without touching the rest.
+    Rules match normalize_output exactly: newlines unified, trailing spaces
+    removed, leading/trailing blank lines dropped, runs of blank lines
+    collapsed into one, leading whitespace of the first line stripped.
+    """
+    if not text:
+        return
+
+    started = False
+    pending_blank = False
+    pos = 0
+    length = len(text)
+    while pos < length:
+        cut = text.find('\n', pos + NORMALIZE_CHUNK_SIZE)
+        if cut == -1:
+            piece = text[pos:]
+            pos = length
+        else:
+            piece = text[pos:cut + 1]
+            pos = cut + 1
+
+        lines = [line.rstrip() for line in piece.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+        if pos < length:
+            lines.pop()  # piece ends on a newline; the next line starts in the next piece
+
+        if started and not pending_blank and '' not in lines:
+            # Common case: a block of non-blank lines passes through untouched
+            yield lines
+            continue
+
+        out = []
+        for line in lines:
+            if not line:
+                # Blank lines are only emitted once something follows them
+                pending_blank = started
+                continue
+            if not started:
+                started = True
+                line = line.lstrip()
+            elif pending_blank:
+                out.append("")
+            pending_blank = False
+            out.append(line)
+        if out:
+            yield out
 
 
 def normalize_output(text: str) -> str:
@@ -21,26 +84,28 @@ def normalize_output(text: str) -> str:
     """
     if text is None:
         return ""
-    
-    # Step 1: Normalize all newline formats to \n
-    # Windows: \r\n -> \n
-    # Old Mac: \r -> \n
-    text = text.replace('\r\n', '\n').replace('\r', '\n')
-    
-    # Step 2: Remove trailing spaces from each line
-    lines = text.split('\n')
-    lines = [line.rstrip() for line in lines]
-    
-    # Step 3: Join back
-    text = '\n'.join(lines)
-    
-    # Step 4: Collapse multiple consecutive empty lines into one
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    
-    # Step 5: Strip leading/trailing whitespace (including final newlines)
-    text = text.strip()
-    
-    return text
+    return '\n'.join(line for chunk in _normalized_chunks(text) for line in chunk)
+
+
+def normalize_output_lines(text: str) -> Tuple[str, ...]:
+    """Normalized output as a tuple of lines (used to pre-normalize expected outputs)"""
+    if text is None:
+        return ()
+    return tuple(line for chunk in _normalized_chunks(text) for line in chunk)
+
+
+def compare_normalized(actual: str, expected_lines: Tuple[str, ...]) -> bool:
+    """
+    Compare raw output against pre-normalized expected lines.
+    Walks the actual output lazily and stops at the first differing block.
+    """
+    count = 0
+    for chunk in _normalized_chunks(actual):
+        end = count + len(chunk)
+        if end > len(expected_lines) or list(expected_lines[count:end]) != chunk:
+            return False
+        count = end
+    return count == len(expected_lines)
 
 
 def compare_outputs(actual: str, expected: str) -> bool:
@@ -48,13 +113,19 @@ def compare_outputs(actual: str, expected: str) -> bool:
     Compare two outputs after normalization.
     This is the PRIMARY comparison function - use this EVERYWHERE.
     """
-    return normalize_output(actual) == normalize_output(expected)
+    if actual == expected:
+        return True
+    return compare_normalized(actual, normalize_output_lines(expected))
 
 
-def get_verdict(passed_tests: int, total_tests: int) -> str:
+def get_verdict(passed_tests: int, total_tests: int, failures: Optional[List[Optional[str]]] = None) -> str:
     """
     Determine verdict based on test results.
-    Returns: 'Accepted', 'Partial', or 'Failed'
+    Returns: 'Accepted', 'Partial', or 'Failed' - or, when no test passed and
+    the first test failed on a limit or crash, that test's verdict
+    ('Time Limit Exceeded', 'Memory Limit Exceeded', 'Runtime Error', or
+    'Compilation Error' when the code never ran).
+    failures holds each failed test's per-run verdict in order (None = wrong answer).
     """
     if total_tests == 0:
         return "Failed"
@@ -62,78 +133,698 @@ def get_verdict(passed_tests: int, total_tests: int) -> str:
         return "Accepted"
     elif passed_tests > 0:
         return "Partial"
+    elif failures and failures[0]:
+        return failures[0]
     else:
         return "Failed"
 
 
+class _AccountedPopen(subprocess.Popen):
+    """
+    Popen that reaps its child with os.wait4 so the child's own rusage
+    (CPU user/sys time, peak RSS) is kept instead of being discarded.
+    """
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        try:
+            pid, sts, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # Already reaped elsewhere; mirror subprocess' own fallback
+            return (self.pid, 0)
+        if pid == self.pid:
+            self.rusage = rusage
+        return (pid, sts)
+
+
+# wait4 is POSIX-only; Windows keeps the plain Popen and reports wall time only
+_POPEN_CLASS = _AccountedPopen if hasattr(os, 'wait4') else subprocess.Popen
+
+def resource_metrics(wall_time_ms: float, rusage=None) -> Dict:
+    """Per-execution resource usage in the shape stored in test_case_results"""
+    metrics = {
+        "wall_time_ms": round(wall_time_ms, 3),
+        "cpu_user_ms": None,
+        "cpu_sys_ms": None,
+        "peak_memory_kb": None,
+    }
+    if rusage is not None:
+        metrics["cpu_user_ms"] = round(rusage.ru_utime * 1000, 3)
+        metrics["cpu_sys_ms"] = round(rusage.ru_stime * 1000, 3)
+        # ru_maxrss is kilobytes on Linux but bytes on macOS
+        metrics["peak_memory_kb"] = rusage.ru_maxrss // 1024 if sys.platform == 'darwin' else rusage.ru_maxrss
+    return metrics
+
+
+# On Linux the child runs through a small bootstrap that forks the code into a
+# child of its own and supervises it: the code applies the resource limits to
+# itself and runs, and the bootstrap reaps it with wait4 and reports its peak RSS
+# over a pipe. The API can't use its own wait4's ru_maxrss for that because it
+# also counts the API process's memory at spawn time; the code can't fake the
+# report because it never holds the pipe and the supervisor is non-dumpable (no
+# /proc/<pid>/fd access). The code runs in a process group of its own, which
+# _SupervisedPopen.kill() kills so the supervisor still reaps and reports it.
+# Applying limits in the child rather than in preexec_fn keeps subprocess on its
+# fast vfork path and avoids running Python between fork and exec in a
+# multi-threaded parent. The code runs exactly like `python -c code`: same
+# __main__ namespace, same sys.argv, same tracebacks (bootstrap frames hidden).
+# The code usually arrives already compiled from code_cache, marshaled in a pipe,
+# so the child skips compiling it.
+_BOOTSTRAP_IN_CHILD = sys.platform.startswith('linux')
+
+_CHILD_BOOTSTRAP = """
+def _bootstrap():
+    import sys, os, ctypes, resource, signal
+    del globals()['_bootstrap']
+    fd, code_fd, as_bytes, cpu_seconds, file_bytes, processes = map(int, sys.argv.pop(1).split(','))
+    source = sys.argv.pop(1)
+    code = None
+
+    libc = ctypes.CDLL(None)
+    libc.prctl(4, 0, 0, 0, 0)  # PR_SET_DUMPABLE
+    supervisor, group = os.getpid(), os.getpgrp()
+    os.setpgid(0, 0)
+    pid = os.fork()
+    if pid:
+        os.setpgid(0, group)
+        if code_fd >= 0:
+            os.close(code_fd)
+        null = os.open(os.devnull, os.O_RDWR)
+        for target in (0, 1, 2):
+            os.dup2(null, target)
+        _, status, rusage = os.wait4(pid, 0)
+        try:
+            os.write(fd, str(rusage.ru_maxrss).encode())
+        except OSError:
+            pass
+        if os.WIFSIGNALED(status):
+            signum = os.WTERMSIG(status)
+            if signum not in (signal.SIGKILL, signal.SIGSTOP):
+                signal.signal(signum, signal.SIG_DFL)
+            os.kill(supervisor, signum)
+            os._exit(128 + signum)
+        os._exit(os.waitstatus_to_exitcode(status) & 0xff)
+
+    libc.prctl(1, signal.SIGKILL, 0, 0, 0)  # PR_SET_PDEATHSIG: don't outlive the supervisor
+    if os.getppid() != supervisor:
+        os._exit(137)
+    os.close(fd)
+
+    # Hard limits too, so the code can't raise them back
+    if as_bytes >= 0:
+        resource.setrlimit(resource.RLIMIT_AS, (as_bytes, as_bytes))
+    if cpu_seconds >= 0:
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    if file_bytes >= 0:
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_bytes, file_bytes))
+    if processes >= 0:
+        resource.setrlimit(resource.RLIMIT_NPROC, (processes, processes))
+
+    def excepthook(exc_type, exc, tb, default_hook=sys.excepthook):
+        while tb is not None and tb.tb_frame.f_code is not code:
+            tb = tb.tb_next
+        default_hook(exc_type, exc.with_traceback(tb), tb)
+    sys.excepthook = excepthook
+
+    if code_fd >= 0:
+        import marshal
+        with open(code_fd, 'rb') as f:
+            code = marshal.load(f)
+    else:
+        code = compile(source, '<string>', 'exec')
+    return code
+exec(_bootstrap())
+"""
+
+
+class _SupervisedPopen(_AccountedPopen):
+    """
+    Popen for a child started through _CHILD_BOOTSTRAP. kill() kills the code
+    (the supervisor's process group) rather than the supervisor, which then
+    reaps it, reports its peak RSS and exits with its status.
+    """
+
+    def kill(self):
+        if self.returncode is not None:
+            return
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            super().kill()  # the code isn't running (not forked yet, or already reaped)
+        else:
+            self.send_signal(signal.SIGCONT)  # in case the code stopped its supervisor
+
+
+# Per-test failure verdicts (a wrong answer has none; see get_verdict)
+VERDICT_TIME_LIMIT = "Time Limit Exceeded"
+VERDICT_MEMORY_LIMIT = "Memory Limit Exceeded"
+VERDICT_RUNTIME_ERROR = "Runtime Error"
+# Whole-submission verdict: the code doesn't compile, so no test is run
+VERDICT_COMPILATION_ERROR = "Compilation Error"
+
+# The source reaches the child as a command-line argument, which Linux caps at
+# 128 KB; larger code could never run anyway
+MAX_SOURCE_BYTES = 64 * 1024
+# Compiled code is several times the size of its source; it is handed over in a
+# pipe sized to hold all of it (Linux's default cap for unprivileged pipe sizes)
+MAX_COMPILED_PIPE_BYTES = 1024 * 1024
+
+
+def compiled_code(code: str, max_bytes: int) -> Optional[bytes]:
+    """Marshaled code from the cache, or None if it doesn't compile or exceeds max_bytes"""
+    try:
+        data = code_cache.get(code)
+    except (SyntaxError, ValueError, RecursionError, MemoryError):
+        return None  # the child compiles it and reports the error as usual
+    return data if len(data) <= max_bytes else None
+
+
+def _code_pipe(compiled: bytes) -> Optional[int]:
+    """Read end of a pipe already holding all of `compiled`, or None if it can't hold it"""
+    import fcntl
+    read_fd, write_fd = os.pipe()
+    try:
+        os.set_blocking(write_fd, False)
+        if len(compiled) > 64 * 1024:  # default pipe capacity
+            fcntl.fcntl(write_fd, fcntl.F_SETPIPE_SZ, len(compiled))
+        if os.write(write_fd, compiled) == len(compiled):
+            return read_fd
+    except (OSError, AttributeError):
+        pass
+    finally:
+        os.close(write_fd)
+    os.close(read_fd)
+    return None
+
+
+def check_syntax(code: str) -> Optional[Dict]:
+    """
+    Compile the code in this process without running it, as the child would.
+    None if it compiles, else {"message", "line", "column"} - so code with a
+    syntax error costs no interpreter spawns.
+    """
+    size = len(code.encode("utf-8", errors="surrogatepass"))
+    if size > MAX_SOURCE_BYTES:
+        return {"message": f"Source code too large ({size} bytes, limit {MAX_SOURCE_BYTES})", "line": None, "column": None}
+    try:
+        code_cache.get(code)  # compiled once here, then reused by every run of this code
+    except SyntaxError as e:  # includes IndentationError / TabError
+        location = f" (line {e.lineno}, column {e.offset})" if e.lineno else ""
+        return {"message": f"{type(e).__name__}: {e.msg}{location}", "line": e.lineno, "column": e.offset}
+    except (ValueError, RecursionError, MemoryError) as e:  # null bytes, absurd nesting
+        return {"message": f"{type(e).__name__}: {e}", "line": None, "column": None}
+    return None
+
+
+def compilation_error_result(error: Dict) -> Dict:
+    """A run result (same shape as run_with_input's) for code that failed check_syntax"""
+    COMPILATION_ERRORS.inc()
+    return {
+        "status": "error",
+        "stdout": "",
+        "stderr": error["message"],
+        "verdict": VERDICT_COMPILATION_ERROR,
+        **resource_metrics(0)
+    }
+
+
+def _read_reported_peak(fd: int):
+    """Peak RSS in kB reported by the bootstrap's supervisor, or None if it never reported"""
+    os.set_blocking(fd, False)  # don't wait on a supervisor that was killed before reporting
+    try:
+        data = os.read(fd, 64)
+    except BlockingIOError:
+        return None
+    return int(data) if data.strip().isdigit() else None
+
+
+def _limits_preexec(limits: Tuple[int, int, int, int]):
+    """preexec_fn fallback for POSIX systems without the bootstrap (e.g. macOS)"""
+    import resource
+    as_bytes, cpu_seconds, file_bytes, processes = limits
+
+    def apply_limits():
+        for name, value, hard in (
+            ("RLIMIT_AS", as_bytes, as_bytes),
+            ("RLIMIT_CPU", cpu_seconds, cpu_seconds + 1),
+            ("RLIMIT_FSIZE", file_bytes, file_bytes),
+            ("RLIMIT_NPROC", processes, processes),
+        ):
+            if value >= 0 and hasattr(resource, name):
+                try:
+                    resource.setrlimit(getattr(resource, name), (value, hard))
+                except (ValueError, OSError):
+                    pass  # some platforms refuse e.g. RLIMIT_AS; keep the others
+    return apply_limits
+
+
+def _pidfd_supported() -> bool:
+    """pidfd_open needs Linux 5.3+ and Python 3.9+"""
+    if not sys.platform.startswith('linux') or not hasattr(os, 'pidfd_open'):
+        return False
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return False
+    return True
+
+
+# "pidfd": children are supervised on the event loop (no thread per run).
+# "thread": blocking subprocess calls in the default executor (Windows, macOS, old kernels).
+# "zygote": like "pidfd", but children are forked from a template process with
+# common modules preloaded (zygote.py); opt-in with RUNNER_BACKEND=zygote.
+RUNNER_BACKEND_ENV = "RUNNER_BACKEND"
+RUNNER_BACKEND = "pidfd" if _pidfd_supported() else "thread"
+if RUNNER_BACKEND == "pidfd" and os.environ.get(RUNNER_BACKEND_ENV) == "zygote":
+    RUNNER_BACKEND = "zygote"
+# Backends whose runs are supervised on the event loop by _run_pidfd
+EVENT_LOOP_BACKENDS = ("pidfd", "zygote")
+
+PIPE_READ_SIZE = 64 * 1024
+STREAM_BUFFER_CHUNKS = 16  # chunks (up to PIPE_READ_SIZE each) a streaming run buffers ahead of its consumer
+
+
+class OutputBuffer:
+    """
+    Bounded queue of (stream, bytes) chunks between a running child and a
+    streaming consumer. put() reports when it is full; the producer then
+    stops reading the child and registers a callback to resume once drained.
+    """
+
+    def __init__(self, max_chunks: int = STREAM_BUFFER_CHUNKS):
+        self.max_chunks = max_chunks
+        self._chunks = collections.deque()
+        self._closed = False
+        self._ready = asyncio.Event()
+        self._waiting: List[Callable[[], None]] = []
+
+    def put(self, stream: str, data: bytes) -> bool:
+        """Queue a chunk; False once the buffer is full"""
+        self._chunks.append((stream, data))
+        self._ready.set()
+        return len(self._chunks) < self.max_chunks
+
+    def when_drained(self, callback: Callable[[], None]):
+        self._waiting.append(callback)
+
+    def close(self):
+        """No more chunks; pending resume callbacks are dropped"""
+        self._closed = True
+        self._waiting.clear()
+        self._ready.set()
+
+    async def get(self) -> Optional[Tuple[str, bytes]]:
+        """Next chunk, or None once closed and empty"""
+        while not self._chunks:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        item = self._chunks.popleft()
+        if len(self._chunks) < self.max_chunks and self._waiting:
+            waiting, self._waiting = self._waiting, []
+            for callback in waiting:
+                callback()
+        return item
+
+
 class PythonRunner:
-    """Python code execution runner with timeout and output capture"""
+    """Python code execution runner with timeout, resource limits and output capture"""
     
+    backend = RUNNER_BACKEND
     TIMEOUT = 5  # seconds
     MAX_OUTPUT_SIZE = 10000  # characters
     
-    def _run_sync(self, code: str, stdin_input: str = "") -> Dict:
-        """Synchronous execution - runs in thread pool for Windows compatibility"""
+    # Per-execution limits applied in the child (POSIX). Problems override the
+    # memory limit with their "memory_limit" field.
+    MEMORY_LIMIT_MB = 256  # address space
+    MAX_FILE_SIZE = 1024 * 1024  # bytes a program may write to any file
+    MAX_PROCESSES = 0  # no fork/threads beyond the interpreter itself
+    
+    def _limits(self, memory_limit_mb: Optional[int]) -> Tuple[int, int, int, int]:
+        """(address space bytes, CPU seconds, file size bytes, processes); -1 = no limit"""
+        memory_mb = memory_limit_mb or self.MEMORY_LIMIT_MB
+        cpu_seconds = int(math.ceil(self.TIMEOUT))
+        processes = self.MAX_PROCESSES if self.MAX_PROCESSES is not None else -1
+        return (memory_mb * 1024 * 1024, cpu_seconds, self.MAX_FILE_SIZE, processes)
+    
+    def _classify_failure(self, returncode: int, stderr: str, metrics: Dict, limits) -> str:
+        """Per-test verdict for a run that did not exit cleanly"""
+        last_line = stderr.strip().rsplit('\n', 1)[-1] if stderr else ""
+        if last_line.startswith("MemoryError") or "Cannot allocate memory" in last_line:
+            return VERDICT_MEMORY_LIMIT
+        cpu_kill_signals = {-getattr(signal, name) for name in ('SIGXCPU', 'SIGKILL') if hasattr(signal, name)}
+        if returncode in cpu_kill_signals:
+            cpu_ms = (metrics["cpu_user_ms"] or 0) + (metrics["cpu_sys_ms"] or 0)
+            if cpu_ms >= limits[1] * 1000:
+                return VERDICT_TIME_LIMIT
+        if (returncode < 0 and metrics["peak_memory_kb"]
+                and metrics["peak_memory_kb"] * 1024 >= limits[0] * 0.9):
+            return VERDICT_MEMORY_LIMIT
+        return VERDICT_RUNTIME_ERROR
+    
+    def _spawn(self, code: str, limits: Tuple[int, int, int, int]):
+        """Start the child with stdin/stdout/stderr pipes; returns (proc, peak_read_fd, start_time)"""
+        creationflags = 0
+        preexec_fn = None
+        if os.name == 'nt':
+            creationflags = subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
+        elif not _BOOTSTRAP_IN_CHILD:
+            preexec_fn = _limits_preexec(limits)
+        
+        if _BOOTSTRAP_IN_CHILD:
+            compiled = compiled_code(code, MAX_COMPILED_PIPE_BYTES)
+            code_fd = _code_pipe(compiled) if compiled is not None else None
+            peak_read_fd, peak_write_fd = os.pipe()
+            config = ','.join(str(v) for v in (peak_write_fd, -1 if code_fd is None else code_fd) + limits)
+            args = [sys.executable, '-u', '-c', _CHILD_BOOTSTRAP, config, '' if code_fd is not None else code]
+            pass_fds = (peak_write_fd,) if code_fd is None else (peak_write_fd, code_fd)
+        else:
+            peak_read_fd = peak_write_fd = code_fd = None
+            args = [sys.executable, '-u', '-c', code]
+            pass_fds = ()
+        
+        start = time.perf_counter()
         try:
-            # Use subprocess.run which works reliably on Windows
-            creationflags = 0
-            if os.name == 'nt':
-                creationflags = subprocess.CREATE_NO_WINDOW if hasattr(subprocess, 'CREATE_NO_WINDOW') else 0
-            
-            result = subprocess.run(
-                [sys.executable, '-u', '-c', code],
-                input=stdin_input.encode('utf-8'),
-                capture_output=True,
-                timeout=self.TIMEOUT,
-                creationflags=creationflags
-            )
-            
-            stdout_str = result.stdout.decode('utf-8', errors='replace')[:self.MAX_OUTPUT_SIZE]
-            stderr_str = result.stderr.decode('utf-8', errors='replace')[:self.MAX_OUTPUT_SIZE]
-            
-            if result.returncode == 0:
-                return {
-                    "status": "success",
-                    "stdout": stdout_str,
-                    "stderr": stderr_str
-                }
-            else:
-                return {
-                    "status": "error",
-                    "stdout": stdout_str,
-                    "stderr": stderr_str if stderr_str else f"Process exited with code {result.returncode}"
-                }
-                
-        except subprocess.TimeoutExpired:
-            return {
-                "status": "error",
-                "stdout": "",
-                "stderr": f"Error: Code execution timed out after {self.TIMEOUT} seconds"
-            }
-        except FileNotFoundError:
+            with tracing.span("runner.spawn"):
+                proc = (_SupervisedPopen if _BOOTSTRAP_IN_CHILD else _POPEN_CLASS)(
+                    args,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    pass_fds=pass_fds,
+                    preexec_fn=preexec_fn,
+                    creationflags=creationflags,
+                    env=child_environment()
+                )
+        except BaseException:
+            if peak_read_fd is not None:
+                os.close(peak_read_fd)
+            raise
+        finally:
+            if peak_write_fd is not None:
+                os.close(peak_write_fd)
+            if code_fd is not None:
+                os.close(code_fd)
+        SPAWN_SECONDS.observe(time.perf_counter() - start)
+        return proc, peak_read_fd, start
+    
+    async def _spawn_zygote(self, code: str, limits: Tuple[int, int, int, int]):
+        """
+        _spawn for the "zygote" backend: fork from the preloaded template process.
+        There is no peak report fd: the zygote reaps the child, and its rusage
+        (peak RSS included) arrives with the exit.
+        """
+        start = time.perf_counter()
+        with tracing.span("runner.spawn", zygote=True):
+            compiled = compiled_code(code, MAX_COMPILED_PIPE_BYTES)
+            code_fd = _code_pipe(compiled) if compiled is not None else None
+            try:
+                proc = await get_zygote().spawn(code, limits, code_fd)
+            finally:
+                if code_fd is not None:
+                    os.close(code_fd)
+        SPAWN_SECONDS.observe(time.perf_counter() - start)
+        return proc, None, start
+    
+    def _result(self, returncode: int, stdout: bytes, stderr: bytes, timed_out: bool, metrics: Dict, limits,
+                output_limit: Optional[int] = None) -> Dict:
+        """Build the result dict shared by both backends"""
+        self._observe(returncode, timed_out, metrics)
+        if timed_out:
             return {
                 "status": "error",
                 "stdout": "",
-                "stderr": f"Python interpreter not found: {sys.executable}"
+                "stderr": f"Error: Code execution timed out after {self.TIMEOUT} seconds",
+                "verdict": VERDICT_TIME_LIMIT,
+                **metrics
             }
-        except PermissionError as e:
+        
+        output_limit = output_limit or self.MAX_OUTPUT_SIZE
+        stdout_str = stdout.decode('utf-8', errors='replace')[:output_limit]
+        stderr_str = stderr.decode('utf-8', errors='replace')[:output_limit]
+        
+        if returncode == 0:
             return {
-                "status": "error",
-                "stdout": "",
-                "stderr": f"Permission denied executing Python: {str(e)}"
+                "status": "success",
+                "stdout": stdout_str,
+                "stderr": stderr_str,
+                "verdict": None,
+                **metrics
             }
+        
+        verdict = self._classify_failure(returncode, stderr_str, metrics, limits)
+        if verdict == VERDICT_TIME_LIMIT and not stderr_str:
+            stderr_str = f"Error: CPU time limit exceeded ({limits[1]} seconds)"
+        elif verdict == VERDICT_MEMORY_LIMIT and not stderr_str:
+            stderr_str = f"Error: Memory limit exceeded ({limits[0] // (1024 * 1024)} MB)"
+        return {
+            "status": "error",
+            "stdout": stdout_str,
+            "stderr": stderr_str if stderr_str else f"Process exited with code {returncode}",
+            "verdict": verdict,
+            **metrics
+        }
+    
+    @staticmethod
+    def _observe(returncode: int, timed_out: bool, metrics: Dict):
+        outcome = "timeout" if timed_out else "ok" if returncode == 0 else "error"
+        EXECUTION_SECONDS.observe(metrics["wall_time_ms"] / 1000, outcome=outcome)
+        if metrics["cpu_user_ms"] is not None:
+            USER_CPU_SECONDS.observe((metrics["cpu_user_ms"] + (metrics["cpu_sys_ms"] or 0)) / 1000)
+    
+    def _error_result(self, e: Exception) -> Dict:
+        """Result for a child that could not be started or supervised"""
+        if isinstance(e, FileNotFoundError):
+            stderr = f"Python interpreter not found: {sys.executable}"
+        elif isinstance(e, PermissionError):
+            stderr = f"Permission denied executing Python: {str(e)}"
+        else:
+            stderr = f"Execution error: {type(e).__name__}: {str(e)}"
+        return {
+            "status": "error",
+            "stdout": "",
+            "stderr": stderr,
+            "verdict": VERDICT_RUNTIME_ERROR,
+            **resource_metrics(0)
+        }
+    
+    def _run_sync(self, code: str, stdin_input: str = "", memory_limit_mb: Optional[int] = None,
+                  output_limit: Optional[int] = None) -> Dict:
+        """
+        Blocking execution for the "thread" backend (Windows, macOS, old Linux).
+        Wall time is measured here around the child only (not thread-pool
+        queueing); CPU time and peak memory come from the child's rusage.
+        """
+        limits = self._limits(memory_limit_mb)
+        try:
+            proc, peak_read_fd, start = self._spawn(code, limits)
+            timed_out = False
+            try:
+                try:
+                    stdout, stderr = proc.communicate(input=stdin_input.encode('utf-8'), timeout=self.TIMEOUT)
+                except subprocess.TimeoutExpired:
+                    timed_out = True
+                    proc.kill()
+                    stdout, stderr = proc.communicate()
+                metrics = resource_metrics((time.perf_counter() - start) * 1000, getattr(proc, 'rusage', None))
+                if peak_read_fd is not None:
+                    metrics["peak_memory_kb"] = _read_reported_peak(peak_read_fd)
+            finally:
+                if peak_read_fd is not None:
+                    os.close(peak_read_fd)
+            return self._result(proc.returncode, stdout, stderr, timed_out, metrics, limits, output_limit)
         except Exception as e:
-            import traceback
-            return {
-                "status": "error",
-                "stdout": "",
-                "stderr": f"Execution error: {type(e).__name__}: {str(e)}"
-            }
+            return self._error_result(e)
     
-    async def run_with_input(self, code: str, stdin_input: str = "") -> Dict:
+    async def _run_pidfd(self, code: str, stdin_input: str = "", memory_limit_mb: Optional[int] = None,
+                         output_limit: Optional[int] = None, output: Optional["OutputBuffer"] = None) -> Dict:
         """
-        Execute Python code with custom input (Windows-compatible)
-        Uses thread pool to avoid Windows asyncio subprocess issues
+        Event-loop execution for the "pidfd" backend: the child's pipes and
+        its pidfd are watched with add_reader/add_writer, so an in-flight run
+        costs no thread. The exited child is reaped with os.wait4 for its rusage.
+        "zygote" children are the zygote's to reap: their exit and rusage come
+        from its "exited" message instead.
+        With `output`, chunks are also passed on as they arrive; reading a pipe
+        pauses while the buffer is full, so a slow consumer stalls the child.
         """
-        # Run synchronous subprocess in thread pool for Windows compatibility
-        return await asyncio.to_thread(self._run_sync, code, stdin_input)
+        limits = self._limits(memory_limit_mb)
+        loop = asyncio.get_running_loop()
+        try:
+            if self.backend == "zygote":
+                proc, peak_read_fd, start = await self._spawn_zygote(code, limits)
+            else:
+                proc, peak_read_fd, start = self._spawn(code, limits)
+        except Exception as e:
+            return self._error_result(e)
+        
+        watched_readers = []
+        pidfd = None
+        try:
+            stdout_chunks: List[bytes] = []
+            stderr_chunks: List[bytes] = []
+            if isinstance(proc, ZygoteChild):
+                exited = proc.exited
+            else:
+                pidfd = os.pidfd_open(proc.pid)
+                exited = loop.create_future()
+                
+                def watch_exit():
+                    loop.remove_reader(pidfd)
+                    if not exited.done():
+                        exited.set_result(None)
+                loop.add_reader(pidfd, watch_exit)
+                watched_readers.append(pidfd)
+            
+            def watch_pipe(name, pipe, chunks):
+                fd = pipe.fileno()
+                os.set_blocking(fd, False)
+                done = loop.create_future()
+                
+                def on_readable():
+                    try:
+                        data = os.read(fd, PIPE_READ_SIZE)
+                    except BlockingIOError:
+                        return
+                    except OSError:
+                        data = b''
+                    if data:
+                        chunks.append(data)
+                        if output is not None and not output.put(name, data):
+                            loop.remove_reader(fd)
+                            output.when_drained(lambda: loop.add_reader(fd, on_readable))
+                        return
+                    loop.remove_reader(fd)
+                    if not done.done():
+                        done.set_result(None)
+                loop.add_reader(fd, on_readable)
+                watched_readers.append(fd)
+                return done
+            
+            stdout_done = watch_pipe("stdout", proc.stdout, stdout_chunks)
+            stderr_done = watch_pipe("stderr", proc.stderr, stderr_chunks)
+            self._feed_stdin(loop, proc.stdin, stdin_input.encode('utf-8'))
+            
+            _, pending = await asyncio.wait({exited, stdout_done, stderr_done}, timeout=self.TIMEOUT)
+            timed_out = bool(pending)
+            if timed_out:
+                proc.kill()  # still unreaped, so the pid can't have been reused
+                await exited
+            
+            if isinstance(proc, ZygoteChild):
+                status, rusage = exited.result()
+            else:
+                _, status, rusage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            
+            metrics = resource_metrics((time.perf_counter() - start) * 1000, rusage)
+            if peak_read_fd is not None:
+                metrics["peak_memory_kb"] = _read_reported_peak(peak_read_fd)
+            return self._result(
+                proc.returncode, b''.join(stdout_chunks), b''.join(stderr_chunks), timed_out, metrics, limits, output_limit
+            )
+        except Exception as e:
+            return self._error_result(e)
+        finally:
+            if output is not None:
+                output.close()
+            for fd in watched_readers:
+                loop.remove_reader(fd)
+            if proc.returncode is None:
+                # Cancelled (client went away) or failed mid-run: kill it and let
+                # subprocess' own cleanup reap it later without blocking the loop
+                try:
+                    proc.kill()
+                except OSError:
+                    pass
+            for pipe in (proc.stdin, proc.stdout, proc.stderr):
+                if not pipe.closed:
+                    loop.remove_writer(pipe.fileno())
+                    pipe.close()
+            if pidfd is not None:
+                os.close(pidfd)
+            if isinstance(proc, ZygoteChild):
+                proc.close()
+            if peak_read_fd is not None:
+                os.close(peak_read_fd)
+    
+    @staticmethod
+    def _feed_stdin(loop, pipe, data: bytes):
+        """Write stdin without blocking the loop, then close it (EPIPE just means the child stopped reading)"""
+        fd = pipe.fileno()
+        if not data:
+            pipe.close()
+            return
+        os.set_blocking(fd, False)
+        view = memoryview(data)
+        
+        def on_writable():
+            nonlocal view
+            try:
+                written = os.write(fd, view)
+            except BlockingIOError:
+                return
+            except OSError:
+                written = len(view)  # broken pipe: drop the rest
+            view = view[written:]
+            if not view:
+                loop.remove_writer(fd)
+                pipe.close()
+        loop.add_writer(fd, on_writable)
+    
+    async def run_with_input(self, code: str, stdin_input: str = "", memory_limit: Optional[int] = None,
+                             output_limit: Optional[int] = None) -> Dict:
+        """
+        Execute Python code with custom input.
+        memory_limit is the problem's limit in MB (default MEMORY_LIMIT_MB);
+        output_limit caps stdout/stderr in characters (default MAX_OUTPUT_SIZE).
+        The backend is picked per platform (see RUNNER_BACKEND); both return
+        the same result dict with the same timeout semantics.
+        """
+        with tracing.span("runner.execute", backend=self.backend):
+            if self.backend in EVENT_LOOP_BACKENDS:
+                return await self._run_pidfd(code, stdin_input, memory_limit, output_limit)
+            # Blocking subprocess in the thread pool (Windows lacks a usable async subprocess API here)
+            return await asyncio.to_thread(self._run_sync, code, stdin_input, memory_limit, output_limit)
+
+    async def run_streaming(self, code: str, stdin_input: str = "", memory_limit: Optional[int] = None
+                            ) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Execute like run_with_input, yielding ("stdout" | "stderr", text) as
+        the child writes and finally ("exit", result dict). Each stream is
+        cut at MAX_OUTPUT_SIZE characters like run_with_input's. Closing the
+        generator early (or cancelling its consumer) kills the child.
+        The "thread" backend can't stream: its output comes in one piece at exit.
+        """
+        if self.backend not in EVENT_LOOP_BACKENDS:
+            result = await self.run_with_input(code, stdin_input, memory_limit)
+            for name in ("stdout", "stderr"):
+                if result[name]:
+                    yield name, result[name]
+            yield "exit", result
+            return
+
+        output = OutputBuffer()
+        decoders = {name: codecs.getincrementaldecoder('utf-8')(errors='replace') for name in ("stdout", "stderr")}
+        remaining = {name: self.MAX_OUTPUT_SIZE for name in ("stdout", "stderr")}
+        with tracing.span("runner.execute", backend=self.backend, streaming=True):
+            run = asyncio.create_task(self._run_pidfd(code, stdin_input, memory_limit, output=output))
+            try:
+                while True:
+                    item = await output.get()
+                    if item is None:
+                        break
+                    name, data = item
+                    text = decoders[name].decode(data)[:remaining[name]]
+                    if text:
+                        remaining[name] -= len(text)
+                        yield name, text
+                for name, decoder in decoders.items():
+                    text = decoder.decode(b'', final=True)[:remaining[name]]  # a cut-off multi-byte character
+                    if text:
+                        yield name, text
+                yield "exit", await run
+            finally:
+                if not run.done():
+                    run.cancel()
+                    await asyncio.gather(run, return_exceptions=True)
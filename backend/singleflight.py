@@ -0,0 +1,96 @@
+"""
+Single-flight execution with a short-lived result cache.
+
+Double-clicks and client retries send the same /run or /sql/run payload
+several times at once. SingleFlight runs one execution per key: requests
+arriving while it is in flight wait for it and share its result, and the
+result is kept for a few seconds so an immediate repeat is answered from
+memory. Errors (e.g. an admission rejection) are shared with the waiters
+but never cached.
+
+The execution runs in its own task, so one waiter going away doesn't
+cancel it for the others; it is cancelled only when every waiter has gone.
+
+Only the request/response endpoints coalesce. /ws/run (the editor's Run
+button) always runs its own execution: each stream is throttled by its own
+client and killed by that client's cancel, neither of which a shared run
+could honour.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict
+
+from metrics import Counter
+
+COALESCED_REQUESTS = Counter(
+    "judge_coalesced_requests_total",
+    "Requests answered without their own execution: shared (joined one in flight) or cached",
+    ("kind", "outcome")
+)
+
+
+def flight_key(*parts) -> str:
+    """Digest of the request fields that determine the result"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = str(part).encode("utf-8", errors="surrogatepass")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    def __init__(self, kind: str, ttl: float = 5.0, max_entries: int = 256):
+        self.kind = kind
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._in_flight: Dict[str, list] = {}  # key -> [task, waiters]
+        self._results: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, result)
+
+    def _cached(self, key: str):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return entry
+
+    def _finished(self, key: str, task: asyncio.Task):
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or self.ttl <= 0:
+            return
+        self._results[key] = (time.monotonic() + self.ttl, task.result())
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    async def run(self, key: str, execute: Callable[[], Awaitable[Any]]) -> Any:
+        """execute()'s result for this key - from the cache, a run in flight, or a new run"""
+        cached = self._cached(key)
+        if cached is not None:
+            COALESCED_REQUESTS.inc(kind=self.kind, outcome="cached")
+            return cached[1]
+
+        flight = self._in_flight.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(execute())
+            flight = self._in_flight[key] = [task, 0]
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            COALESCED_REQUESTS.inc(kind=self.kind, outcome="shared")
+        task = flight[0]
+
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and flight[1] == 1:
+                task.cancel()  # last waiter gone: nobody wants the result
+            raise
+        finally:
+            flight[1] -= 1
@@ -0,0 +1,304 @@
+"""
+Shared state: logged-in sessions, exam sessions, the HR problem bank and
+(in multi-worker mode) cluster-wide execution slot leases.
+
+MemoryStore keeps everything in the process, as a single worker always did.
+SQLiteStore keeps it in a SQLite file every worker on the host opens, so
+`gunicorn -w N` / `uvicorn --workers N` behave like one server: a session
+created by one worker is valid on all of them, an exam can be saved on one
+and submitted on another, and the execution slot limit applies to the whole
+host instead of multiplying with the worker count.
+
+Pick the store with the SHARED_STATE_DB environment variable (path to the
+SQLite file); unset means MemoryStore.
+
+Async code goes through `await store.call("method", *args)`: SQLiteStore
+methods can wait seconds on another worker's write lock, so they run on the
+store's own thread instead of the event loop.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+SHARED_STATE_DB_ENV = "SHARED_STATE_DB"
+
+# A worker renews its leases every sync; a crashed worker's leases lapse after this
+LEASE_TTL_SECONDS = 15
+
+
+def _exam_from_row(row) -> dict:
+    start_time, end_time, status, answers = row
+    return {
+        "start_time": datetime.fromisoformat(start_time),
+        "end_time": datetime.fromisoformat(end_time),
+        "status": status,
+        "answers": json.loads(answers),
+    }
+
+
+class MemoryStore:
+    """Process-local state (single worker)"""
+    name = "memory"
+    shared = False
+
+    def __init__(self):
+        self._sessions: Dict[str, int] = {}
+        # {user_id: {"start_time": datetime, "end_time": datetime, "status": "active"|"expired"|"completed", "answers": {}}}
+        self._exams: Dict[int, dict] = {}
+        # problem_id -> (version, definition JSON or None when deleted)
+        self._problem_bank: Dict[str, Tuple[int, Optional[str]]] = {}
+        self._problem_bank_version = 0
+
+    async def call(self, method: str, *args):
+        return getattr(self, method)(*args)
+
+    # --- Sessions ---
+
+    def create_session(self, session_id: str, user_id: int):
+        self._sessions[session_id] = user_id
+
+    def session_user(self, session_id: Optional[str]) -> Optional[int]:
+        return self._sessions.get(session_id)
+
+    def session_count(self) -> int:
+        return len(self._sessions)
+
+    # --- Exams ---
+
+    def get_exam(self, user_id: int) -> Optional[dict]:
+        return self._exams.get(user_id)
+
+    def start_exam(self, user_id: int, start_time: datetime) -> dict:
+        exam = {"start_time": start_time, "end_time": start_time, "status": "active", "answers": {}}
+        self._exams[user_id] = exam
+        return exam
+
+    def set_exam_status(self, user_id: int, status: str):
+        self._exams[user_id]["status"] = status
+
+    def save_exam_answer(self, user_id: int, problem_id: str, code: str):
+        self._exams[user_id]["answers"][problem_id] = code
+
+    def complete_exam(self, user_id: int, end_time: datetime) -> Optional[dict]:
+        """Mark the exam completed; None if there is none or it already was"""
+        exam = self._exams.get(user_id)
+        if exam is None or exam["status"] == "completed":
+            return None
+        exam["status"] = "completed"
+        exam["end_time"] = end_time
+        return exam
+
+    def active_exam_count(self) -> int:
+        return sum(1 for exam in self._exams.values() if exam["status"] == "active")
+
+    # --- Problem bank (HR-added and deleted problems) ---
+
+    def publish_problem(self, problem_id: str, definition: Optional[str]) -> int:
+        """Record a problem's JSON definition (None = deleted); returns the new bank version"""
+        self._problem_bank_version += 1
+        self._problem_bank[problem_id] = (self._problem_bank_version, definition)
+        return self._problem_bank_version
+
+    def problem_bank_version(self) -> int:
+        return self._problem_bank_version
+
+    def problem_changes(self, since: int) -> Tuple[int, List[Tuple[str, Optional[str]]]]:
+        """(current version, [(problem_id, definition)] changed after `since`, oldest first)"""
+        changes = sorted(
+            (version, problem_id, definition)
+            for problem_id, (version, definition) in self._problem_bank.items() if version > since
+        )
+        return self._problem_bank_version, [(problem_id, definition) for _, problem_id, definition in changes]
+
+    def close(self):
+        pass
+
+
+class SQLiteStore:
+    """State shared by every worker on the host through one SQLite file (WAL mode)"""
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        # One connection behind one lock: a single thread serves every call
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state")
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS exam_sessions (
+                user_id INTEGER PRIMARY KEY,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                status TEXT NOT NULL,
+                answers TEXT NOT NULL DEFAULT '{}'
+            );
+            CREATE TABLE IF NOT EXISTS problem_bank (
+                problem_id TEXT PRIMARY KEY,
+                definition TEXT,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS slot_leases (
+                lease_id TEXT PRIMARY KEY,
+                worker_id TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+
+    async def call(self, method: str, *args):
+        """Run a store method on the store's thread (it may block on the file lock)"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(getattr(self, method), *args))
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction taking the database write lock up front"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _fetchone(self, sql: str, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    # --- Sessions ---
+
+    def create_session(self, session_id: str, user_id: int):
+        self._execute("INSERT INTO sessions (session_id, user_id) VALUES (?, ?)", (session_id, user_id))
+
+    def session_user(self, session_id: Optional[str]) -> Optional[int]:
+        if session_id is None:
+            return None
+        row = self._fetchone("SELECT user_id FROM sessions WHERE session_id = ?", (session_id,))
+        return row[0] if row else None
+
+    def session_count(self) -> int:
+        return self._fetchone("SELECT count(*) FROM sessions")[0]
+
+    # --- Exams ---
+
+    def get_exam(self, user_id: int) -> Optional[dict]:
+        row = self._fetchone(
+            "SELECT start_time, end_time, status, answers FROM exam_sessions WHERE user_id = ?", (user_id,)
+        )
+        return _exam_from_row(row) if row else None
+
+    def start_exam(self, user_id: int, start_time: datetime) -> dict:
+        self._execute(
+            """INSERT OR REPLACE INTO exam_sessions (user_id, start_time, end_time, status, answers)
+            VALUES (?, ?, ?, 'active', '{}')""",
+            (user_id, start_time.isoformat(), start_time.isoformat())
+        )
+        return {"start_time": start_time, "end_time": start_time, "status": "active", "answers": {}}
+
+    def set_exam_status(self, user_id: int, status: str):
+        self._execute("UPDATE exam_sessions SET status = ? WHERE user_id = ?", (status, user_id))
+
+    def save_exam_answer(self, user_id: int, problem_id: str, code: str):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT answers FROM exam_sessions WHERE user_id = ?", (user_id,)).fetchone()
+            answers = json.loads(row[0])
+            answers[problem_id] = code
+            conn.execute("UPDATE exam_sessions SET answers = ? WHERE user_id = ?", (json.dumps(answers), user_id))
+
+    def complete_exam(self, user_id: int, end_time: datetime) -> Optional[dict]:
+        """Mark the exam completed; None if there is none or it already was
+        (also when another worker's submit got there first)"""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE exam_sessions SET status = 'completed', end_time = ? WHERE user_id = ? AND status != 'completed'",
+                (end_time.isoformat(), user_id)
+            ).rowcount
+        return self.get_exam(user_id) if updated else None
+
+    def active_exam_count(self) -> int:
+        return self._fetchone("SELECT count(*) FROM exam_sessions WHERE status = 'active'")[0]
+
+    # --- Problem bank ---
+
+    def publish_problem(self, problem_id: str, definition: Optional[str]) -> int:
+        with self._transaction() as conn:
+            version = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM problem_bank").fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO problem_bank (problem_id, definition, version) VALUES (?, ?, ?)",
+                (problem_id, definition, version)
+            )
+        return version
+
+    def problem_bank_version(self) -> int:
+        return self._fetchone("SELECT COALESCE(MAX(version), 0) FROM problem_bank")[0]
+
+    def problem_changes(self, since: int) -> Tuple[int, List[Tuple[str, Optional[str]]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT problem_id, definition, version FROM problem_bank WHERE version > ? ORDER BY version", (since,)
+            ).fetchall()
+        version = rows[-1][2] if rows else since
+        return version, [(problem_id, definition) for problem_id, definition, _ in rows]
+
+    # --- Cluster-wide execution slots ---
+
+    def acquire_lease(self, limit: int) -> Optional[str]:
+        """Take one of `limit` host-wide execution slots; None if all are leased"""
+        now = time.time()
+        lease_id = None
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM slot_leases WHERE expires_at < ?", (now,))
+            if conn.execute("SELECT count(*) FROM slot_leases").fetchone()[0] < limit:
+                lease_id = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO slot_leases (lease_id, worker_id, expires_at) VALUES (?, ?, ?)",
+                    (lease_id, self.worker_id, now + LEASE_TTL_SECONDS)
+                )
+        return lease_id
+
+    def release_lease(self, lease_id: str):
+        self._execute("DELETE FROM slot_leases WHERE lease_id = ?", (lease_id,))
+
+    def renew_leases(self):
+        """Extend this worker's leases; called periodically while it is alive"""
+        self._execute(
+            "UPDATE slot_leases SET expires_at = ? WHERE worker_id = ?",
+            (time.time() + LEASE_TTL_SECONDS, self.worker_id)
+        )
+
+    def leases_in_use(self) -> int:
+        return self._fetchone("SELECT count(*) FROM slot_leases WHERE expires_at >= ?", (time.time(),))[0]
+
+    def close(self):
+        """Give back this worker's leases and close the connection"""
+        self._executor.shutdown()
+        self._execute("DELETE FROM slot_leases WHERE worker_id = ?", (self.worker_id,))
+        self._conn.close()
+
+
+def create_store():
+    """SQLiteStore when SHARED_STATE_DB is set (multi-worker mode), else MemoryStore"""
+    path = os.environ.get(SHARED_STATE_DB_ENV)
+    return SQLiteStore(path) if path else MemoryStore()
@@ -0,0 +1,343 @@
+"""
+Zygote (fork server) for candidate processes, Linux only.
+
+Instead of starting a fresh interpreter per test, a template process - the
+zygote - starts once, imports the modules candidates commonly use and then
+forks a copy-on-write child per execution. The child takes the stdin/stdout/
+stderr pipes handed over by the API process, applies the resource limits
+and runs the code as `python -c` would, so start-up and those imports are
+paid once instead of per test.
+
+Protocol over a SOCK_SEQPACKET socketpair (one message per datagram):
+
+    api -> zygote   4-byte header length, JSON header {"id", "limits", "compiled"},
+                    then the source as UTF-8 (empty when compiled); SCM_RIGHTS
+                    carries the stdin, stdout and stderr fds, plus a pipe
+                    holding the marshaled code object when compiled
+    zygote -> api   {"type": "started", "id", "pid"} right after forking
+    zygote -> api   {"type": "exited", "pid", "status", "utime", "stime", "maxrss"}
+                    once the child is reaped
+
+The zygote reaps its children, so the API side learns about exits and
+rusage (peak RSS included) from the "exited" message and kills with a pidfd
+(never a reused pid). The zygote is non-dumpable, so the code it forks can't
+reach its socket through /proc or pidfd_getfd and forge those messages.
+Enabled with RUNNER_BACKEND=zygote; the preloaded modules are set with
+ZYGOTE_PRELOAD (comma-separated).
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+PRELOAD_ENV = "ZYGOTE_PRELOAD"
+DEFAULT_PRELOAD = "collections,itertools,heapq,math,re,bisect,functools,string,random,decimal,fractions,statistics,typing"
+
+# Secrets held by the API (cohort.py) and judge nodes; candidate processes never get them
+PRIVATE_ENV = ("SESSION_TOKEN_SECRET", "JUDGE_TOKEN")
+
+MAX_MESSAGE_BYTES = 256 * 1024  # header + code (code is at most runner.MAX_SOURCE_BYTES)
+
+# Runs as `python -u -c ZYGOTE_SOURCE <socket fd> <modules>`; single-threaded so forking is safe
+ZYGOTE_SOURCE = """
+def _zygote():
+    import atexit, builtins, ctypes, json, marshal, os, select, signal, socket, struct, sys, types, resource
+
+    ctypes.CDLL(None).prctl(4, 0, 0, 0, 0)  # PR_SET_DUMPABLE
+    sock = socket.socket(fileno=int(sys.argv[1]))
+    for name in filter(None, sys.argv[2].split(',')):
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    del sys.argv[1:]
+
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.set_wakeup_fd(wakeup_w)
+
+    def send(message):
+        sock.send(json.dumps(message).encode())
+
+    def run_child(header, code_bytes, fds):
+        stdin, stdout, stderr = fds[:3]
+        sock.close()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        os.close(wakeup_r)
+        os.close(wakeup_w)
+        for target, fd in ((0, stdin), (1, stdout), (2, stderr)):
+            os.dup2(fd, target)
+            os.close(fd)
+
+        as_bytes, cpu_seconds, file_bytes, processes = header["limits"]
+        # Hard limits too, so the code can't raise them back
+        if as_bytes >= 0:
+            resource.setrlimit(resource.RLIMIT_AS, (as_bytes, as_bytes))
+        if cpu_seconds >= 0:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        if file_bytes >= 0:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (file_bytes, file_bytes))
+        if processes >= 0:
+            resource.setrlimit(resource.RLIMIT_NPROC, (processes, processes))
+
+        # Every child would otherwise replay the zygote's random sequence
+        if 'random' in sys.modules:
+            sys.modules['random'].seed()
+
+        main = types.ModuleType('__main__')
+        main.__builtins__ = builtins
+        sys.modules['__main__'] = main
+        sys.argv = ['-c']
+        code = None
+
+        def excepthook(exc_type, exc, tb, default_hook=sys.__excepthook__):
+            while tb is not None and tb.tb_frame.f_code is not code:
+                tb = tb.tb_next
+            default_hook(exc_type, exc.with_traceback(tb), tb)
+        sys.excepthook = excepthook
+
+        status = 0
+        try:
+            if header["compiled"]:
+                with open(fds[3], 'rb') as f:
+                    code = marshal.load(f)
+            else:
+                code = compile(code_bytes.decode('utf-8', 'surrogateescape'), '<string>', 'exec')
+            exec(code, main.__dict__)
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                status = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                status = 1
+        except BaseException as e:
+            sys.excepthook(type(e), e, e.__traceback__)
+            status = 1
+        # What the interpreter does on its way out
+        try:
+            atexit._run_exitfuncs()
+        except BaseException:
+            pass
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except BaseException:
+                status = status or 120
+        os._exit(status & 0xff)
+
+    while True:
+        readable, _, _ = select.select([sock, wakeup_r], [], [])
+        if wakeup_r in readable:
+            try:
+                os.read(wakeup_r, 4096)
+            except BlockingIOError:
+                pass
+        if sock in readable:
+            try:
+                data, fds, _, _ = socket.recv_fds(sock, %(max_message)d, 4)
+            except InterruptedError:
+                continue
+            if not data:
+                return  # API process went away
+            header_size = struct.unpack('!I', data[:4])[0]
+            header = json.loads(data[4:4 + header_size])
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    run_child(header, data[4 + header_size:], fds)
+                finally:
+                    os._exit(127)
+            for fd in fds:
+                os.close(fd)
+            send({"type": "started", "id": header["id"], "pid": pid})
+        while True:
+            try:
+                pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            send({"type": "exited", "pid": pid, "status": status, "utime": rusage.ru_utime,
+                  "stime": rusage.ru_stime, "maxrss": rusage.ru_maxrss})
+
+_zygote()
+""" % {"max_message": MAX_MESSAGE_BYTES}
+
+
+def child_environment() -> Dict[str, str]:
+    """This process's environment minus PRIVATE_ENV, for the children running candidate code"""
+    return {name: value for name, value in os.environ.items() if name not in PRIVATE_ENV}
+
+
+class ZygoteChild:
+    """The parts of a Popen the runner uses, for a child forked by the zygote"""
+
+    def __init__(self, pid: int, pidfd: Optional[int], exited: asyncio.Future, stdin, stdout, stderr,
+                 zygote_pid: int):
+        self.pid = pid
+        self.pidfd = pidfd
+        self.exited = exited  # resolves with (wait status, rusage)
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self.zygote_pid = zygote_pid
+
+    def kill(self):
+        if self.pidfd is not None and not self.exited.done():
+            signal.pidfd_send_signal(self.pidfd, signal.SIGKILL)
+        if not self.exited.done():
+            # The code may have stopped the zygote, which then never reports the exit
+            os.kill(self.zygote_pid, signal.SIGCONT)
+
+    def close(self):
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+            self.pidfd = None
+
+
+class Zygote:
+    def __init__(self, modules: List[str]):
+        self.modules = modules
+        self.loop = None
+        self.process = None
+        self._sock = None
+        self._ids = 0
+        self._starting: Dict[int, asyncio.Future] = {}  # request id -> future((pid, pidfd, exited))
+        self._exits: Dict[int, asyncio.Future] = {}  # pid -> future((status, rusage))
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, '-u', '-c', ZYGOTE_SOURCE, str(child.fileno()), ','.join(self.modules)],
+                stdin=subprocess.DEVNULL, pass_fds=(child.fileno(),), env=child_environment()
+            )
+        finally:
+            child.close()
+        parent.setblocking(False)
+        self._sock = parent
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(parent.fileno(), self._on_message)
+
+    def stop(self):
+        if self._sock is not None:
+            self.loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+        self._fail_pending(ConnectionError("zygote stopped"))
+
+    def _fail_pending(self, error: Exception):
+        for futures in (self._starting, self._exits):
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(error)
+            futures.clear()
+
+    def _on_message(self):
+        try:
+            data = self._sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self.stop()  # the zygote died; the next spawn starts a new one
+            return
+        message = json.loads(data)
+        if message["type"] == "started":
+            pid = message["pid"]
+            try:
+                pidfd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                pidfd = None  # already exited and reaped; nothing left to kill
+            exited = self._exits[pid] = self.loop.create_future()
+            future = self._starting.pop(message["id"], None)
+            if future is not None and not future.done():
+                future.set_result((pid, pidfd, exited))
+            elif pidfd is not None:
+                os.close(pidfd)
+        elif message["type"] == "exited":
+            future = self._exits.pop(message["pid"], None)
+            if future is not None and not future.done():
+                rusage = SimpleNamespace(ru_utime=message["utime"], ru_stime=message["stime"], ru_maxrss=message["maxrss"])
+                future.set_result((message["status"], rusage))
+
+    async def spawn(self, code: str, limits: Tuple[int, int, int, int],
+                    code_fd: Optional[int] = None) -> ZygoteChild:
+        """
+        Fork a child running `code` - or the marshaled code object readable
+        from code_fd - with fresh stdin/stdout/stderr pipes
+        """
+        self._ids += 1
+        request_id = self._ids
+        header = json.dumps({"id": request_id, "limits": list(limits), "compiled": code_fd is not None}).encode()
+        body = code.encode('utf-8', 'surrogateescape') if code_fd is None else b''
+        message = struct.pack('!I', len(header)) + header + body
+        pipes = [os.pipe() for _ in range(3)]  # stdin, stdout, stderr
+        child_fds = [pipes[0][0], pipes[1][1], pipes[2][1]]
+        parent_fds = [pipes[0][1], pipes[1][0], pipes[2][0]]
+        try:
+            started = self._starting[request_id] = self.loop.create_future()
+            while True:
+                try:
+                    socket.send_fds(self._sock, [message], child_fds if code_fd is None else child_fds + [code_fd])
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(0.001)
+        except BaseException:
+            self._starting.pop(request_id, None)
+            for fd in parent_fds:
+                os.close(fd)
+            raise
+        finally:
+            for fd in child_fds:
+                os.close(fd)
+        try:
+            pid, pidfd, exited = await started
+        except BaseException:
+            for fd in parent_fds:
+                os.close(fd)
+            raise
+        stdin, stdout, stderr = parent_fds
+        return ZygoteChild(pid, pidfd, exited, open(stdin, 'wb', buffering=0), open(stdout, 'rb', buffering=0),
+                           open(stderr, 'rb', buffering=0), self.process.pid)
+
+
+_zygote: Optional[Zygote] = None
+
+
+def get_zygote() -> Zygote:
+    """This process's zygote, (re)started on first use and when it died or the event loop changed"""
+    global _zygote
+    loop = asyncio.get_running_loop()
+    if _zygote is None or not _zygote.alive or _zygote.loop is not loop:
+        if _zygote is not None:
+            _zygote.stop()
+        modules = os.environ.get(PRELOAD_ENV, DEFAULT_PRELOAD).split(",")
+        _zygote = Zygote([name.strip() for name in modules if name.strip()])
+        _zygote.start()
+    return _zygote
+
+
+def stop_zygote():
+    global _zygote
+    if _zygote is not None:
+        _zygote.stop()
+        _zygote = None
@@ -14,16 +14,61 @@ export const login = async (name, email) => {
   return response.data
 }
 
+// Pre-issued cohort token (login link ?token=...)
+export const loginWithToken = async (token) => {
+  const response = await api.post('/login/token', { session_id: token })
+  return response.data
+}
+
 export const getProblem = async (problemId) => {
+  const bundle = await getExamBundle()
+  if (bundle.problems[problemId]) return bundle.problems[problemId]
   const response = await api.get(`/problems/${problemId}`)
   return response.data
 }
 
 export const runCode = async (code, customInput) => {
-  const response = await api.post('/run', { code, custom_input: customInput })
+  const response = await api.post('/run', {
+    code,
+    custom_input: customInput,
+    session_id: localStorage.getItem('session_id'),
+  })
   return response.data
 }
 
+// Run over a WebSocket so output shows up while the program is still running.
+// onOutput(stream, text) is called per chunk; `done` resolves with the final
+// message (type "exit", "cancelled" or "error"). cancel() stops the program.
+export const runCodeStream = (code, customInput, onOutput) => {
+  const socket = new WebSocket(API_BASE_URL.replace(/^http/, 'ws') + '/ws/run')
+  const done = new Promise((resolve, reject) => {
+    socket.onopen = () => {
+      socket.send(JSON.stringify({
+        code,
+        custom_input: customInput,
+        session_id: localStorage.getItem('session_id'),
+      }))
+    }
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data)
+      if (message.type === 'output') {
+        onOutput(message.stream, message.data)
+      } else {
+        resolve(message)
+        socket.close()
+      }
+    }
+    socket.onerror = () => reject(new Error('Connection to the execution server failed'))
+    socket.onclose = () => reject(new Error('Connection closed before the run finished'))
+  })
+  const cancel = () => {
+    if (socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ type: 'cancel' }))
+    }
+  }
+  return { done, cancel }
+}
+
 export const submitCode = async (sessionId, problemId, code, timeTaken) => {
   const response = await api.post('/submit', {
     session_id: sessionId,
@@ -36,7 +81,11 @@ export const submitCode = async (sessionId, problemId, code, timeTaken) => {
 
 // SQL API functions
 export const runSql = async (problemId, query) => {
-  const response = await api.post('/sql/run', { problem_id: problemId, query })
+  const response = await api.post('/sql/run', {
+    problem_id: problemId,
+    query,
+    session_id: localStorage.getItem('session_id'),
+  })
   return response.data
 }
 
@@ -51,19 +100,27 @@ export const submitSql = async (sessionId, problemId, query, timeTaken) => {
 }
 
 // Exam session API functions
-export const getExamSummary = async () => {
-  const response = await api.get('/exam/summary')
+
+// Summary and every problem in one response; the browser caches it (ETag +
+// Cache-Control), so the pages below share one download
+export const getExamBundle = async () => {
+  const response = await api.get('/exam/bundle')
   return response.data
 }
 
+export const getExamSummary = async () => {
+  const bundle = await getExamBundle()
+  return bundle.summary
+}
+
 export const getPythonProblems = async () => {
-  const response = await api.get('/problems/python')
-  return response.data
+  const bundle = await getExamBundle()
+  return bundle.summary.problems.filter((p) => p.language === 'python')
 }
 
 export const getSqlProblems = async () => {
-  const response = await api.get('/problems/sql')
-  return response.data
+  const bundle = await getExamBundle()
+  return bundle.summary.problems.filter((p) => p.language === 'sql')
 }
 
 export const startExam = async (sessionId) => {
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import Editor from '@monaco-editor/react'
-import { getProblem, runCode, submitCode, runSql, submitSql, getExamStatus, submitExam } from '../api'
+import { getProblem, runCodeStream, submitCode, runSql, submitSql, getExamStatus, submitExam } from '../api'
 import './CodingPage.css'
 
 function CodingPage() {
@@ -14,6 +14,7 @@ function CodingPage() {
   const [customInput, setCustomInput] = useState('')
   const [output, setOutput] = useState('')
   const [loading, setLoading] = useState(false)
+  const [activeRun, setActiveRun] = useState(null)  // streaming run that can be stopped
   const [error, setError] = useState('')
   const [submitResult, setSubmitResult] = useState(null)
   const [userName, setUserName] = useState('')
@@ -197,7 +198,19 @@ function CodingPage() {
         return
       }
 
-      const result = await runCode(code, customInput)
+      // Output streams in while the program runs
+      let stdout = ''
+      let stderr = ''
+      const run = runCodeStream(code, customInput, (stream, text) => {
+        if (stream === 'stdout') {
+          stdout += text
+        } else {
+          stderr += text
+        }
+        setOutput(stdout + (stderr ? '\n\n' + stderr : ''))
+      })
+      setActiveRun(run)
+      const result = await run.done
       
       if (result.error === 'INPUT_REQUIRED') {
         setShowInputRequired(true)
@@ -205,17 +218,22 @@ function CodingPage() {
         return
       }
       
-      if (result.status === 'success') {
-        setOutput(result.stdout || '(no output)')
-        if (result.stderr) {
-          setOutput(prev => prev + '\n\nWarnings:\n' + result.stderr)
+      if (result.type === 'cancelled') {
+        setOutput(stdout + (stderr ? '\n\n' + stderr : '') + '\n\n(Stopped)')
+      } else if (result.type === 'error') {
+        setError('Failed to run code: ' + result.detail)
+      } else if (result.status === 'success') {
+        setOutput(stdout || '(no output)')
+        if (stderr) {
+          setOutput(prev => prev + '\n\nWarnings:\n' + stderr)
         }
       } else {
-        setOutput(result.stderr || result.stdout || 'Unknown error')
+        setOutput((stdout ? stdout + '\n\n' : '') + (stderr || result.message || 'Unknown error'))
       }
     } catch (err) {
       setError('Failed to run code: ' + (err.response?.data?.detail || err.message))
     } finally {
+      setActiveRun(null)
       setLoading(false)
     }
   }
@@ -265,6 +283,10 @@ function CodingPage() {
       if (result.failed_details && result.failed_details.length > 0) {
         outputText += `Failed Test Cases:\n`
         result.failed_details.forEach((detail) => {
+          if (detail.verdict === 'Compilation Error') {
+            outputText += `\nCompilation Error (no test case was run):\n${detail.error}\n`
+            return
+          }
           outputText += `\nTest Case ${detail.test_case}:\n`
           if (detail.error) {
             outputText += `Error: ${detail.error}\n`
@@ -402,9 +424,15 @@ function CodingPage() {
         )}
 
         <div className="action-buttons">
-          <button onClick={handleRun} disabled={loading} className="btn-run">
-            {loading ? 'Running...' : 'Run'}
-          </button>
+          {activeRun ? (
+            <button onClick={activeRun.cancel} className="btn-run">
+              Stop
+            </button>
+          ) : (
+            <button onClick={handleRun} disabled={loading} className="btn-run">
+              {loading ? 'Running...' : 'Run'}
+            </button>
+          )}
           <button onClick={handleSubmit} disabled={loading} className="btn-submit">
             {loading ? 'Submitting...' : 'Submit'}
           </button>
@@ -13,7 +13,12 @@ function getVerdictClass(verdict) {
   switch (verdict) {
     case 'Accepted': return 'verdict-accepted'
     case 'Partial': return 'verdict-partial'
-    case 'Failed': return 'verdict-failed'
+    case 'Failed':
+    case 'Time Limit Exceeded':
+    case 'Memory Limit Exceeded':
+    case 'Runtime Error':
+    case 'Compilation Error':
+      return 'verdict-failed'
     default: return 'verdict-pending'
   }
 }
@@ -32,6 +37,12 @@ function formatExecTime(ms) {
   return `${(ms / 1000).toFixed(2)}s`
 }
 
+function formatMemory(kb) {
+  if (!kb) return '--'
+  if (kb < 1024) return `${kb}KB`
+  return `${(kb / 1024).toFixed(1)}MB`
+}
+
 function HRResults() {
   const navigate = useNavigate()
   const [results, setResults] = useState([])
@@ -153,6 +164,8 @@ function HRResults() {
                     <th>Test Cases</th>
                     <th>Verdict</th>
                     <th>Exec Time</th>
+                    <th>CPU Time</th>
+                    <th>Peak Memory</th>
                     <th>Time Taken</th>
                     <th>Submitted</th>
                   </tr>
@@ -174,6 +187,8 @@ function HRResults() {
                           </span>
                         </td>
                         <td>{formatExecTime(p.execution_time_ms)}</td>
+                        <td>{formatExecTime(p.cpu_time_ms)}</td>
+                        <td>{formatMemory(p.peak_memory_kb)}</td>
                         <td>{formatTime(p.time_taken)}</td>
                         <td className="hr-td-date">{new Date(p.updated_at).toLocaleString()}</td>
                       </tr>
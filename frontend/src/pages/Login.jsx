@@ -1,6 +1,6 @@
-import { useState } from 'react'
-import { useNavigate } from 'react-router-dom'
-import { login } from '../api'
+import { useState, useEffect } from 'react'
+import { useNavigate, useSearchParams } from 'react-router-dom'
+import { login, loginWithToken } from '../api'
 import './Login.css'
 
 function Login() {
@@ -8,6 +8,24 @@ function Login() {
   const [gmail, setGmail] = useState('')
   const [error, setError] = useState('')
   const navigate = useNavigate()
+  const [searchParams] = useSearchParams()
+
+  const completeLogin = (response) => {
+    localStorage.setItem('session_id', response.session_id)
+    localStorage.setItem('user_id', response.user_id)
+    localStorage.setItem('user_name', response.name)
+    localStorage.setItem('user_email', response.email)
+    navigate('/dashboard')
+  }
+
+  // Login links from cohort provisioning carry a pre-issued token
+  useEffect(() => {
+    const token = searchParams.get('token')
+    if (!token) return
+    loginWithToken(token)
+      .then(completeLogin)
+      .catch(() => setError('This login link is invalid or has expired. Please sign in below.'))
+  }, [searchParams])
 
   const handleSubmit = async (e) => {
     e.preventDefault()
@@ -30,11 +48,7 @@ function Login() {
 
     try {
       const response = await login(username, gmail)
-      localStorage.setItem('session_id', response.session_id)
-      localStorage.setItem('user_id', response.user_id)
-      localStorage.setItem('user_name', response.name)
-      localStorage.setItem('user_email', response.email)
-      navigate('/dashboard')
+      completeLogin(response)
     } catch (err) {
       setError('Login failed. Please try again.')
     }